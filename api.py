@@ -0,0 +1,216 @@
+from app import app
+import hashlib
+from datetime import timezone
+from flask import request, session, jsonify
+from sqlalchemy import func, select
+from models import db, Influencer, Campaign, AdRequest, CampaignRollup, NegotiationMessage
+from routes import auth_required, sponsor_required, influencer_required
+from pagination import paginate
+from sql_stats import query_budget
+from replicas import read_only
+import exports
+import transitions
+import negotiation
+
+# JSON API under /api/v<API_VERSION>. Every read response carries a strong
+# ETag and a Last-Modified derived from the updated_at row versions of what it
+# covers. The validator is computed first with one aggregate query, so a
+# client revalidating an unchanged resource gets a 304 without the rows being
+# loaded or serialized. Collections are keyset-paginated like the HTML pages
+# (?after= / ?before= / ?per_page=) and the cursor is part of the ETag.
+#
+# Negotiation threads page newest first like the other collections; with
+# ?since=<message id> they return only newer messages, oldest first, plus the
+# cursor to send next time.
+#
+# The decisions endpoints accept or reject many ad requests at once:
+#   {"decision": "accept", "ids": [1, 2, 3]}
+#   {"decision": "reject", "filter": {"campaign_id": 7, "status": "Pending", "awaiting": true}}
+
+API_VERSION = 1
+PREFIX = f"/api/v{API_VERSION}"
+
+def to_dict(obj):
+    return {column.name: exports.serialize(getattr(obj, column.key)) for column in exports.columns(type(obj))}
+
+def collection_validator(model, *criteria, version=None):
+    version = version if version is not None else model.updated_at
+    return db.session.execute(
+        select(func.count(model.id), func.max(model.id), func.max(version)).where(*criteria)
+    ).one()
+
+def error_response(message, status_code):
+    response = jsonify(error=message)
+    response.status_code = status_code
+    return response
+
+def not_found(message):
+    return error_response(message, 404)
+
+def not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+def conditional(validator, last_modified, build):
+    etag = hashlib.sha256(repr((API_VERSION, request.full_path, tuple(validator))).encode()).hexdigest()
+    if last_modified is not None:
+        # Row versions are naive local times; HTTP dates have whole seconds.
+        last_modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+    if not_modified(etag, last_modified):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
+
+def page_payload(query, column, descending=False):
+    page = paginate(query, column, descending=descending)
+    return {"items": [to_dict(item) for item in page.items], "next": page.next_cursor, "prev": page.prev_cursor}
+
+def collection(model, criteria, descending=False, version=None):
+    validator = collection_validator(model, *criteria, version=version)
+    return conditional(validator, validator[2], lambda: page_payload(model.query.filter(*criteria), model.id, descending))
+
+@app.route(f"{PREFIX}/campaigns")
+@auth_required
+@query_budget(2)
+@read_only
+def api_public_campaigns():
+    return collection(Campaign, [Campaign.visibility == "public"])
+
+@app.route(f"{PREFIX}/campaigns/<int:campaign_id>")
+@auth_required
+@query_budget(2)
+@read_only
+def api_campaign(campaign_id):
+    validator = db.session.execute(
+        select(Campaign.sponsor_id, Campaign.visibility, Campaign.updated_at).where(Campaign.id == campaign_id)
+    ).one_or_none()
+    if validator is None or not (validator.visibility == "public" or (session['user_type'] == 'sponsor' and session['id'] == validator.sponsor_id)):
+        return not_found("Campaign does not exist")
+    return conditional(validator, validator.updated_at, lambda: to_dict(db.session.get(Campaign, campaign_id)))
+
+@app.route(f"{PREFIX}/sponsors/<int:sponsor_id>/campaigns")
+@sponsor_required
+@query_budget(2)
+@read_only
+def api_sponsor_campaigns(sponsor_id):
+    if session['id'] != sponsor_id:
+        return not_found("Sponsor does not exist")
+    return collection(Campaign, [Campaign.sponsor_id == sponsor_id], descending=True)
+
+@app.route(f"{PREFIX}/campaigns/<int:campaign_id>/tracking")
+@sponsor_required
+@query_budget(2)
+@read_only
+def api_campaign_tracking(campaign_id):
+    last_request = select(func.max(AdRequest.updated_at)).where(AdRequest.campaign_id == campaign_id).scalar_subquery()
+    validator = db.session.execute(
+        select(Campaign.sponsor_id, Campaign.updated_at, CampaignRollup.total_requests, CampaignRollup.accepted_requests,
+               CampaignRollup.rejected_requests, CampaignRollup.pending_requests, CampaignRollup.spend,
+               CampaignRollup.niches, last_request.label('last_request'))
+        .outerjoin(CampaignRollup, CampaignRollup.campaign_id == Campaign.id)
+        .where(Campaign.id == campaign_id)
+    ).one_or_none()
+    if validator is None or validator.sponsor_id != session['id']:
+        return not_found("Campaign does not exist")
+    last_modified = max(filter(None, [validator.updated_at, validator.last_request]), default=None)
+
+    def build():
+        payload = to_dict(db.session.get(Campaign, campaign_id))
+        payload['tracking'] = {name: getattr(validator, name) or 0 for name in
+                               ('total_requests', 'accepted_requests', 'rejected_requests', 'pending_requests', 'spend', 'niches')}
+        return payload
+    return conditional(validator, last_modified, build)
+
+@app.route(f"{PREFIX}/influencers")
+@sponsor_required
+@query_budget(2)
+@read_only
+def api_influencers():
+    return collection(Influencer, [])
+
+@app.route(f"{PREFIX}/sponsors/<int:sponsor_id>/ad_requests")
+@sponsor_required
+@query_budget(2)
+@read_only
+def api_sponsor_ad_requests(sponsor_id):
+    if session['id'] != sponsor_id:
+        return not_found("Sponsor does not exist")
+    return collection(AdRequest, [AdRequest.sponsor_id == sponsor_id], descending=True)
+
+@app.route(f"{PREFIX}/influencers/<int:influencer_id>/ad_requests")
+@influencer_required
+@query_budget(2)
+@read_only
+def api_influencer_ad_requests(influencer_id):
+    if session['id'] != influencer_id:
+        return not_found("Influencer does not exist")
+    return collection(AdRequest, [AdRequest.influencer_id == influencer_id], descending=True)
+
+def decisions(party, owner_id):
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return error_response("Expected a JSON object", 400)
+    decision = payload.get('decision')
+    if decision not in transitions.DECISIONS:
+        return error_response("decision must be one of: " + ", ".join(transitions.DECISIONS), 400)
+    if 'ids' in payload:
+        if not isinstance(payload['ids'], list):
+            return error_response("ids must be a list", 400)
+        criteria, error = transitions.selection(party, owner_id, 'selected', ids=payload['ids'])
+    else:
+        filters = payload.get('filter') or {}
+        if not isinstance(filters, dict):
+            return error_response("filter must be an object", 400)
+        criteria, error = transitions.selection(party, owner_id, 'filtered', campaign_id=filters.get('campaign_id'),
+                                                status=filters.get('status'), awaiting=bool(filters.get('awaiting')))
+    if error:
+        return error_response(error, 400)
+    updated = transitions.bulk_decide(party, decision, criteria)
+    db.session.commit()
+    return jsonify(decision=decision, updated=updated)
+
+@app.route(f"{PREFIX}/sponsors/<int:sponsor_id>/ad_requests/decisions", methods=['POST'])
+@sponsor_required
+def api_sponsor_decisions(sponsor_id):
+    if session['id'] != sponsor_id:
+        return not_found("Sponsor does not exist")
+    return decisions('sponsor', sponsor_id)
+
+@app.route(f"{PREFIX}/influencers/<int:influencer_id>/ad_requests/decisions", methods=['POST'])
+@influencer_required
+def api_influencer_decisions(influencer_id):
+    if session['id'] != influencer_id:
+        return not_found("Influencer does not exist")
+    return decisions('influencer', influencer_id)
+
+@app.route(f"{PREFIX}/ad_requests/<int:ad_request_id>/messages")
+@auth_required
+@query_budget(3)
+@read_only
+def api_ad_request_messages(ad_request_id):
+    ad_request = db.session.execute(
+        select(AdRequest.sponsor_id, AdRequest.influencer_id).where(AdRequest.id == ad_request_id)
+    ).one_or_none()
+    if ad_request is None or not negotiation.is_party(ad_request, session['user_type'], session['id']):
+        return not_found("Ad request does not exist")
+    criteria = [NegotiationMessage.ad_request_id == ad_request_id]
+    since = request.args.get('since', type=int)
+    if since is None:
+        return collection(NegotiationMessage, criteria, descending=True, version=NegotiationMessage.created_at)
+
+    validator = collection_validator(NegotiationMessage, *criteria, NegotiationMessage.id > since, version=NegotiationMessage.created_at)
+
+    def build():
+        messages = negotiation.since(ad_request_id, since)
+        return {"items": [to_dict(message) for message in messages], "cursor": messages[-1].id if messages else since}
+    return conditional(validator, validator[2], build)
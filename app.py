@@ -1,10 +1,36 @@
 from flask import Flask
 
 app = Flask(__name__)
+initialized = False
 
-import config
-import models
-import routes
+def init_app():
+    # Not a factory: there is one module-global app, and every module
+    # registers its routes, hooks and CLI commands on it when imported. This
+    # imports them in order, binds the database and installs the template
+    # bytecode cache (which creates its directory, so it is not done at
+    # import), then returns that same app. Later calls are no-ops. No queries
+    # run here: schema creation and the default admin are `flask init-db`,
+    # and heavy libraries load on first use.
+    global initialized
+    if initialized:
+        return app
+    import config
+    import engine_profile
+    import replicas
+    from models import db
+    db.init_app(app)
+    import migrations
+    import routes
+    import api
+    import page_cache
+    page_cache.install_bytecode_cache()
+    initialized = True
+    return app
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    from app import init_app
+    from migrations import init_db
+    app = init_app()
+    with app.app_context():
+        init_db()
+    app.run(debug=True)
@@ -0,0 +1,118 @@
+# Read throughput while writes are in flight, per DATABASE_PROFILE. Reader
+# processes page through public campaigns while writer processes commit
+# ad request updates, all against one SQLite file; every profile gets its
+# own freshly seeded database since WAL mode persists in the file.
+#
+#   python benchmarks/concurrency.py --readers 4 --writers 2 --seconds 10
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark reads under concurrent writes")
+    parser.add_argument('--profiles', nargs='+', default=['default', 'production'])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--campaigns', type=int, default=5000)
+    return parser.parse_args()
+
+def load_app(uri, profile):
+    os.environ['SQLALCHEMY_DATABASE_URI'] = uri
+    os.environ['DATABASE_PROFILE'] = profile
+    sys.path.insert(0, ROOT)
+    from app import init_app
+    return init_app()
+
+def seed(uri, profile, campaigns):
+    app = load_app(uri, profile)
+    from migrations import init_db
+    from models import db, Sponsor, Influencer, Campaign, AdRequest
+    with app.app_context():
+        init_db()
+        sponsor = Sponsor(username='benchsponsor', passhash='-', name='Bench', budget=10 ** 6, industry='Tech')
+        influencer = Influencer(username='benchinfluencer', passhash='-', name='Bench', category='Tech', niche='Youtube', reach=1000)
+        db.session.add_all([sponsor, influencer])
+        db.session.flush()
+        start, end = date.today(), date.today() + timedelta(days=30)
+        rows = [Campaign(name=f'Campaign {n}', description='Benchmark campaign', start_date=start, end_date=end, budget=1000,
+                         visibility='public', goals='reach', requirements='post', payment_amount=100, sponsor_id=sponsor.id)
+                for n in range(campaigns)]
+        db.session.add_all(rows)
+        db.session.flush()
+        db.session.add_all([AdRequest(campaign_id=campaign.id, influencer_id=influencer.id, sponsor_id=sponsor.id,
+                                      messages='hi', requirements='post', payment_amount=100) for campaign in rows[:500]])
+        db.session.commit()
+
+def worker(role, uri, profile, start_at, seconds, results):
+    app = load_app(uri, profile)
+    from models import db, Campaign, AdRequest
+    latencies, errors = [], 0
+    with app.app_context():
+        request_ids = db.session.scalars(db.select(AdRequest.id)).all()
+        top = db.session.scalar(db.select(db.func.max(Campaign.id)))
+        db.session.rollback()
+        # Everyone starts together once the (slow) imports are done.
+        time.sleep(max(0, start_at - time.time()))
+        while time.time() < start_at + seconds:
+            start = time.perf_counter()
+            try:
+                if role == 'reader':
+                    Campaign.query.filter(Campaign.visibility == 'public', Campaign.id > random.randint(0, top)) \
+                        .order_by(Campaign.id).limit(50).all()
+                    db.session.rollback()
+                else:
+                    ad_request = db.session.get(AdRequest, random.choice(request_ids))
+                    ad_request.messages = f'update {random.random()}'
+                    db.session.commit()
+            except Exception:
+                db.session.rollback()
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+    results.put((role, latencies, errors))
+
+def run(profile, args):
+    uri = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    context = multiprocessing.get_context('spawn')
+    setup = context.Process(target=seed, args=(uri, profile, args.campaigns))
+    setup.start()
+    setup.join()
+    results = context.Queue()
+    start_at = time.time() + 5
+    processes = [context.Process(target=worker, args=(role, uri, profile, start_at, args.seconds, results))
+                 for role in ['reader'] * args.readers + ['writer'] * args.writers]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    def summary(role):
+        latencies = sorted(ms for kind, values, _ in collected if kind == role for ms in values)
+        errors = sum(count for kind, _, count in collected if kind == role)
+        if not latencies:
+            return 0, 0, 0, errors
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return len(latencies) / args.seconds, statistics.median(latencies), p95, errors
+
+    for role in ('reader', 'writer'):
+        per_second, p50, p95, errors = summary(role)
+        print(f"{profile:<12}{role + 's':<9}{per_second:>10.1f}{p50:>10.2f}{p95:>10.2f}{errors:>8}")
+
+def main():
+    args = parse_args()
+    print(f"{'profile':<12}{'role':<9}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    for profile in args.profiles:
+        run(profile, args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+# Seeds a synthetic marketplace into an empty database through the model
+# tables. Sizes scale linearly from --scale 1.0 = 100k influencers, 10k
+# sponsors, 200k campaigns and 2M ad requests. Rows are bulk inserted with
+# Core, so the derived tables (stat counters, rollups, facets, search index)
+# are rebuilt at the end exactly as their rebuild commands would.
+#
+#   python benchmarks/dataset.py --scale 0.1 --database /tmp/bench.sqlite3
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FULL_SIZE = {'influencers': 100_000, 'sponsors': 10_000, 'campaigns': 200_000, 'ad_requests': 2_000_000}
+CATEGORIES = ['Fashion', 'Tech', 'Fitness', 'Food', 'Travel', 'Gaming', 'Beauty', 'Music']
+NICHES = ['Instagram', 'Youtube', 'Tiktok', 'Twitter', 'Facebook', 'Blog', 'Podcast']
+INDUSTRIES = ['Tech', 'Fashion', 'Food', 'Finance', 'Health', 'Travel', 'Automotive', 'Education']
+WORDS = ['summer', 'launch', 'shoes', 'eco', 'fitness', 'gadget', 'review', 'unboxing', 'travel', 'festive',
+         'sale', 'skincare', 'coffee', 'gaming', 'series', 'challenge', 'recipe', 'budget', 'premium', 'collab']
+PASSWORD = 'Benchmark@123'
+BATCH = 10_000
+
+def sizes(scale):
+    return {name: max(1, int(count * scale)) for name, count in FULL_SIZE.items()}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Seed a synthetic AdConnect marketplace")
+    parser.add_argument('--scale', type=float, default=0.01, help="1.0 = 100k influencers / 2M ad requests")
+    parser.add_argument('--database', required=True, help="SQLite file to create")
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+def phrase(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+def influencers(rng, count, passhash):
+    for n in range(count):
+        yield {'username': f'inf{n}', 'passhash': passhash, 'name': 'Bench Influencer', 'category': rng.choice(CATEGORIES),
+               'niche': rng.choice(NICHES), 'reach': int(rng.lognormvariate(9, 1.5))}
+
+def sponsors(rng, count, passhash):
+    for n in range(count):
+        yield {'username': f'spon{n}', 'passhash': passhash, 'name': 'Bench Sponsor', 'budget': rng.randint(10_000, 10_000_000),
+               'industry': rng.choice(INDUSTRIES)}
+
+def campaigns(rng, count, sponsor_count):
+    today = date.today()
+    for n in range(count):
+        start = today + timedelta(days=rng.randint(-180, 60))
+        yield {'name': phrase(rng, 3).title(), 'description': phrase(rng, 12), 'start_date': start,
+               'end_date': start + timedelta(days=rng.randint(7, 120)), 'budget': float(rng.randint(1_000, 500_000)),
+               'visibility': 'public' if rng.random() < 0.8 else 'private', 'goals': phrase(rng, 6),
+               'payment_amount': float(rng.randint(50, 5_000)), 'requirements': phrase(rng, 4),
+               'sponsor_id': n % sponsor_count + 1}
+
+def ad_requests(rng, count, campaign_count, influencer_count, sponsor_count):
+    now = datetime.now()
+    for n in range(count):
+        campaign = n % campaign_count
+        # Requests for the same campaign walk through distinct influencers.
+        influencer = (n // campaign_count + campaign * 7919) % influencer_count
+        outcome = rng.random()
+        if outcome < 0.45:
+            status, sponsor_accepted, influencer_accepted = 'Accepted', True, True
+        elif outcome < 0.65:
+            status, sponsor_accepted, influencer_accepted = 'Rejected', rng.choice([False, True]), False
+        else:
+            sponsor_accepted, influencer_accepted = rng.choice([(None, None), (True, None), (None, True)])
+            status = 'Pending'
+        paid = status == 'Accepted' and rng.random() < 0.6
+        yield {'campaign_id': campaign + 1, 'influencer_id': influencer + 1, 'sponsor_id': campaign % sponsor_count + 1,
+               'messages': phrase(rng, 8), 'requirements': phrase(rng, 4), 'payment_amount': rng.randint(50, 5_000),
+               'status': status, 'sponsor_accepted': sponsor_accepted, 'influencer_accepted': influencer_accepted,
+               'payment_status': paid, 'paid_at': now - timedelta(days=rng.randint(0, 365)) if paid else None}
+
+def insert(conn, table, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            conn.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        conn.execute(table.insert(), batch)
+
+def seed(app, scale, seed_value=42):
+    from migrations import init_db
+    from models import db, Influencer, Sponsor, Campaign, AdRequest
+    import passwords
+    import stats
+    import rollups
+    import facets
+    import search
+
+    counts = sizes(scale)
+    rng = random.Random(seed_value)
+    with app.app_context():
+        init_db()
+        # Every synthetic account shares one hash; hashing millions of
+        # passwords would dominate the seeding time.
+        passhash = passwords.hash_password(PASSWORD)
+        with db.engine.begin() as conn:
+            insert(conn, Influencer.__table__, influencers(rng, counts['influencers'], passhash))
+            insert(conn, Sponsor.__table__, sponsors(rng, counts['sponsors'], passhash))
+            insert(conn, Campaign.__table__, campaigns(rng, counts['campaigns'], counts['sponsors']))
+            insert(conn, AdRequest.__table__, ad_requests(rng, counts['ad_requests'], counts['campaigns'],
+                                                          counts['influencers'], counts['sponsors']))
+            stats.rebuild(conn)
+            rollups.rebuild(conn)
+            facets.rebuild(conn)
+            search.backend(conn).rebuild(conn)
+    return counts
+
+def main():
+    args = parse_args()
+    if os.path.exists(args.database):
+        sys.exit(f"{args.database} already exists; seeding expects an empty database")
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.abspath(args.database)
+    sys.path.insert(0, ROOT)
+    from app import init_app
+    start = time.perf_counter()
+    counts = seed(init_app(), args.scale, args.seed)
+    print(', '.join(f"{count} {name}" for name, count in counts.items()) + f" in {time.perf_counter() - start:.1f}s")
+
+if __name__ == '__main__':
+    main()
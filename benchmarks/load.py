@@ -0,0 +1,254 @@
+# Drives the real routes with logged-in sponsor, influencer and admin sessions
+# using a weighted traffic mix, and writes per-route latency percentiles and
+# throughput, plus the whole run's peak RSS, to a JSON results file. Routes
+# share one process, so RSS cannot be split between them; instead a separate
+# pass after the timed run sends each route --memory-samples more times, one
+# request at a time under tracemalloc, and records the peak Python heap
+# allocated above the level before the request (tracemalloc is process-wide,
+# so this pass must not overlap other requests, and its overhead stays out
+# of the latency figures). Pass --compare with an earlier results file to
+# print the change per route.
+#
+#   python benchmarks/dataset.py --scale 0.1 --database /tmp/bench.sqlite3
+#   python benchmarks/load.py --database /tmp/bench.sqlite3 --requests 5000 --output after.json --compare before.json
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dataset
+
+# Each entry: route name -> (weight, role, request builder). Builders get the
+# worker's context (its own sponsor / influencer ids and a seeded RNG) and
+# return (method, url, form data).
+MIXES = {
+    'marketplace': {
+        'search_influencer_post': (15, 'sponsor', lambda ctx: ('POST', '/sponsor/search', {
+            'category': ctx.rng.choice(dataset.CATEGORIES), 'niche': ctx.rng.choice(dataset.NICHES + ['']),
+            'reach': str(ctx.rng.choice(['', 1000, 10000]))})),
+        'show_ad_requests_sponsor': (10, 'sponsor', lambda ctx: ('GET', f'/sponsor/{ctx.sponsor_id}/show_ad_requests_sponsor', None)),
+        'show_campaigns': (10, 'sponsor', lambda ctx: ('GET', f'/sponsor/{ctx.sponsor_id}/show_campaigns', None)),
+        'track_campaign': (8, 'sponsor', lambda ctx: ('GET', f'/campaign/{ctx.rng.randint(1, ctx.counts["campaigns"])}/track', None)),
+        'search_campaigns': (12, 'influencer', lambda ctx: ('GET', f'/influencer/{ctx.influencer_id}/search_campaigns', None)),
+        'search_campaigns_post': (10, 'influencer', lambda ctx: ('POST', f'/influencer/{ctx.influencer_id}/search_campaigns', {
+            'industry': ctx.rng.choice(dataset.INDUSTRIES + ['']), 'budget': '',
+            'q': ctx.rng.choice(dataset.WORDS + [''])})),
+        'show_ad_requests': (10, 'influencer', lambda ctx: ('GET', f'/influencer/{ctx.influencer_id}/show_ad_requests', None)),
+        'api_campaigns': (8, 'influencer', lambda ctx: ('GET', '/api/v1/campaigns', None)),
+        'admin_home': (5, 'admin', lambda ctx: ('GET', '/admin/home', None)),
+        'manage_campaigns': (2, 'admin', lambda ctx: ('GET', '/admin/manage_campaigns', None)),
+    },
+    'dashboards': {
+        'search_influencer_post': (1, 'sponsor', lambda ctx: ('POST', '/sponsor/search', {
+            'category': ctx.rng.choice(dataset.CATEGORIES), 'niche': '', 'reach': ''})),
+        'show_ad_requests_sponsor': (1, 'sponsor', lambda ctx: ('GET', f'/sponsor/{ctx.sponsor_id}/show_ad_requests_sponsor', None)),
+        'admin_home': (1, 'admin', lambda ctx: ('GET', '/admin/home', None)),
+    },
+}
+
+class WorkerContext:
+    def __init__(self, app, counts, seed):
+        self.rng = random.Random(seed)
+        self.counts = counts
+        self.sponsor_id = self.rng.randint(1, counts['sponsors'])
+        self.influencer_id = self.rng.randint(1, counts['influencers'])
+        self.clients = {
+            'sponsor': login(app, 'sponsor', f'spon{self.sponsor_id - 1}', dataset.PASSWORD),
+            'influencer': login(app, 'influencer', f'inf{self.influencer_id - 1}', dataset.PASSWORD),
+            'admin': login(app, 'admin', 'admin', 'admin'),
+        }
+
+def login(app, user_type, username, password):
+    client = app.test_client()
+    response = client.post('/login', data={'user_type': user_type, 'username': username, 'password': password})
+    if response.status_code != 302 or 'login' in response.headers.get('Location', ''):
+        raise SystemExit(f"could not log in as {user_type} {username}")
+    return client
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test the AdConnect routes")
+    parser.add_argument('--database', help="seeded SQLite file (see dataset.py); seeds a temporary one if omitted")
+    parser.add_argument('--scale', type=float, default=0.01, help="dataset scale when seeding a temporary database")
+    parser.add_argument('--mix', choices=list(MIXES), default='marketplace')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--warmup', type=int, default=3, help="untimed requests per route before measuring")
+    parser.add_argument('--memory-samples', type=int, default=20, help="serialized requests per route traced for memory (0 to skip)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    return parser.parse_args()
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def table_counts(app):
+    from models import db, Influencer, Sponsor, Campaign, AdRequest
+    with app.app_context():
+        return {name: db.session.query(model).count() for name, model in
+                [('influencers', Influencer), ('sponsors', Sponsor), ('campaigns', Campaign), ('ad_requests', AdRequest)]}
+
+def measure_allocations(ctx, names, send, samples):
+    """Per route, the sorted peak heap growth in KB of each of `samples`
+    requests sent one after another from a single worker."""
+    allocations = {name: [] for name in names}
+    if samples <= 0:
+        return allocations
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            for name in names:
+                before = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                send(ctx, name)
+                allocations[name].append(round((tracemalloc.get_traced_memory()[1] - before) / 1024, 1))
+    finally:
+        tracemalloc.stop()
+    for values in allocations.values():
+        values.sort()
+    return allocations
+
+def run(app, counts, args):
+    mix = MIXES[args.mix]
+    names = list(mix)
+    schedule = random.Random(args.seed).choices(names, weights=[mix[name][0] for name in names], k=args.requests)
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    position = iter(range(len(schedule)))
+    contexts = [WorkerContext(app, counts, args.seed + number) for number in range(args.workers)]
+
+    def send(ctx, name):
+        _, role, build = mix[name]
+        method, url, data = build(ctx)
+        start = time.perf_counter()
+        response = ctx.clients[role].open(url, method=method, data=data)
+        return (time.perf_counter() - start) * 1000, response.status_code
+
+    for name in names:
+        for _ in range(args.warmup):
+            send(contexts[0], name)
+
+    def work(ctx):
+        while True:
+            with lock:
+                index = next(position, None)
+            if index is None:
+                return
+            name = schedule[index]
+            elapsed, status = send(ctx, name)
+            with lock:
+                samples[name].append(elapsed)
+                if status != 200:
+                    errors[name] += 1
+
+    threads = [threading.Thread(target=work, args=(ctx,)) for ctx in contexts]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+    allocations = measure_allocations(contexts[0], names, send, args.memory_samples)
+
+    routes = {}
+    for name in names:
+        values = sorted(samples[name])
+        routes[name] = {
+            'count': len(values),
+            'errors': errors[name],
+            'p50_ms': percentile(values, 0.50),
+            'p95_ms': percentile(values, 0.95),
+            'p99_ms': percentile(values, 0.99),
+            'mean_ms': sum(values) / len(values) if values else None,
+            'max_ms': values[-1] if values else None,
+            'throughput_rps': len(values) / duration,
+            'alloc_p50_kb': percentile(allocations[name], 0.50),
+            'alloc_max_kb': allocations[name][-1] if allocations[name] else None,
+        }
+    overall = {
+        'requests': len(schedule),
+        'errors': sum(errors.values()),
+        'duration_s': duration,
+        'throughput_rps': len(schedule) / duration,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    return overall, routes
+
+def memory(route):
+    return '-' if route.get('alloc_max_kb') is None else f"{route['alloc_max_kb']:.0f}"
+
+def report(results, baseline):
+    print(f"{'route':<28}{'count':>7}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>8}{'alloc KB':>10}  vs baseline p50/p95")
+    for name, route in results['routes'].items():
+        change = ''
+        before = (baseline or {}).get('routes', {}).get(name)
+        if before and before.get('p50_ms') and route['p50_ms'] is not None:
+            change = f"{(route['p50_ms'] / before['p50_ms'] - 1) * 100:+.0f}% / {(route['p95_ms'] / before['p95_ms'] - 1) * 100:+.0f}%"
+        if route['count'] == 0:
+            print(f"{name:<28}{0:>7}")
+            continue
+        print(f"{name:<28}{route['count']:>7}{route['errors']:>5}{route['p50_ms']:>9.2f}{route['p95_ms']:>9.2f}"
+              f"{route['p99_ms']:>9.2f}{route['throughput_rps']:>8.1f}{memory(route):>10}  {change}")
+    overall = results['overall']
+    print(f"{overall['requests']} requests in {overall['duration_s']:.1f}s ({overall['throughput_rps']:.1f} req/s), "
+          f"{overall['errors']} errors, peak RSS {overall['peak_rss_mb']} MB")
+
+def main():
+    args = parse_args()
+    database = args.database or os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.abspath(database)
+    sys.path.insert(0, ROOT)
+    from app import init_app
+    app = init_app()
+    if not args.database:
+        dataset.seed(app, args.scale, args.seed)
+    counts = table_counts(app)
+
+    overall, routes = run(app, counts, args)
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'database': os.path.abspath(database),
+            'dataset': counts,
+            'mix': args.mix,
+            'workers': args.workers,
+            'memory_samples': args.memory_samples,
+            'seed': args.seed,
+        },
+        'overall': overall,
+        'routes': routes,
+    }
+    with open(args.output, 'w') as output:
+        json.dump(results, output, indent=2)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as previous:
+            baseline = json.load(previous)
+    report(results, baseline)
+    print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# Reports hashing throughput and end-to-end login latency for a set of
+# PASSWORD_HASH_METHOD values, to help size workers for login traffic.
+#
+#   python benchmarks/password_hashing.py --methods scrypt pbkdf2:sha256:600000
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark password hashing settings")
+    parser.add_argument('--methods', nargs='+', default=['scrypt', 'scrypt:16384:8:1', 'pbkdf2:sha256:600000', 'pbkdf2:sha256:100000'])
+    parser.add_argument('--hashes', type=int, default=20, help="hashes to time per method")
+    parser.add_argument('--logins', type=int, default=20, help="logins to time per method")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    db_dir = tempfile.mkdtemp()
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(db_dir, 'bench.sqlite3')
+    sys.path.insert(0, ROOT)
+    from app import init_app
+    from migrations import init_db
+    from models import db, Influencer
+    import passwords
+
+    app = init_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        init_db()
+    client = app.test_client()
+    print(f"{'method':<28}{'hashes/s':>10}{'login p50 ms':>14}{'login p95 ms':>14}")
+    for number, method in enumerate(args.methods):
+        app.config['PASSWORD_HASH_METHOD'] = method
+        start = time.perf_counter()
+        for _ in range(args.hashes):
+            passwords.hash_password('Benchmark@123')
+        hashes_per_second = args.hashes / (time.perf_counter() - start)
+
+        username = f"bench{number}"
+        with app.app_context():
+            db.session.add(Influencer(username=username, passhash=passwords.hash_password('Benchmark@123'),
+                                      name='Bench', category='Bench', niche='Bench', reach=0))
+            db.session.commit()
+        latencies = []
+        for _ in range(args.logins):
+            start = time.perf_counter()
+            client.post('/login', data={'user_type': 'influencer', 'username': username, 'password': 'Benchmark@123'})
+            latencies.append((time.perf_counter() - start) * 1000)
+            client.get('/logout')
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{method:<28}{hashes_per_second:>10.1f}{statistics.median(latencies):>14.1f}{p95:>14.1f}")
+
+if __name__ == '__main__':
+    main()
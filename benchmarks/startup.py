@@ -0,0 +1,95 @@
+# Measures cold start: process spawn to app ready (import time) and to the
+# first response, in fresh interpreters, for the working tree and optionally
+# an older revision for comparison. Each tree gets its own database, set up
+# once before timing so runs reflect a worker spawning against a live schema.
+#
+#   python benchmarks/startup.py --runs 10 --ref HEAD~1
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child. Older trees build the app as an import side effect and
+# have no init_app()/init_db() (some have the same initializer under its old
+# name, create_app()), so all of them are optional.
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import app as module
+initializer = getattr(module, 'init_app', None) or getattr(module, 'create_app', None)
+application = initializer() if initializer else module.app
+if sys.argv[2] == 'setup':
+    try:
+        from migrations import init_db
+    except ImportError:
+        init_db = None
+    if init_db is not None:
+        with application.app_context():
+            init_db()
+    sys.exit()
+ready = time.perf_counter()
+application.config['TESTING'] = True
+status = application.test_client().get(sys.argv[3]).status_code
+done = time.perf_counter()
+print(json.dumps({
+    "import_ms": (ready - start) * 1000,
+    "first_request_ms": (done - ready) * 1000,
+    "status": status,
+    "heavy_modules": sorted(name for name in ('numpy', 'reportlab') if name in sys.modules),
+}))
+"""
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark application cold start")
+    parser.add_argument('--runs', type=int, default=10, help="fresh interpreters per tree")
+    parser.add_argument('--path', default='/login', help="URL requested as the first request")
+    parser.add_argument('--ref', help="also benchmark this git revision (e.g. HEAD~1) for comparison")
+    return parser.parse_args()
+
+def export_tree(ref):
+    target = tempfile.mkdtemp(prefix='adconnect-')
+    archive = subprocess.run(['git', 'archive', ref], cwd=ROOT, check=True, capture_output=True).stdout
+    subprocess.run(['tar', '-x', '-C', target], input=archive, check=True)
+    return target
+
+def run_child(tree, env, mode, path):
+    result = subprocess.run([sys.executable, '-c', CHILD, tree, mode, path], cwd=tree, env=env,
+                            check=True, capture_output=True, text=True)
+    return result.stdout
+
+def measure(tree, runs, path):
+    env = dict(os.environ, SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.sqlite3'))
+    run_child(tree, env, 'setup', path)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = run_child(tree, env, 'measure', path)
+        sample = json.loads(output.strip().splitlines()[-1])
+        sample['process_ms'] = (time.perf_counter() - start) * 1000
+        samples.append(sample)
+    return samples
+
+def report(label, samples):
+    def median(key):
+        return statistics.median(sample[key] for sample in samples)
+    heavy = ', '.join(samples[-1]['heavy_modules']) or '-'
+    print(f"{label:<14}{median('import_ms'):>12.1f}{median('first_request_ms'):>18.1f}{median('process_ms'):>14.1f}  {heavy}")
+
+def main():
+    args = parse_args()
+    trees = [('working tree', ROOT)]
+    if args.ref:
+        trees.insert(0, (args.ref, export_tree(args.ref)))
+    print(f"{'tree':<14}{'import ms':>12}{'first request ms':>18}{'process ms':>14}  heavy modules loaded")
+    for label, tree in trees:
+        report(label, measure(tree, args.runs, args.path))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+from app import app
+import click
+import csv
+import io
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+from models import db, Influencer, Sponsor, Campaign
+import passwords
+from validation import check_registration, check_campaign
+
+# Bulk onboarding from CSV/NDJSON files. Columns are the sign-up / campaign
+# form field names (campaigns also carry a `sponsor` username), and every row
+# goes through the same checks as the forms. Rows are handled in batches of
+# IMPORT_BATCH_SIZE: one username lookup per batch, passwords hashed across
+# IMPORT_WORKERS processes, then a single flush and commit. Inserts still go
+# through the session so the counter, rollup, facet and search hooks see them.
+# A bad row is reported and skipped; it never aborts the rest of the file,
+# not even when the database only rejects it at commit time.
+
+ENTITIES = {
+    'influencers': Influencer,
+    'sponsors': Sponsor,
+    'campaigns': Campaign,
+}
+USER_TYPES = {'influencers': 'influencer', 'sponsors': 'sponsor'}
+
+ImportResult = namedtuple('ImportResult', ['imported', 'errors'])
+
+def file_format(filename):
+    return 'ndjson' if os.path.splitext(filename)[1].lower() in ('.ndjson', '.jsonl', '.json') else 'csv'
+
+def read_rows(stream, fmt):
+    if fmt == 'csv':
+        # DictReader consumes the header, so data starts on line 2.
+        yield from enumerate(csv.DictReader(stream), start=2)
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+def text_fields(row):
+    return {key: str(value).strip() for key, value in row.items() if key and value is not None}
+
+def hash_passwords(plaintexts, executor, workers):
+    # Hash with the configured policy but without touching the app in the
+    # worker processes; only werkzeug needs to be importable there.
+    method, salt_length = passwords.policy()
+    hasher = partial(generate_password_hash, method=method, salt_length=salt_length)
+    if executor is None:
+        return [hasher(password) for password in plaintexts]
+    chunksize = max(1, len(plaintexts) // (workers * 4))
+    return list(executor.map(hasher, plaintexts, chunksize=chunksize))
+
+def prepare_users(entity, batch, errors):
+    model = ENTITIES[entity]
+    accepted = []
+    for line_number, row in batch:
+        if row is None:
+            errors.append((line_number, "Error : Row is not a JSON object"))
+            continue
+        fields = text_fields(row)
+        fields['user_type'] = USER_TYPES[entity]
+        fields.setdefault('confirm_password', fields.get('password'))
+        user_class, attrs, error = check_registration(fields)
+        if error:
+            errors.append((line_number, error))
+            continue
+        accepted.append((line_number, attrs, fields['password']))
+
+    usernames = [attrs['username'] for _, attrs, _ in accepted]
+    taken = set(db.session.scalars(db.select(model.username).where(model.username.in_(usernames))))
+    rows = []
+    for line_number, attrs, password in accepted:
+        if attrs['username'] in taken:
+            errors.append((line_number, "Error: Username already taken"))
+            continue
+        taken.add(attrs['username'])
+        rows.append((line_number, attrs, password))
+    return rows
+
+def prepare_campaigns(batch, errors):
+    accepted = []
+    for line_number, row in batch:
+        if row is None:
+            errors.append((line_number, "Error : Row is not a JSON object"))
+            continue
+        fields = text_fields(row)
+        attrs, error = check_campaign(fields)
+        if error:
+            errors.append((line_number, error))
+            continue
+        accepted.append((line_number, attrs, fields.get('sponsor')))
+
+    names = {sponsor for _, _, sponsor in accepted if sponsor}
+    sponsor_ids = dict(db.session.execute(db.select(Sponsor.username, Sponsor.id).where(Sponsor.username.in_(names))).all())
+    rows = []
+    for line_number, attrs, sponsor in accepted:
+        if sponsor not in sponsor_ids:
+            errors.append((line_number, f"Error : Sponsor {sponsor!r} not found" if sponsor else "Error : Please enter all required fields"))
+            continue
+        rows.append((line_number, dict(attrs, sponsor_id=sponsor_ids[sponsor])))
+    return rows
+
+def integrity_message(error):
+    detail = str(getattr(error, 'orig', error))
+    if 'username' in detail:
+        return "Error: Username already taken"
+    return f"Error : Row violates a database constraint ({detail})"
+
+def save(model, rows, errors):
+    """Inserts rows of (line_number, attrs) in one commit. If the database
+    rejects the batch (another writer took a username after the batch
+    lookup, a sponsor was deleted, ...), it is split in halves and retried
+    until the offending rows are isolated; the rest are still imported."""
+    if not rows:
+        return 0
+    db.session.add_all([model(**attrs) for _, attrs in rows])
+    try:
+        db.session.commit()
+    except IntegrityError as error:
+        db.session.rollback()
+        if len(rows) == 1:
+            errors.append((rows[0][0], integrity_message(error)))
+            return 0
+        middle = len(rows) // 2
+        return save(model, rows[:middle], errors) + save(model, rows[middle:], errors)
+    db.session.expunge_all()
+    return len(rows)
+
+def import_rows(entity, rows):
+    model = ENTITIES[entity]
+    batch_size = app.config.get('IMPORT_BATCH_SIZE', 5000)
+    workers = app.config.get('IMPORT_WORKERS') or os.cpu_count() or 1
+    errors = []
+    imported = 0
+    rows = iter(rows)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and entity in USER_TYPES else None
+    try:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            if entity in USER_TYPES:
+                prepared = prepare_users(entity, batch, errors)
+                hashes = hash_passwords([password for _, _, password in prepared], executor, workers)
+                prepared = [(line_number, dict(attrs, passhash=passhash)) for (line_number, attrs, _), passhash in zip(prepared, hashes)]
+            else:
+                prepared = prepare_campaigns(batch, errors)
+            imported += save(model, prepared, errors)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    errors.sort()
+    return ImportResult(imported, errors)
+
+def import_file(entity, stream, fmt):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    return import_rows(entity, read_rows(text, fmt))
+
+@app.cli.command("import")
+@click.argument("entity", type=click.Choice(list(ENTITIES)))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(['csv', 'ndjson']), help="Defaults to the file extension.")
+def import_command(entity, path, fmt):
+    with open(path, 'rb') as stream:
+        result = import_file(entity, stream, fmt or file_format(path))
+    for line_number, error in result.errors:
+        print(f"line {line_number}: {error}")
+    print(f"Imported {result.imported} {entity}, {len(result.errors)} rows rejected")
@@ -5,4 +5,42 @@ from dotenv import load_dotenv
 load_dotenv()
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = os.getenv('SQLALCHEMY_TRACK_MODIFCATIONS')
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
\ No newline at end of file
+app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
+app.config['SQL_STATS_HEADERS'] = os.getenv('SQL_STATS_HEADERS', 'False') == 'True'
+app.config['SQL_QUERY_BUDGET_STRICT'] = os.getenv('SQL_QUERY_BUDGET_STRICT', 'False') == 'True'
+app.config['FLAG_INDEX_MAX_AGE'] = float(os.getenv('FLAG_INDEX_MAX_AGE', 60))
+app.config['FLAG_INDEX_VERSION_FILE'] = os.getenv('FLAG_INDEX_VERSION_FILE')
+app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+app.config['PASSWORD_SALT_LENGTH'] = int(os.getenv('PASSWORD_SALT_LENGTH', 16))
+app.config['PAGE_SIZE'] = int(os.getenv('PAGE_SIZE', 50))
+app.config['MAX_PAGE_SIZE'] = int(os.getenv('MAX_PAGE_SIZE', 200))
+app.config['CAMPAIGN_SEARCH_BACKEND'] = os.getenv('CAMPAIGN_SEARCH_BACKEND', 'auto')
+app.config['SEARCH_RESULT_LIMIT'] = int(os.getenv('SEARCH_RESULT_LIMIT', 50))
+app.config['MATCHING_TOP_K'] = int(os.getenv('MATCHING_TOP_K', 20))
+app.config['MATCHING_SNAPSHOT_TTL'] = int(os.getenv('MATCHING_SNAPSHOT_TTL', 300))
+app.config['INVOICE_CACHE_DIR'] = os.getenv('INVOICE_CACHE_DIR')
+app.config['INVOICE_CACHE_MAX_BYTES'] = int(os.getenv('INVOICE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+app.config['EXPORT_BATCH_SIZE'] = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+app.config['IMPORT_BATCH_SIZE'] = int(os.getenv('IMPORT_BATCH_SIZE', 5000))
+app.config['IMPORT_WORKERS'] = int(os.getenv('IMPORT_WORKERS', 0))
+app.config['PAGE_CACHE_TTL'] = int(os.getenv('PAGE_CACHE_TTL', 300))
+app.config['TEMPLATE_CACHE_DIR'] = os.getenv('TEMPLATE_CACHE_DIR')
+app.config['DATABASE_PROFILE'] = os.getenv('DATABASE_PROFILE', 'default')
+app.config['DATABASE_POOL_SIZE'] = int(os.getenv('DATABASE_POOL_SIZE', 10))
+app.config['DATABASE_MAX_OVERFLOW'] = int(os.getenv('DATABASE_MAX_OVERFLOW', 20))
+app.config['DATABASE_POOL_TIMEOUT'] = int(os.getenv('DATABASE_POOL_TIMEOUT', 30))
+app.config['DATABASE_POOL_RECYCLE'] = int(os.getenv('DATABASE_POOL_RECYCLE', 1800))
+app.config['SQLITE_SYNCHRONOUS'] = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+app.config['SQLITE_CACHE_SIZE_KB'] = int(os.getenv('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+app.config['SQLITE_MMAP_SIZE'] = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+app.config['DATABASE_REPLICA_URIS'] = os.getenv('DATABASE_REPLICA_URIS')
+app.config['REPLICA_READ_YOUR_WRITES_SECONDS'] = float(os.getenv('REPLICA_READ_YOUR_WRITES_SECONDS', 10))
+app.config['FANOUT_LIMIT'] = int(os.getenv('FANOUT_LIMIT', 1000))
+app.config['EVENT_BUS'] = os.getenv('EVENT_BUS', 'local')
+app.config['EVENTS_POLL_SECONDS'] = float(os.getenv('EVENTS_POLL_SECONDS', 0.5))
+app.config['EVENTS_RETENTION_SECONDS'] = int(os.getenv('EVENTS_RETENTION_SECONDS', 3600))
+app.config['EVENTS_HEARTBEAT_SECONDS'] = float(os.getenv('EVENTS_HEARTBEAT_SECONDS', 15))
+app.config['EVENTS_STREAMS'] = os.getenv('EVENTS_STREAMS', 'auto')
+app.config['EVENTS_STREAM_SECONDS'] = float(os.getenv('EVENTS_STREAM_SECONDS', 30))
+app.config['EVENTS_QUEUE_SIZE'] = int(os.getenv('EVENTS_QUEUE_SIZE', 1000))
\ No newline at end of file
@@ -0,0 +1,54 @@
+from app import app
+import sqlite3
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+# DATABASE_PROFILE picks how the engine is tuned. "default" leaves SQLAlchemy's
+# defaults alone. "production" sizes the connection pool from the
+# DATABASE_POOL_* settings (for SQLite files as well as PostgreSQL) and, on
+# SQLite, switches the database to WAL on connect along with the SQLITE_*
+# pragmas. In WAL mode a commit no longer blocks readers, and busy_timeout
+# makes concurrent writers queue instead of failing with "database is locked".
+# Anything set explicitly in SQLALCHEMY_ENGINE_OPTIONS wins.
+
+def production():
+    return app.config.get('DATABASE_PROFILE') == 'production'
+
+def engine_options():
+    if not production():
+        return {}
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    options = {
+        'pool_size': app.config['DATABASE_POOL_SIZE'],
+        'max_overflow': app.config['DATABASE_MAX_OVERFLOW'],
+        'pool_timeout': app.config['DATABASE_POOL_TIMEOUT'],
+    }
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return {}
+        options['connect_args'] = {'timeout': app.config['SQLITE_BUSY_TIMEOUT_MS'] / 1000}
+    else:
+        options['pool_recycle'] = app.config['DATABASE_POOL_RECYCLE']
+        options['pool_pre_ping'] = True
+    return options
+
+def sqlite_pragmas():
+    return [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={app.config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA cache_size=-{app.config['SQLITE_CACHE_SIZE_KB']}",
+        f"PRAGMA mmap_size={app.config['SQLITE_MMAP_SIZE']}",
+        f"PRAGMA busy_timeout={app.config['SQLITE_BUSY_TIMEOUT_MS']}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+@event.listens_for(Engine, 'connect')
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if not production() or not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma in sqlite_pragmas():
+        cursor.execute(pragma)
+    cursor.close()
+
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**engine_options(), **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
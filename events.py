@@ -0,0 +1,217 @@
+from app import app
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import Response, request
+from sqlalchemy import event, select, insert, delete, func
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from models import db, AdRequest, OutboxEvent
+import exports
+
+# Live ad request updates over server-sent events. Every committed change to
+# an ad request (decisions, payment, negotiation messages, new and deleted
+# requests) becomes an event for its sponsor and its influencer. The ad
+# request listings and the negotiation pages each hold one /events stream fed
+# by an in-process bus.
+#
+# A stream occupies a request worker for as long as it is open (up to
+# EVENTS_STREAM_SECONDS before the browser reconnects), so streams need a
+# threaded or async server: the dev server, gunicorn with gthread workers,
+# or gevent/eventlet workers. EVENTS_STREAMS=auto serves them only when the
+# server reports wsgi.multithread, and answers 204 otherwise, which tells
+# EventSource to stop reconnecting; the pages then simply update on reload.
+# Set it to on for async workers, which do not report multithread, or off
+# to disable live updates.
+#
+# ORM changes are picked up in after_flush like the stat counters; the Core
+# bulk paths call record() themselves. Events only leave the transaction
+# when it commits:
+#   EVENT_BUS=local     delivered to this process's bus after commit. Enough
+#                       for the single-process dev server.
+#   EVENT_BUS=database  written to event_outbox inside the transaction; each
+#                       worker runs a relay thread that polls the outbox and
+#                       feeds its own bus, so every worker sees every event.
+#                       A stand-in for a real broker: SQLite serializes
+#                       writers, so ids become visible in order. Streams that
+#                       reconnect with Last-Event-ID are replayed from it.
+FIELDS = ['id', 'campaign_id', 'sponsor_id', 'influencer_id', 'status', 'sponsor_accepted', 'influencer_accepted',
+          'payment_status', 'payment_amount', 'messages']
+TRACKED = ['status', 'sponsor_accepted', 'influencer_accepted', 'payment_status', 'payment_amount', 'messages']
+PARTIES = ['sponsor', 'influencer']
+RECONNECT_MS = 1000
+
+class Bus:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+        self.ids = itertools.count(1)
+
+    def subscribe(self, key):
+        subscription = queue.Queue(maxsize=app.config['EVENTS_QUEUE_SIZE'])
+        with self.lock:
+            self.subscribers[key].add(subscription)
+        return subscription
+
+    def unsubscribe(self, key, subscription):
+        with self.lock:
+            self.subscribers[key].discard(subscription)
+            if not self.subscribers[key]:
+                del self.subscribers[key]
+
+    def publish(self, key, message):
+        with self.lock:
+            subscriptions = list(self.subscribers.get(key, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.put_nowait(message)
+            except queue.Full:
+                # A stalled client loses events rather than memory; its page
+                # catches up on the next full load.
+                pass
+
+bus = Bus()
+
+class Relay:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.last_id = 0
+        self.pruned_at = 0.0
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            with db.engine.connect() as conn:
+                self.last_id = conn.execute(select(func.max(OutboxEvent.id))).scalar() or 0
+            self.thread = threading.Thread(target=self.run, name='event-relay', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        with app.app_context():
+            while True:
+                try:
+                    self.poll()
+                except Exception:
+                    app.logger.exception("Event relay poll failed")
+                time.sleep(app.config['EVENTS_POLL_SECONDS'])
+
+    def poll(self):
+        with db.engine.connect() as conn:
+            rows = conn.execute(select(OutboxEvent.id, OutboxEvent.user_type, OutboxEvent.user_id, OutboxEvent.kind, OutboxEvent.payload)
+                                .where(OutboxEvent.id > self.last_id).order_by(OutboxEvent.id).limit(1000)).all()
+            for row in rows:
+                bus.publish((row.user_type, row.user_id), (row.id, row.kind, row.payload))
+                self.last_id = row.id
+            retention = app.config['EVENTS_RETENTION_SECONDS']
+            if time.monotonic() - self.pruned_at > retention / 10:
+                conn.execute(delete(OutboxEvent).where(OutboxEvent.created_at < datetime.now() - timedelta(seconds=retention)))
+                conn.commit()
+                self.pruned_at = time.monotonic()
+
+relay = Relay()
+
+def columns():
+    return [getattr(AdRequest, name) for name in FIELDS]
+
+def payload_of(row):
+    return {name: exports.serialize(row[name]) for name in FIELDS if name in row}
+
+def record(session, kind, rows):
+    """Queues an event per row (mappings with at least id, sponsor_id and
+    influencer_id) for both parties of each ad request."""
+    entries = []
+    for row in rows:
+        row = dict(row._mapping) if hasattr(row, '_mapping') else row
+        payload = json.dumps(payload_of(row))
+        entries.extend({'user_type': party, 'user_id': row[f'{party}_id'], 'kind': kind, 'payload': payload}
+                       for party in PARTIES if row.get(f'{party}_id') is not None)
+    if not entries:
+        return
+    if app.config['EVENT_BUS'] == 'database':
+        session.connection().execute(insert(OutboxEvent), [{**entry, 'created_at': datetime.now()} for entry in entries])
+    else:
+        session.info.setdefault('events', []).extend(entries)
+
+def snapshot(obj):
+    return {name: getattr(obj, name) for name in FIELDS}
+
+@event.listens_for(Session, 'after_flush')
+def record_ad_request_changes(session, flush_context):
+    changed = [snapshot(obj) for obj in session.new if isinstance(obj, AdRequest)]
+    changed += [snapshot(obj) for obj in session.dirty if isinstance(obj, AdRequest)
+                and any(get_history(obj, name).has_changes() for name in TRACKED)]
+    deleted = [{name: getattr(obj, name) for name in ('id', 'sponsor_id', 'influencer_id')}
+               for obj in session.deleted if isinstance(obj, AdRequest)]
+    record(session, 'ad_request', changed)
+    record(session, 'ad_request_deleted', deleted)
+
+@event.listens_for(Session, 'after_commit')
+def deliver_events(session):
+    for entry in session.info.pop('events', []):
+        bus.publish((entry['user_type'], entry['user_id']), (next(bus.ids), entry['kind'], entry['payload']))
+
+@event.listens_for(Session, 'after_rollback')
+def discard_events(session):
+    session.info.pop('events', None)
+
+def replay(key, last_event_id):
+    user_type, user_id = key
+    return [(row.id, row.kind, row.payload) for row in db.session.execute(
+        select(OutboxEvent.id, OutboxEvent.kind, OutboxEvent.payload)
+        .where(OutboxEvent.user_type == user_type, OutboxEvent.user_id == user_id, OutboxEvent.id > last_event_id)
+        .order_by(OutboxEvent.id).limit(1000))]
+
+def format_event(message):
+    event_id, kind, payload = message
+    return f"id: {event_id}\nevent: {kind}\ndata: {payload}\n\n"
+
+def streams_enabled():
+    setting = app.config['EVENTS_STREAMS']
+    if setting == 'auto':
+        return bool(request.environ.get('wsgi.multithread'))
+    return setting == 'on'
+
+def stream(key, last_event_id=None):
+    """An SSE response for one user's events. It holds its worker thread
+    until it ends after EVENTS_STREAM_SECONDS and the browser reconnects,
+    or 204 No Content when streams are disabled on this server."""
+    if not streams_enabled():
+        return Response(status=204)
+    durable = app.config['EVENT_BUS'] == 'database'
+    if durable:
+        relay.start()
+    subscription = bus.subscribe(key)
+    backlog = replay(key, last_event_id) if durable and last_event_id is not None else []
+    # The stream outlives the request's use of the database.
+    db.session.remove()
+    heartbeat = app.config['EVENTS_HEARTBEAT_SECONDS']
+    deadline = time.monotonic() + app.config['EVENTS_STREAM_SECONDS']
+
+    def generate():
+        sent = (last_event_id or 0) if durable else 0
+        yield f"retry: {RECONNECT_MS}\n\n"
+        for message in backlog:
+            sent = message[0]
+            yield format_event(message)
+        while time.monotonic() < deadline:
+            try:
+                message = subscription.get(timeout=min(heartbeat, max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            if durable and message[0] <= sent:
+                continue
+            sent = message[0]
+            yield format_event(message)
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.call_on_close(lambda: bus.unsubscribe(key, subscription))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
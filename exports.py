@@ -0,0 +1,66 @@
+from app import app
+import csv
+import io
+import json
+from datetime import date, datetime
+from sqlalchemy import select
+from models import db, Admin, Sponsor, Influencer, Campaign, AdRequest, Flag, NegotiationMessage
+
+# Machine-readable dumps of the main tables. Rows are read in keyset batches
+# of EXPORT_BATCH_SIZE, each on its own short-lived connection, so an export
+# never holds a read transaction (and on SQLite, a lock) for its whole
+# duration, and only one batch is in memory at a time. Password hashes are
+# never exported.
+EXPORTS = {
+    'admins': Admin,
+    'sponsors': Sponsor,
+    'influencers': Influencer,
+    'campaigns': Campaign,
+    'ad_requests': AdRequest,
+    'flags': Flag,
+    'negotiation_messages': NegotiationMessage,
+}
+EXCLUDED_COLUMNS = {'passhash'}
+
+def columns(model):
+    return [column for column in model.__table__.columns if column.name not in EXCLUDED_COLUMNS]
+
+def batches(model):
+    batch_size = app.config.get('EXPORT_BATCH_SIZE', 1000)
+    key = model.__table__.c.id
+    query = select(*columns(model)).order_by(key).limit(batch_size)
+    last = None
+    while True:
+        with db.engine.connect() as conn:
+            batch = query if last is None else query.where(key > last)
+            rows = conn.execution_options(stream_results=True).execute(batch).all()
+        if not rows:
+            return
+        yield rows
+        last = rows[-1].id
+
+def serialize(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def csv_chunks(model):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in columns(model)])
+    for rows in batches(model):
+        writer.writerows([[serialize(value) for value in row] for row in rows])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+def ndjson_chunks(model):
+    names = [column.name for column in columns(model)]
+    for rows in batches(model):
+        yield "".join(json.dumps(dict(zip(names, map(serialize, row)))) + "\n" for row in rows).encode('utf-8')
+
+FORMATS = {
+    'csv': ('text/csv', csv_chunks),
+    'ndjson': ('application/x-ndjson', ndjson_chunks),
+}
@@ -0,0 +1,84 @@
+from app import app
+from collections import Counter
+from sqlalchemy import event, select, update, insert, delete, func, literal
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from models import db, Influencer, Sponsor, FacetCount
+
+# Value -> count maps for the search dropdowns (influencer category and
+# niche, sponsor industry) and the admin distributions. facet_counts is
+# adjusted in the flush that registers, edits or deletes a user, so reading
+# a facet never touches the influencers or sponsors tables.
+FACETS = {
+    Influencer: ['category', 'niche'],
+    Sponsor: ['industry'],
+}
+
+def load(*names):
+    rows = db.session.query(FacetCount.facet, FacetCount.value, FacetCount.count) \
+        .filter(FacetCount.facet.in_(names), FacetCount.count > 0) \
+        .order_by(FacetCount.facet, FacetCount.value).all()
+    result = {name: [] for name in names}
+    for facet, value, count in rows:
+        result[facet].append((value, count))
+    return result
+
+def counts(name):
+    return load(name)[name]
+
+def previous_value(obj, attr):
+    history = get_history(obj, attr)
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(obj, attr)
+
+@event.listens_for(Session, 'before_flush')
+def track_facets(session, flush_context, instances):
+    deltas = Counter()
+    for obj in session.new:
+        for attr in FACETS.get(type(obj), []):
+            deltas[(attr, getattr(obj, attr))] += 1
+    for obj in session.deleted:
+        for attr in FACETS.get(type(obj), []):
+            deltas[(attr, previous_value(obj, attr))] -= 1
+    for obj in session.dirty:
+        if obj in session.deleted:
+            continue
+        for attr in FACETS.get(type(obj), []):
+            history = get_history(obj, attr)
+            if history.added and history.deleted and history.added[0] != history.deleted[0]:
+                deltas[(attr, history.deleted[0])] -= 1
+                deltas[(attr, history.added[0])] += 1
+    deltas = {key: delta for key, delta in deltas.items() if delta and key[1] is not None}
+    if deltas:
+        adjust(session.connection(), deltas)
+
+def adjust(conn, deltas):
+    for (facet, value), delta in deltas.items():
+        result = conn.execute(update(FacetCount).where(FacetCount.facet == facet, FacetCount.value == value)
+                              .values(count=FacetCount.count + delta))
+        if result.rowcount == 0:
+            conn.execute(insert(FacetCount).values(facet=facet, value=value, count=delta))
+    conn.execute(delete(FacetCount).where(FacetCount.count <= 0))
+
+def rebuild(conn):
+    conn.execute(delete(FacetCount))
+    queries = [select(literal(attr), getattr(model, attr), func.count()).group_by(getattr(model, attr))
+               for model, attrs in FACETS.items() for attr in attrs]
+    rows = conn.execute(queries[0].union_all(*queries[1:])).all()
+    rows = [{'facet': facet, 'value': value, 'count': count} for facet, value, count in rows if value is not None]
+    if rows:
+        conn.execute(insert(FacetCount), rows)
+    return len(rows)
+
+for model, attrs in FACETS.items():
+    for attr in attrs:
+        event.listen(getattr(model, attr), 'set', lambda target, value, oldvalue, initiator: value, active_history=True, retval=True)
+
+@app.cli.command("rebuild-facets")
+def rebuild_facets_command():
+    with db.engine.begin() as conn:
+        values = rebuild(conn)
+    print(f"Rebuilt {values} facet values")
@@ -0,0 +1,92 @@
+from app import app
+import os
+import time
+import threading
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from models import db, Flag
+from sql_stats import unbudgeted
+
+# Flagged ids per entity type, held in process memory. Every commit that adds
+# or removes a Flag rewrites a small version file; other workers notice the
+# new mtime on their next lookup and reload, so checks stay coherent across
+# processes without a database query per request. FLAG_INDEX_MAX_AGE forces a
+# periodic reload as a safety net when the version file is not shared.
+
+class FlagIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids = {}
+        self.version = None
+        self.loaded = False
+        self.loaded_at = 0.0
+
+    def version_file(self):
+        return app.config.get('FLAG_INDEX_VERSION_FILE') or os.path.join(app.instance_path, 'flag_index.version')
+
+    def current_version(self):
+        try:
+            return os.stat(self.version_file()).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def is_stale(self, version):
+        if not self.loaded or version != self.version:
+            return True
+        return time.monotonic() - self.loaded_at > app.config['FLAG_INDEX_MAX_AGE']
+
+    def load(self):
+        version = self.current_version()
+        if not self.is_stale(version):
+            return self.ids
+        with self.lock:
+            if self.is_stale(version):
+                ids = {}
+                # Whichever request finds the index stale pays for the
+                # reload; it is not part of that view's query budget.
+                with unbudgeted():
+                    rows = db.session.execute(select(Flag.entity_type, Flag.entity_id), bind_arguments={'bind': db.engine}).all()
+                for entity_type, entity_id in rows:
+                    ids.setdefault(entity_type, set()).add(entity_id)
+                self.ids = {entity_type: frozenset(values) for entity_type, values in ids.items()}
+                self.version = version
+                self.loaded = True
+                self.loaded_at = time.monotonic()
+        return self.ids
+
+    def flagged_ids(self, entity_type):
+        return self.load().get(entity_type, frozenset())
+
+    def is_flagged(self, entity_type, entity_id):
+        return int(entity_id) in self.flagged_ids(entity_type)
+
+    def invalidate(self):
+        path = self.version_file()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(str(time.time_ns()))
+        os.utime(path, ns=(time.time_ns(), time.time_ns()))
+        with self.lock:
+            self.loaded = False
+
+flag_index = FlagIndex()
+
+def flagged_ids(entity_type):
+    return flag_index.flagged_ids(entity_type)
+
+def is_flagged(entity_type, entity_id):
+    return flag_index.is_flagged(entity_type, entity_id)
+
+@event.listens_for(Session, 'before_flush')
+def note_flag_changes(session, flush_context, instances):
+    if any(isinstance(obj, Flag) for obj in list(session.new) + list(session.deleted)):
+        session.info['flags_changed'] = True
+
+@event.listens_for(Session, 'after_commit')
+def publish_flag_changes(session):
+    if session.info.pop('flags_changed', False):
+        flag_index.invalidate()
+
+@event.listens_for(Session, 'after_rollback')
+def discard_flag_changes(session):
+    session.info.pop('flags_changed', None)
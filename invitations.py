@@ -0,0 +1,119 @@
+from app import app
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import select, insert, exists, func, literal, and_
+from models import db, Influencer, Campaign, AdRequest
+import flag_index
+import stats
+import rollups
+import transitions
+import negotiation
+import events
+
+# Fan-out ad request creation: one campaign, many influencers. The shared
+# fields are validated once, influencers that already have a request for the
+# campaign are skipped with a NOT EXISTS check, and the new requests are
+# written by a single INSERT ... SELECT. The unique (campaign_id,
+# influencer_id) index backs this up against concurrent creation. Like the
+# bulk decisions in transitions.py, the counters and rollups the flush hooks
+# would maintain are adjusted here from one grouped count of the targets, so
+# if another transaction creates a request for one of them between that count
+# and the insert (which the insert then skips, or fails on with an
+# IntegrityError) the fan-out reports a conflict and the caller rolls back.
+
+CONFLICT = "Some of these influencers were sent an ad request for this campaign at the same time. Please try again"
+
+def influencer_criteria(category=None, niche=None, reach=None):
+    criteria = []
+    if category:
+        criteria.append(Influencer.category == category)
+    if niche:
+        criteria.append(Influencer.niche == niche)
+    if reach:
+        criteria.append(Influencer.reach >= int(reach))
+    return criteria
+
+def selection(scope, ids=(), category=None, niche=None, reach=None):
+    """Influencer criteria for a fan-out, as (criteria, error). 'selected'
+    takes explicit ids; 'filtered' repeats an influencer search."""
+    if scope == 'selected':
+        try:
+            ids = sorted({int(influencer_id) for influencer_id in ids})
+        except (TypeError, ValueError):
+            return None, "Invalid influencer selection"
+        if not ids:
+            return None, "Select at least one influencer"
+        return [Influencer.id.in_(ids)], None
+    if scope == 'filtered':
+        try:
+            return influencer_criteria(category, niche, reach), None
+        except (TypeError, ValueError):
+            return None, "Invalid reach"
+    return None, "Invalid selection"
+
+def check_invitation(sponsor_id, fields):
+    """Validates the fields shared by every request of a fan-out, as
+    (campaign, attrs, error)."""
+    campaign_id = fields.get('campaign_id')
+    requirements = fields.get('requirements')
+    payment_amount = fields.get('payment_amount')
+    if not all([campaign_id, requirements, payment_amount]):
+        return None, None, "Please fill all required fields"
+    campaign = Campaign.query.filter_by(id=campaign_id, sponsor_id=sponsor_id).first()
+    if not campaign:
+        return None, None, "Invalid campaign. Please select a valid campaign."
+    if flag_index.is_flagged('campaign', campaign.id):
+        return None, None, "This campaign has been flagged. You cannot create ad requests for this campaign. Kindly contact support at support@adconnect.in for more details."
+    try:
+        payment_amount = float(payment_amount)
+    except ValueError:
+        return None, None, "Invalid payment amount"
+    if payment_amount <= 0:
+        return None, None, "Payment amount be greater than 0"
+    return campaign, {'messages': fields.get('messages') or None, 'requirements': requirements, 'payment_amount': payment_amount}, None
+
+def fan_out(campaign, criteria, attrs):
+    """Creates an ad request for every influencer matching criteria that has
+    none for the campaign yet, in the session's transaction. Returns
+    (created, skipped, error). The caller commits, or rolls back when error
+    is set or an IntegrityError is raised."""
+    conn = db.session.connection()
+    existing = exists().where(AdRequest.campaign_id == campaign.id, AdRequest.influencer_id == Influencer.id)
+    targets = select(Influencer.niche, existing.label('existing')).where(*criteria).subquery()
+    groups = conn.execute(select(targets.c.niche, targets.c.existing, func.count())
+                          .group_by(targets.c.niche, targets.c.existing)).all()
+    created = sum(count for _, is_existing, count in groups if not is_existing)
+    skipped = sum(count for _, is_existing, count in groups if is_existing)
+    if created > app.config['FANOUT_LIMIT']:
+        return 0, skipped, f"{created} influencers match; narrow the selection to at most {app.config['FANOUT_LIMIT']}"
+    if not created:
+        return 0, skipped, None
+
+    values = {'campaign_id': campaign.id, 'sponsor_id': campaign.sponsor_id, 'status': transitions.PENDING,
+              'updated_at': datetime.now(), **attrs}
+    columns = AdRequest.__table__.c
+    rows = select(Influencer.id, *[literal(value, columns[name].type) for name, value in values.items()]) \
+        .where(*criteria, ~existing).order_by(Influencer.id)
+    statement = insert(AdRequest).from_select(['influencer_id', *values], rows)
+    if conn.dialect.insert_returning:
+        inserted = conn.execute(statement.returning(*events.columns())).all()
+        if len(inserted) != created:
+            return 0, skipped, CONFLICT
+        events.record(db.session, 'ad_request', inserted)
+        new_requests = AdRequest.id.in_([row.id for row in inserted])
+    else:
+        # Without RETURNING the new rows are found again by their campaign
+        # and influencer, which the unique index makes exact.
+        influencer_ids = conn.execute(select(Influencer.id).where(*criteria, ~existing)).scalars().all()
+        if len(influencer_ids) != created or conn.execute(statement).rowcount != created:
+            return 0, skipped, CONFLICT
+        new_requests = and_(AdRequest.campaign_id == campaign.id, AdRequest.influencer_id.in_(influencer_ids))
+    if attrs['messages']:
+        negotiation.post_all(conn, select(AdRequest.id, literal('sponsor'), AdRequest.sponsor_id, AdRequest.messages, AdRequest.updated_at)
+                             .where(new_requests))
+
+    niches = Counter({niche: count for niche, is_existing, count in groups if not is_existing and niche is not None})
+    stats.adjust(conn, {f"ad_requests_{transitions.PENDING}": created})
+    rollups.apply(conn, {campaign.id: Counter(total_requests=created, pending_requests=created)},
+                  {campaign.id: niches} if niches else {})
+    return created, skipped, None
@@ -0,0 +1,188 @@
+from app import app
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from io import BytesIO
+
+# Invoices are rendered once and stored on disk under a name derived from the
+# fields printed on them, so a repeat download is a file read and any change
+# to the ad request (amount, names, ...) produces a new file automatically.
+# The cache is trimmed least-recently-used first once it grows past
+# INVOICE_CACHE_MAX_BYTES. Bump LAYOUT_VERSION when the PDF layout changes.
+LAYOUT_VERSION = 1
+
+_styles = None
+_styles_lock = threading.Lock()
+
+def cache_dir():
+    return app.config.get('INVOICE_CACHE_DIR') or os.path.join(app.instance_path, 'invoices')
+
+def invoice_fields(ad_request):
+    return {
+        'id': ad_request.id,
+        'campaign': ad_request.campaign.name,
+        'sponsor': ad_request.sponsor.username,
+        'influencer': ad_request.influencer.username,
+        'payment_amount': f"{ad_request.payment_amount:.2f}",
+        'status': "Paid",
+    }
+
+def invoice_key(fields):
+    payload = json.dumps({'layout': LAYOUT_VERSION, 'fields': fields}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def styles():
+    global _styles
+    if _styles is None:
+        with _styles_lock:
+            if _styles is None:
+                from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+                base = getSampleStyleSheet()
+                _styles = {
+                    'title': ParagraphStyle('InvoiceTitle', parent=base['Title'], fontName='Times-Roman', fontSize=20, leading=30, alignment=1),
+                    'subtitle': ParagraphStyle('InvoiceSubtitle', parent=base['Heading2'], fontName='Times-Roman', fontSize=14, leading=20, alignment=1),
+                    'footer': ParagraphStyle('InvoiceFooter', parent=base['Normal'], fontName='Times-Roman', fontSize=12, leading=18, alignment=1),
+                }
+    return _styles
+
+def invoice_elements(fields):
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
+
+    style = styles()
+    elements = [
+        Paragraph("AdConnect", style['title']),
+        Spacer(1, 12),
+        Paragraph("Invoice for Ad Request", style['subtitle']),
+        Spacer(1, 24),
+    ]
+
+    data = [
+        ["Description", "Details"],
+        ["Campaign Name", fields['campaign']],
+        ["Sponsor Name", fields['sponsor']],
+        ["Influencer Name", fields['influencer']],
+        ["Payment Amount", fields['payment_amount']],
+        ["Status", fields['status']]
+    ]
+    table = Table(data, colWidths=[2.5 * inch, 3.5 * inch])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.turquoise),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Times-Roman'),
+        ('FONTNAME', (0, 1), (-1, -1), 'Times-Roman'),
+        ('FONTSIZE', (0, 0), (-1, -1), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ]))
+    elements.append(table)
+    elements.append(Spacer(1, 24))
+    elements.append(Paragraph("Thank you for your payment!", style['footer']))
+    return elements
+
+def render_invoice(fields):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate
+
+    buffer = BytesIO()
+    SimpleDocTemplate(buffer, pagesize=letter).build(invoice_elements(fields))
+    return buffer.getvalue()
+
+def open_invoice(ad_request):
+    return cached_invoice(invoice_fields(ad_request))
+
+def cached_invoice(fields):
+    """The invoice PDF for fields as an open binary file, rendered on a
+    miss. The caller closes it. Callers get a handle rather than a path so
+    another worker evicting the file cannot break a download in progress."""
+    key = invoice_key(fields)
+    directory = os.path.join(cache_dir(), key[:2])
+    path = os.path.join(directory, f"{key}.pdf")
+    try:
+        cached = open(path, 'rb')
+    except FileNotFoundError:
+        pass
+    else:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted since the open; the handle still reads the whole file.
+            pass
+        return cached
+
+    os.makedirs(directory, exist_ok=True)
+    handle, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    rendered = os.fdopen(handle, 'w+b')
+    try:
+        rendered.write(render_invoice(fields))
+        rendered.flush()
+        os.replace(tmp_path, path)
+    except BaseException:
+        rendered.close()
+        os.unlink(tmp_path)
+        raise
+    rendered.seek(0)
+    added(os.fstat(rendered.fileno()).st_size, keep=path)
+    return rendered
+
+# Each worker keeps a running total of the cache size: seeded by one scan,
+# increased by every file it writes and reset by every eviction pass. Only
+# a total over INVOICE_CACHE_MAX_BYTES triggers the scan that evicts, and it
+# trims down to EVICT_TO of the limit so the next one is far off. Other
+# workers' writes are only seen at the next scan, so the cache can overshoot
+# the limit by what they wrote in between.
+EVICT_TO = 0.8
+
+_cache_bytes = None
+_size_lock = threading.Lock()
+_evict_lock = threading.Lock()
+
+def added(size, keep=None):
+    global _cache_bytes
+    limit = app.config.get('INVOICE_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+    with _size_lock:
+        if _cache_bytes is not None:
+            _cache_bytes += size
+        due = _cache_bytes is None or _cache_bytes > limit
+    if due and _evict_lock.acquire(blocking=False):
+        # One pass at a time per worker; concurrent writers skip it.
+        try:
+            evict(keep=keep)
+        finally:
+            _evict_lock.release()
+
+def evict(keep=None):
+    global _cache_bytes
+    limit = app.config.get('INVOICE_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+    entries = []
+    total = 0
+    for root, dirs, files in os.walk(cache_dir()):
+        for name in files:
+            if not name.endswith('.pdf'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    if total > limit:
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= limit * EVICT_TO:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+    with _size_lock:
+        _cache_bytes = total
@@ -0,0 +1,129 @@
+from app import app
+import re
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+from sqlalchemy import select, func
+from models import db, Influencer, AdRequest
+import flag_index
+
+# Ranks every influencer against a campaign in one vectorised pass over an
+# array snapshot of the influencers table. The score is a weighted sum of:
+#   category / niche fit - the value is mentioned in the campaign text or
+#                          matches the sponsor's industry, or the share of the
+#                          sponsor's accepted requests that went to it
+#   reach                - log reach relative to the largest reach
+#   payment              - campaign payment vs the influencer's average
+#                          accepted payment (0.5 when they have no history)
+WEIGHTS = {'category': 0.3, 'niche': 0.3, 'reach': 0.25, 'payment': 0.15}
+
+Match = namedtuple('Match', ['influencer_id', 'score', 'category', 'niche', 'reach', 'payment'])
+
+class InfluencerSnapshot:
+    def __init__(self, ids, categories, category_codes, niches, niche_codes, reach, typical_payment):
+        self.ids = ids
+        self.categories = categories
+        self.category_codes = category_codes
+        self.niches = niches
+        self.niche_codes = niche_codes
+        log_reach = np.log1p(np.maximum(reach, 0))
+        top = log_reach.max() if len(log_reach) else 0
+        self.reach_score = log_reach / top if top > 0 else np.zeros_like(log_reach)
+        self.typical_payment = typical_payment
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls):
+        rows = db.session.execute(select(Influencer.id, Influencer.category, Influencer.niche, Influencer.reach)
+                                  .order_by(Influencer.id)).all()
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        categories, category_codes = np.unique(np.array([row[1] or '' for row in rows], dtype=object), return_inverse=True)
+        niches, niche_codes = np.unique(np.array([row[2] or '' for row in rows], dtype=object), return_inverse=True)
+        reach = np.fromiter((float(row[3] or 0) for row in rows), dtype=np.float64, count=len(rows))
+
+        typical_payment = np.full(len(rows), np.nan)
+        payments = db.session.execute(select(AdRequest.influencer_id, func.avg(AdRequest.payment_amount))
+                                      .where(AdRequest.status == 'Accepted', AdRequest.influencer_id.isnot(None))
+                                      .group_by(AdRequest.influencer_id)).all()
+        if payments and len(ids):
+            payment_ids = np.array([row[0] for row in payments], dtype=np.int64)
+            positions = np.searchsorted(ids, payment_ids)
+            found = (positions < len(ids)) & (ids[np.minimum(positions, len(ids) - 1)] == payment_ids)
+            typical_payment[positions[found]] = np.array([float(row[1] or 0) for row in payments])[found]
+        return cls(ids, categories, category_codes.astype(np.int32), niches, niche_codes.astype(np.int32), reach, typical_payment)
+
+    def positions(self, influencer_ids):
+        influencer_ids = np.fromiter(influencer_ids, dtype=np.int64)
+        if not len(influencer_ids) or not len(self.ids):
+            return np.array([], dtype=np.int64)
+        positions = np.searchsorted(self.ids, influencer_ids)
+        positions = positions[positions < len(self.ids)]
+        return positions[np.isin(self.ids[positions], influencer_ids)]
+
+_snapshot = None
+_lock = threading.Lock()
+
+def snapshot():
+    global _snapshot
+    ttl = app.config.get('MATCHING_SNAPSHOT_TTL', 300)
+    if _snapshot is None or time.monotonic() - _snapshot.loaded_at > ttl:
+        with _lock:
+            if _snapshot is None or time.monotonic() - _snapshot.loaded_at > ttl:
+                _snapshot = InfluencerSnapshot.load()
+    return _snapshot
+
+def mentioned(value, words, text):
+    terms = re.findall(r"\w+", value.lower())
+    return bool(terms) and (all(term in words for term in terms) or value.lower() in text)
+
+def fit_table(values, words, text, shares, industry=None):
+    table = np.zeros(len(values))
+    for code, value in enumerate(values):
+        if value and (mentioned(value, words, text) or value.lower() == industry):
+            table[code] = 1.0
+        else:
+            table[code] = shares.get(value, 0.0)
+    return table
+
+def sponsor_shares(sponsor_id):
+    rows = db.session.execute(select(Influencer.category, Influencer.niche, func.count(AdRequest.id))
+                              .join(AdRequest, AdRequest.influencer_id == Influencer.id)
+                              .where(AdRequest.sponsor_id == sponsor_id, AdRequest.status == 'Accepted')
+                              .group_by(Influencer.category, Influencer.niche)).all()
+    total = sum(count for category, niche, count in rows)
+    categories, niches = {}, {}
+    for category, niche, count in rows:
+        categories[category] = categories.get(category, 0) + count / total
+        niches[niche] = niches.get(niche, 0) + count / total
+    return categories, niches
+
+def top_matches(campaign, k=20, exclude_existing=True):
+    snap = snapshot()
+    if not len(snap.ids):
+        return []
+    text = " ".join(filter(None, [campaign.name, campaign.description, campaign.goals, campaign.requirements])).lower()
+    words = set(re.findall(r"\w+", text))
+    industry = campaign.sponsor.industry.lower() if campaign.sponsor and campaign.sponsor.industry else None
+    category_shares, niche_shares = sponsor_shares(campaign.sponsor_id)
+
+    category_fit = fit_table(snap.categories, words, text, category_shares, industry)[snap.category_codes]
+    niche_fit = fit_table(snap.niches, words, text, niche_shares)[snap.niche_codes]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment_fit = np.where(np.isnan(snap.typical_payment) | (snap.typical_payment <= 0), 0.5,
+                               np.minimum(float(campaign.payment_amount or 0) / snap.typical_payment, 1.0))
+    score = (WEIGHTS['category'] * category_fit + WEIGHTS['niche'] * niche_fit
+             + WEIGHTS['reach'] * snap.reach_score + WEIGHTS['payment'] * payment_fit)
+
+    excluded = set(flag_index.flagged_ids('influencer'))
+    if exclude_existing:
+        excluded.update(row[0] for row in db.session.execute(
+            select(AdRequest.influencer_id).where(AdRequest.campaign_id == campaign.id, AdRequest.influencer_id.isnot(None))))
+    score[snap.positions(excluded)] = -np.inf
+
+    k = min(k, len(score))
+    top = np.argpartition(-score, k - 1)[:k]
+    top = top[np.argsort(-score[top], kind='stable')]
+    return [Match(int(snap.ids[i]), float(score[i]), float(category_fit[i]), float(niche_fit[i]),
+                  float(snap.reach_score[i]), float(payment_fit[i]))
+            for i in top if np.isfinite(score[i])]
@@ -0,0 +1,163 @@
+from app import app
+import click
+from datetime import datetime
+from sqlalchemy import text, inspect
+
+# db.create_all() only creates missing tables, so anything that changes an
+# existing table (indexes, columns, constraints, backfills) goes here as a
+# numbered step. Applied versions are recorded in schema_migrations.
+MIGRATIONS = []
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+@migration(1, "Index hot lookup columns")
+def add_lookup_indexes(conn):
+    statements = [
+        "CREATE INDEX IF NOT EXISTS ix_influencers_category_niche_reach ON influencers (category, niche, reach)",
+        "CREATE INDEX IF NOT EXISTS ix_influencers_niche ON influencers (niche)",
+        "CREATE INDEX IF NOT EXISTS ix_sponsors_industry ON sponsors (industry)",
+        "CREATE INDEX IF NOT EXISTS ix_campaigns_sponsor_id_id ON campaigns (sponsor_id, id)",
+        "CREATE INDEX IF NOT EXISTS ix_campaigns_visibility_budget ON campaigns (visibility, budget)",
+        "CREATE INDEX IF NOT EXISTS ix_ad_requests_sponsor_id_sponsor_accepted ON ad_requests (sponsor_id, sponsor_accepted)",
+        "CREATE INDEX IF NOT EXISTS ix_ad_requests_influencer_id_influencer_accepted ON ad_requests (influencer_id, influencer_accepted)",
+        "CREATE INDEX IF NOT EXISTS ix_ad_requests_campaign_id_influencer_id ON ad_requests (campaign_id, influencer_id)",
+        "CREATE INDEX IF NOT EXISTS ix_ad_requests_status ON ad_requests (status)",
+        "CREATE INDEX IF NOT EXISTS ix_flags_entity_type_entity_id ON flags (entity_type, entity_id)",
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
+
+@migration(2, "Backfill dashboard stat counters")
+def backfill_stat_counters(conn):
+    from stats import rebuild
+    rebuild(conn)
+
+@migration(3, "Backfill campaign rollups")
+def backfill_campaign_rollups(conn):
+    from rollups import rebuild
+    rebuild(conn)
+
+@migration(4, "Index public campaign listing order")
+def add_campaign_listing_index(conn):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_campaigns_visibility_id ON campaigns (visibility, id)"))
+
+@migration(5, "Build campaign full-text index")
+def build_campaign_search(conn):
+    from search import backend
+    backend(conn).rebuild(conn)
+
+@migration(6, "Backfill search facet counts")
+def backfill_facet_counts(conn):
+    from facets import rebuild
+    rebuild(conn)
+
+@migration(7, "Record when ad requests are paid")
+def add_paid_at(conn):
+    add_column(conn, 'ad_requests', 'paid_at', 'DATETIME')
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_ad_requests_sponsor_id_paid_at ON ad_requests (sponsor_id, paid_at)"))
+
+@migration(8, "Track row versions for conditional API requests")
+def add_updated_at(conn):
+    now = datetime.now()
+    for table in ('influencers', 'sponsors', 'campaigns', 'ad_requests'):
+        add_column(conn, table, 'updated_at', 'DATETIME')
+        conn.execute(text(f"UPDATE {table} SET updated_at = :now WHERE updated_at IS NULL"), {"now": now})
+
+@migration(9, "One ad request per campaign and influencer")
+def unique_campaign_influencer(conn):
+    # Earlier duplicates came from repeated "interested" clicks and resent
+    # requests. Keep the paid one, else the accepted one, else the oldest.
+    conn.execute(text("""
+        DELETE FROM ad_requests WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY campaign_id, influencer_id
+                    ORDER BY CASE WHEN payment_status THEN 0 ELSE 1 END, CASE status WHEN 'Accepted' THEN 0 ELSE 1 END, id
+                ) AS position
+                FROM ad_requests WHERE campaign_id IS NOT NULL AND influencer_id IS NOT NULL
+            ) ranked WHERE position > 1
+        )"""))
+    conn.execute(text("DROP INDEX IF EXISTS ix_ad_requests_campaign_id_influencer_id"))
+    conn.execute(text("CREATE UNIQUE INDEX ix_ad_requests_campaign_id_influencer_id ON ad_requests (campaign_id, influencer_id)"))
+    from stats import rebuild as rebuild_stats
+    from rollups import rebuild as rebuild_rollups
+    rebuild_stats(conn)
+    rebuild_rollups(conn)
+
+@migration(10, "Move negotiation messages to an append-only log")
+def add_negotiation_log(conn):
+    from models import NegotiationMessage
+    from negotiation import backfill
+    NegotiationMessage.__table__.create(conn, checkfirst=True)
+    backfill(conn)
+
+@migration(11, "Add the event outbox for live updates")
+def add_event_outbox(conn):
+    from models import OutboxEvent
+    OutboxEvent.__table__.create(conn, checkfirst=True)
+
+def add_column(conn, table, name, ddl):
+    if name not in {column['name'] for column in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+def current_version(conn):
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY, description VARCHAR(256), applied_at TIMESTAMP)"))
+    return conn.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar() or 0
+
+def upgrade(engine):
+    applied = []
+    with engine.begin() as conn:
+        version = current_version(conn)
+    for number, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            fn(conn)
+            conn.execute(text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:version, :description, :applied_at)"),
+                         {"version": number, "description": description, "applied_at": datetime.now()})
+        applied.append((number, description))
+    return applied
+
+def init_db():
+    from models import db, Admin
+    from passwords import hash_password
+    db.create_all()
+    applied = upgrade(db.engine)
+    if not Admin.query.first():
+        db.session.add(Admin(username='admin', passhash=hash_password('admin'), name='Admin'))
+        db.session.commit()
+    return applied
+
+@app.cli.command("init-db")
+def init_db_command():
+    applied = init_db()
+    for number, description in applied:
+        print(f"Applied migration {number}: {description}")
+    print("Database is ready")
+
+@app.cli.command("create-admin")
+@click.option("--username", default="admin")
+@click.option("--name", default="Admin")
+@click.password_option()
+def create_admin_command(username, name, password):
+    from models import db, Admin
+    from passwords import hash_password
+    if Admin.query.filter_by(username=username).first():
+        print(f"Admin {username} already exists")
+        return
+    db.session.add(Admin(username=username, passhash=hash_password(password), name=name))
+    db.session.commit()
+    print(f"Created admin {username}")
+
+@app.cli.command("migrate")
+def migrate_command():
+    from models import db
+    applied = upgrade(db.engine)
+    for number, description in applied:
+        print(f"Applied migration {number}: {description}")
+    if not applied:
+        print("Database is up to date")
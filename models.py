@@ -1,8 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
-from app import app
-from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime
+from replicas import RoutingSession
 
-db = SQLAlchemy(app)
+# Bound to the app in init_app(); nothing here touches the database.
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class Admin(db.Model):
     __tablename__ = 'admins'
@@ -21,10 +22,15 @@ class Sponsor(db.Model):
     name = db.Column(db.String(64),nullable=True)
     budget = db.Column(db.Integer,nullable=False)
     industry = db.Column(db.String(64), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
 
     campaigns = db.relationship('Campaign', back_populates='sponsor')
     ad_requests = db.relationship('AdRequest', back_populates='sponsor')
 
+    __table_args__ = (
+        db.Index('ix_sponsors_industry', 'industry'),
+    )
+
 class Influencer(db.Model):
     __tablename__ = 'influencers'
     id = db.Column(db.Integer, primary_key=True)
@@ -34,9 +40,15 @@ class Influencer(db.Model):
     category = db.Column(db.String(128),nullable=False)
     niche = db.Column(db.String(128),nullable=False)
     reach = db.Column(db.Integer)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
 
     ad_requests = db.relationship('AdRequest', back_populates='influencer')
 
+    __table_args__ = (
+        db.Index('ix_influencers_category_niche_reach', 'category', 'niche', 'reach'),
+        db.Index('ix_influencers_niche', 'niche'),
+    )
+
 class Campaign(db.Model):
     __tablename__ = 'campaigns'
     id = db.Column(db.Integer, primary_key=True)
@@ -51,9 +63,17 @@ class Campaign(db.Model):
     requirements = db.Column(db.String, nullable=False)
 
     sponsor_id = db.Column(db.Integer, db.ForeignKey('sponsors.id'))
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     sponsor = db.relationship('Sponsor', back_populates='campaigns')
     
     ad_requests = db.relationship('AdRequest', back_populates='campaign')
+    rollup = db.relationship('CampaignRollup', uselist=False, viewonly=True)
+
+    __table_args__ = (
+        db.Index('ix_campaigns_sponsor_id_id', 'sponsor_id', 'id'),
+        db.Index('ix_campaigns_visibility_budget', 'visibility', 'budget'),
+        db.Index('ix_campaigns_visibility_id', 'visibility', 'id'),
+    )
 
 class AdRequest(db.Model):
     __tablename__ = 'ad_requests'
@@ -61,18 +81,59 @@ class AdRequest(db.Model):
     campaign_id = db.Column(db.Integer, db.ForeignKey('campaigns.id'))
     influencer_id = db.Column(db.Integer, db.ForeignKey('influencers.id'))
     sponsor_id = db.Column(db.Integer, db.ForeignKey('sponsors.id')) 
-    messages = db.Column(db.Text)
+    messages = db.Column(db.Text)  # Latest message; the full thread is in negotiation_messages
     requirements = db.Column(db.Text)
     payment_amount = db.Column(db.Integer)
     status = db.Column(db.String(64), nullable=False, default='Pending')  # Could be 'Pending', 'Accepted', 'Rejected'
     sponsor_accepted = db.Column(db.Boolean, default=None)
     influencer_accepted = db.Column(db.Boolean, default=None)
     payment_status = db.Column(db.Boolean, default=False)
+    paid_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     
     campaign = db.relationship('Campaign', back_populates='ad_requests')
     influencer = db.relationship('Influencer', back_populates='ad_requests')
     sponsor = db.relationship('Sponsor', back_populates='ad_requests')
 
+    __table_args__ = (
+        db.Index('ix_ad_requests_sponsor_id_sponsor_accepted', 'sponsor_id', 'sponsor_accepted'),
+        db.Index('ix_ad_requests_influencer_id_influencer_accepted', 'influencer_id', 'influencer_accepted'),
+        db.Index('ix_ad_requests_campaign_id_influencer_id', 'campaign_id', 'influencer_id', unique=True),
+        db.Index('ix_ad_requests_status', 'status'),
+        db.Index('ix_ad_requests_sponsor_id_paid_at', 'sponsor_id', 'paid_at'),
+    )
+
+class NegotiationMessage(db.Model):
+    __tablename__ = 'negotiation_messages'
+    id = db.Column(db.Integer, primary_key=True)
+    ad_request_id = db.Column(db.Integer, db.ForeignKey('ad_requests.id'), nullable=False)
+    author_type = db.Column(db.String(64))  # 'sponsor' or 'influencer'; unknown for messages from before the log
+    author_id = db.Column(db.Integer)
+    body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    ad_request = db.relationship('AdRequest')
+
+    # Ids grow with time, so (ad_request_id, id) serves both thread order and
+    # "newer than" cursors.
+    __table_args__ = (
+        db.Index('ix_negotiation_messages_ad_request_id_id', 'ad_request_id', 'id'),
+    )
+
+class OutboxEvent(db.Model):
+    __tablename__ = 'event_outbox'
+    id = db.Column(db.Integer, primary_key=True)
+    user_type = db.Column(db.String(64), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(64), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    __table_args__ = (
+        db.Index('ix_event_outbox_user_type_user_id_id', 'user_type', 'user_id', 'id'),
+        db.Index('ix_event_outbox_created_at', 'created_at'),
+    )
+
 class Flag(db.Model):
     __tablename__ = 'flags'
     id = db.Column(db.Integer, primary_key=True)
@@ -83,12 +144,33 @@ class Flag(db.Model):
     
     admin = db.relationship('Admin', back_populates='flags')
 
-with app.app_context():
-    db.create_all()
-    #check if admin exists, else create admin
-    admin = Admin.query.first()
-    if not admin:
-        password_hash = generate_password_hash('admin')
-        admin=Admin(username='admin', passhash=password_hash, name='Admin')
-        db.session.add(admin)
-        db.session.commit()
\ No newline at end of file
+    __table_args__ = (
+        db.Index('ix_flags_entity_type_entity_id', 'entity_type', 'entity_id'),
+    )
+
+class StatCounter(db.Model):
+    __tablename__ = 'stat_counters'
+    name = db.Column(db.String(128), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class CampaignRollup(db.Model):
+    __tablename__ = 'campaign_rollups'
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaigns.id'), primary_key=True)
+    total_requests = db.Column(db.Integer, nullable=False, default=0)
+    accepted_requests = db.Column(db.Integer, nullable=False, default=0)
+    rejected_requests = db.Column(db.Integer, nullable=False, default=0)
+    pending_requests = db.Column(db.Integer, nullable=False, default=0)
+    spend = db.Column(db.Float, nullable=False, default=0)
+    niches = db.Column(db.Integer, nullable=False, default=0)
+
+class CampaignNiche(db.Model):
+    __tablename__ = 'campaign_niches'
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaigns.id'), primary_key=True)
+    niche = db.Column(db.String(128), primary_key=True)
+    requests = db.Column(db.Integer, nullable=False, default=0)
+
+class FacetCount(db.Model):
+    __tablename__ = 'facet_counts'
+    facet = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.String(128), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
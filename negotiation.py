@@ -0,0 +1,46 @@
+from datetime import datetime
+from sqlalchemy import event, select, insert, delete, func, null
+from sqlalchemy.orm import Session
+from models import db, AdRequest, NegotiationMessage
+from pagination import paginate, page_size
+
+# Negotiation threads are an append-only log in negotiation_messages; nothing
+# rewrites an earlier message. AdRequest.messages keeps only the latest one
+# so the request listings can show it without touching the log. Threads are
+# read a page at a time, newest first, and clients that already hold a
+# thread ask only for messages after the last id they have seen.
+
+def post(ad_request, author_type, author_id, body):
+    message = NegotiationMessage(ad_request=ad_request, author_type=author_type, author_id=author_id, body=body)
+    db.session.add(message)
+    ad_request.messages = body
+    return message
+
+def post_all(conn, rows):
+    """Appends one message per row of a select of (ad_request_id,
+    author_type, author_id, body, created_at) in a single statement."""
+    conn.execute(insert(NegotiationMessage).from_select(['ad_request_id', 'author_type', 'author_id', 'body', 'created_at'], rows))
+
+def thread(ad_request_id):
+    return paginate(NegotiationMessage.query.filter_by(ad_request_id=ad_request_id), NegotiationMessage.id, descending=True)
+
+def since(ad_request_id, cursor, limit=None):
+    """Messages of the thread after the cursor id, oldest first."""
+    return NegotiationMessage.query.filter(NegotiationMessage.ad_request_id == ad_request_id, NegotiationMessage.id > cursor) \
+        .order_by(NegotiationMessage.id).limit(limit or page_size()).all()
+
+def is_party(ad_request, user_type, user_id):
+    return (user_type == 'sponsor' and ad_request.sponsor_id == user_id) or \
+        (user_type == 'influencer' and ad_request.influencer_id == user_id)
+
+def backfill(conn):
+    # Each request's last message becomes the first entry of its thread.
+    post_all(conn, select(AdRequest.id, null(), null(), AdRequest.messages, func.coalesce(AdRequest.updated_at, datetime.now()))
+             .where(AdRequest.messages.isnot(None), AdRequest.messages != '',
+                    ~select(NegotiationMessage.id).where(NegotiationMessage.ad_request_id == AdRequest.id).exists()))
+
+@event.listens_for(Session, 'before_flush')
+def drop_deleted_threads(session, flush_context, instances):
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, AdRequest)]
+    if deleted:
+        session.connection().execute(delete(NegotiationMessage).where(NegotiationMessage.ad_request_id.in_(deleted)))
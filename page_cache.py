@@ -0,0 +1,73 @@
+from app import app
+import os
+import time
+import threading
+from functools import wraps
+from flask import request, session
+from jinja2 import FileSystemBytecodeCache
+
+# Pages whose HTML is the same for every anonymous visitor are rendered once
+# per worker and then served from memory for PAGE_CACHE_TTL seconds. The page
+# only varies by session (navbar, flashed messages), so logged-in visitors
+# and requests with pending flashes always render fresh; checking the session
+# also makes Flask add "Vary: Cookie" to the response.
+#
+# Compiled templates are kept in a FileSystemBytecodeCache under
+# TEMPLATE_CACHE_DIR, installed by init_app(). `flask compile-templates`
+# fills it at deploy time so new workers load bytecode instead of compiling
+# every template on first use.
+# Entries are keyed by the template source checksum, so edits are never
+# served stale.
+
+class PageCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pages = {}
+
+    def get(self, key, ttl):
+        entry = self.pages.get(key)
+        if entry is None or time.monotonic() - entry[0] > ttl:
+            return None
+        return entry[1]
+
+    def put(self, key, body):
+        with self.lock:
+            self.pages[key] = (time.monotonic(), body)
+
+    def clear(self):
+        with self.lock:
+            self.pages.clear()
+
+pages = PageCache()
+
+def anonymous():
+    return not session.get('id') and not session.get('_flashes')
+
+def cache_anonymous(inner_func):
+    @wraps(inner_func)
+    def decorated_func(*args, **kwargs):
+        ttl = app.config.get('PAGE_CACHE_TTL', 300)
+        if not ttl or app.debug or not anonymous():
+            return inner_func(*args, **kwargs)
+        key = (request.endpoint, request.path)
+        body = pages.get(key, ttl)
+        if body is None:
+            body = inner_func(*args, **kwargs)
+            pages.put(key, body)
+        return app.response_class(body, mimetype='text/html')
+    return decorated_func
+
+def template_cache_dir():
+    return app.config.get('TEMPLATE_CACHE_DIR') or os.path.join(app.instance_path, 'jinja_cache')
+
+def install_bytecode_cache():
+    directory = template_cache_dir()
+    os.makedirs(directory, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+@app.cli.command("compile-templates")
+def compile_templates_command():
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    print(f"Compiled {len(names)} templates into {template_cache_dir()}")
@@ -0,0 +1,59 @@
+from app import app
+from flask import request, url_for
+
+# Keyset (cursor) pagination. Pages are addressed by the sort key of the last
+# row shown ("after") or the first row shown ("before") rather than an
+# OFFSET, so fetching page 1000 costs the same index seek as page 1.
+
+class Page:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+def page_size():
+    size = request.values.get('per_page', type=int) or app.config['PAGE_SIZE']
+    return max(1, min(size, app.config['MAX_PAGE_SIZE']))
+
+def paginate(query, column, descending=False, per_page=None):
+    per_page = per_page or page_size()
+    after = request.values.get('after', type=int)
+    before = request.values.get('before', type=int)
+    forward = before is None
+
+    if forward:
+        if after is not None:
+            query = query.filter(column < after if descending else column > after)
+        query = query.order_by(column.desc() if descending else column.asc())
+    else:
+        query = query.filter(column > before if descending else column < before)
+        query = query.order_by(column.asc() if descending else column.desc())
+
+    rows = query.limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+    if not rows:
+        return Page(rows)
+
+    first_key = getattr(rows[0], column.key)
+    last_key = getattr(rows[-1], column.key)
+    if forward:
+        return Page(rows, next_cursor=last_key if more else None, prev_cursor=first_key if after is not None else None)
+    return Page(rows, next_cursor=last_key, prev_cursor=first_key if more else None)
+
+@app.template_global()
+def page_url(**cursor):
+    args = {name: value for name, value in request.args.items() if name not in ('after', 'before')}
+    args.update(request.view_args or {})
+    args.update(cursor)
+    return url_for(request.endpoint, **args)
@@ -0,0 +1,37 @@
+from app import app
+from functools import lru_cache
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Hashing policy comes from PASSWORD_HASH_METHOD / PASSWORD_SALT_LENGTH.
+# Stored hashes that were made with a different policy are replaced the next
+# time the user logs in with the correct password.
+
+def policy():
+    return app.config.get('PASSWORD_HASH_METHOD') or 'scrypt', int(app.config.get('PASSWORD_SALT_LENGTH') or 16)
+
+@lru_cache(maxsize=None)
+def canonical_method(method, salt_length):
+    # werkzeug fills in default parameters ("pbkdf2" -> "pbkdf2:sha256:1000000"),
+    # so compare against what it actually writes rather than the config string.
+    return generate_password_hash('', method=method, salt_length=salt_length).split('$', 1)[0]
+
+def hash_password(password):
+    method, salt_length = policy()
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+def check_password(passhash, password):
+    return check_password_hash(passhash, password)
+
+def needs_rehash(passhash):
+    method, salt_length = policy()
+    parts = passhash.split('$')
+    if len(parts) != 3:
+        return True
+    return parts[0] != canonical_method(method, salt_length) or len(parts[1]) != salt_length
+
+def verify_and_upgrade(user, password):
+    if not check_password(user.passhash, password):
+        return False
+    if needs_rehash(user.passhash):
+        user.passhash = hash_password(password)
+    return True
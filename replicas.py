@@ -0,0 +1,90 @@
+from app import app
+import random
+import sqlite3
+import time
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Read replica routing. DATABASE_REPLICA_URIS (comma separated) become binds
+# named replica0, replica1, ... and views decorated with @read_only run their
+# ORM reads on one replica chosen per request. Everything else stays on the
+# primary: views not marked read-only, CLI commands, flushes, and any session
+# that has pending changes or has already written during the request.
+#
+# Replicas lag, so a visitor who wrote something keeps reading from the
+# primary for REPLICA_READ_YOUR_WRITES_SECONDS afterwards (tracked in the
+# Flask session), which keeps redirects after a POST showing their own data.
+#
+# Locally a replica can be a copy of the SQLite file refreshed with
+# `flask sync-replicas`, which makes the lag visible and testable.
+
+def replica_uris():
+    return [uri.strip() for uri in (app.config.get('DATABASE_REPLICA_URIS') or '').split(',') if uri.strip()]
+
+def replica_keys():
+    return [f"replica{number}" for number in range(len(replica_uris()))]
+
+def read_only(inner_func):
+    inner_func.read_only = True
+    return inner_func
+
+def recently_wrote():
+    last_write = session.get('last_write')
+    return last_write is not None and time.time() - last_write < app.config['REPLICA_READ_YOUR_WRITES_SECONDS']
+
+def use_replica(db_session):
+    if not has_request_context() or not replica_keys():
+        return False
+    view = app.view_functions.get(request.endpoint)
+    if not getattr(view, 'read_only', False) or g.get('wrote'):
+        return False
+    if db_session._flushing or db_session.new or db_session.dirty or db_session.deleted:
+        return False
+    return not recently_wrote()
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and use_replica(self):
+            if 'replica' not in g:
+                g.replica = random.choice(replica_keys())
+            return self._db.engines[g.replica]
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def note_write(db_session, flush_context):
+    if has_request_context():
+        g.wrote = True
+
+# Core statements such as bulk decisions write without flushing the session.
+@event.listens_for(Engine, 'after_cursor_execute')
+def note_statement_write(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and (context.isinsert or context.isupdate or context.isdelete):
+        g.wrote = True
+
+@app.after_request
+def remember_write(response):
+    if g.get('wrote'):
+        session['last_write'] = time.time()
+    return response
+
+@app.cli.command("sync-replicas")
+def sync_replicas_command():
+    from models import db
+    primary = db.engine.url
+    for key in replica_keys():
+        target = db.engines[key].url
+        if primary.get_backend_name() != 'sqlite' or target.get_backend_name() != 'sqlite':
+            print(f"{key}: not a SQLite file, skipped")
+            continue
+        # The backup API gives a consistent snapshot even while the primary is in use.
+        source, destination = sqlite3.connect(primary.database), sqlite3.connect(target.database)
+        try:
+            source.backup(destination)
+        finally:
+            source.close()
+            destination.close()
+        print(f"{key}: copied {primary.database} to {target.database}")
+
+app.config['SQLALCHEMY_BINDS'] = {**dict(zip(replica_keys(), replica_uris())), **app.config.get('SQLALCHEMY_BINDS', {})}
@@ -0,0 +1,167 @@
+from app import app
+from collections import Counter, defaultdict
+from sqlalchemy import event, select, update, insert, delete, func, case, true
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from models import db, Influencer, Campaign, AdRequest, CampaignRollup, CampaignNiche
+
+# One campaign_rollups row per campaign holds the figures shown on the
+# tracking page. campaign_niches keeps a request count per (campaign, niche)
+# so the distinct niche count can be maintained without rescanning requests.
+# Both are adjusted in the flush that changes the underlying ad requests.
+STATUS_COLUMNS = {
+    'Pending': 'pending_requests',
+    'Accepted': 'accepted_requests',
+    'Rejected': 'rejected_requests',
+}
+TRACKED = ['campaign_id', 'influencer_id', 'status', 'payment_status', 'payment_amount']
+
+def for_campaign(campaign):
+    if campaign.rollup:
+        return campaign.rollup
+    return CampaignRollup(campaign_id=campaign.id, total_requests=0, accepted_requests=0,
+                          rejected_requests=0, pending_requests=0, spend=0, niches=0)
+
+def previous_value(obj, attr):
+    history = get_history(obj, attr)
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(obj, attr)
+
+def influencer_niche(conn, influencer_id):
+    if influencer_id is None:
+        return None
+    return conn.execute(select(Influencer.niche).where(Influencer.id == int(influencer_id))).scalar()
+
+def contribute(rollup_deltas, niche_deltas, values, niche, sign):
+    if values['campaign_id'] is None:
+        return
+    campaign_id = int(values['campaign_id'])
+    deltas = rollup_deltas[campaign_id]
+    deltas['total_requests'] += sign
+    status_column = STATUS_COLUMNS.get(values['status'] or 'Pending')
+    if status_column:
+        deltas[status_column] += sign
+    if values['payment_status']:
+        deltas['spend'] += sign * float(values['payment_amount'] or 0)
+    if niche is not None:
+        niche_deltas[campaign_id][niche] += sign
+
+@event.listens_for(Session, 'before_flush')
+def track_rollups(session, flush_context, instances):
+    rollup_deltas = defaultdict(Counter)
+    niche_deltas = defaultdict(Counter)
+    dropped = set()
+    conn = None
+
+    for obj in session.new:
+        if isinstance(obj, AdRequest):
+            conn = conn or session.connection()
+            values = {attr: getattr(obj, attr) for attr in TRACKED}
+            contribute(rollup_deltas, niche_deltas, values, influencer_niche(conn, values['influencer_id']), 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, AdRequest):
+            conn = conn or session.connection()
+            values = {attr: previous_value(obj, attr) for attr in TRACKED}
+            contribute(rollup_deltas, niche_deltas, values, influencer_niche(conn, values['influencer_id']), -1)
+        elif isinstance(obj, Campaign):
+            dropped.add(obj.id)
+
+    for obj in session.dirty:
+        if obj in session.deleted:
+            continue
+        if isinstance(obj, AdRequest):
+            if not any(get_history(obj, attr).has_changes() for attr in TRACKED):
+                continue
+            conn = conn or session.connection()
+            old = {attr: previous_value(obj, attr) for attr in TRACKED}
+            new = {attr: getattr(obj, attr) for attr in TRACKED}
+            contribute(rollup_deltas, niche_deltas, old, influencer_niche(conn, old['influencer_id']), -1)
+            contribute(rollup_deltas, niche_deltas, new, influencer_niche(conn, new['influencer_id']), 1)
+        elif isinstance(obj, Influencer):
+            history = get_history(obj, 'niche')
+            if not (history.added and history.deleted) or history.added[0] == history.deleted[0]:
+                continue
+            conn = conn or session.connection()
+            per_campaign = conn.execute(
+                select(AdRequest.campaign_id, func.count(AdRequest.id))
+                .where(AdRequest.influencer_id == obj.id, AdRequest.campaign_id.isnot(None))
+                .group_by(AdRequest.campaign_id))
+            for campaign_id, requests in per_campaign:
+                niche_deltas[campaign_id][history.deleted[0]] -= requests
+                niche_deltas[campaign_id][history.added[0]] += requests
+
+    for campaign_id in dropped:
+        rollup_deltas.pop(campaign_id, None)
+        niche_deltas.pop(campaign_id, None)
+    if dropped:
+        conn = conn or session.connection()
+        conn.execute(delete(CampaignNiche).where(CampaignNiche.campaign_id.in_(dropped)))
+        conn.execute(delete(CampaignRollup).where(CampaignRollup.campaign_id.in_(dropped)))
+    if rollup_deltas or niche_deltas:
+        apply(conn or session.connection(), rollup_deltas, niche_deltas)
+
+def apply(conn, rollup_deltas, niche_deltas):
+    for campaign_id, deltas in rollup_deltas.items():
+        values = {column: getattr(CampaignRollup, column) + delta for column, delta in deltas.items()}
+        result = conn.execute(update(CampaignRollup).where(CampaignRollup.campaign_id == campaign_id).values(**values))
+        if result.rowcount == 0:
+            conn.execute(insert(CampaignRollup).values(campaign_id=campaign_id, niches=0, **dict(deltas)))
+
+    for campaign_id, deltas in niche_deltas.items():
+        for niche, delta in deltas.items():
+            if not delta:
+                continue
+            result = conn.execute(update(CampaignNiche)
+                                  .where(CampaignNiche.campaign_id == campaign_id, CampaignNiche.niche == niche)
+                                  .values(requests=CampaignNiche.requests + delta))
+            if result.rowcount == 0:
+                conn.execute(insert(CampaignNiche).values(campaign_id=campaign_id, niche=niche, requests=delta))
+        conn.execute(delete(CampaignNiche).where(CampaignNiche.campaign_id == campaign_id, CampaignNiche.requests <= 0))
+        niches = select(func.count()).select_from(CampaignNiche).where(CampaignNiche.campaign_id == campaign_id).scalar_subquery()
+        conn.execute(update(CampaignRollup).where(CampaignRollup.campaign_id == campaign_id).values(niches=niches))
+
+def rebuild(conn):
+    conn.execute(delete(CampaignNiche))
+    conn.execute(delete(CampaignRollup))
+    niche_rows = conn.execute(
+        select(AdRequest.campaign_id, Influencer.niche, func.count(AdRequest.id))
+        .join(Influencer, Influencer.id == AdRequest.influencer_id)
+        .where(AdRequest.campaign_id.isnot(None))
+        .group_by(AdRequest.campaign_id, Influencer.niche)).all()
+    niches = Counter(campaign_id for campaign_id, niche, requests in niche_rows)
+    rollup_rows = conn.execute(
+        select(AdRequest.campaign_id,
+               func.count(AdRequest.id),
+               func.sum(case((AdRequest.status == 'Accepted', 1), else_=0)),
+               func.sum(case((AdRequest.status == 'Rejected', 1), else_=0)),
+               func.sum(case((AdRequest.status == 'Pending', 1), else_=0)),
+               func.coalesce(func.sum(case((AdRequest.payment_status == true(), AdRequest.payment_amount), else_=0)), 0))
+        .where(AdRequest.campaign_id.isnot(None))
+        .group_by(AdRequest.campaign_id)).all()
+    if rollup_rows:
+        conn.execute(insert(CampaignRollup), [
+            {'campaign_id': campaign_id, 'total_requests': total, 'accepted_requests': accepted,
+             'rejected_requests': rejected, 'pending_requests': pending, 'spend': spend,
+             'niches': niches[campaign_id]}
+            for campaign_id, total, accepted, rejected, pending, spend in rollup_rows])
+    if niche_rows:
+        conn.execute(insert(CampaignNiche), [
+            {'campaign_id': campaign_id, 'niche': niche, 'requests': requests}
+            for campaign_id, niche, requests in niche_rows])
+    return len(rollup_rows)
+
+# Same as in stats.py: make the ORM load the old value on assignment so an
+# expired row still reports what it contributed before the change.
+for attr in TRACKED:
+    event.listen(getattr(AdRequest, attr), 'set', lambda target, value, oldvalue, initiator: value, active_history=True, retval=True)
+event.listen(Influencer.niche, 'set', lambda target, value, oldvalue, initiator: value, active_history=True, retval=True)
+
+@app.cli.command("rebuild-rollups")
+def rebuild_rollups_command():
+    with db.engine.begin() as conn:
+        campaigns = rebuild(conn)
+    print(f"Rebuilt rollups for {campaigns} campaigns")
@@ -2,29 +2,43 @@ from app import app
 import re
 from flask import render_template, request, flash, redirect, url_for, session
 from models import db, Influencer, Sponsor, Admin, Campaign, AdRequest, Flag
-from werkzeug.security import generate_password_hash, check_password_hash
+import stats
+import rollups
+import transitions
+import invitations
+import negotiation
+import events
+import flag_index
+import passwords
+from pagination import paginate
+from validation import is_valid_password, check_registration, check_campaign
+import search
+import facets
+import exports
+import bulk_import
+from sql_stats import query_budget
+from page_cache import cache_anonymous
+from replicas import read_only
 from functools import wraps
 from datetime import datetime
-from sqlalchemy import desc, func
+from sqlalchemy import desc
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, contains_eager, raiseload
 
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from io import BytesIO
-
-from flask import send_file
+from flask import send_file, Response, stream_with_context
 
 @app.route("/")
+@cache_anonymous
 def index():
     return render_template('index.html')
 
 @app.route("/login")
+@cache_anonymous
 def login():
     return render_template('login.html')
 
 @app.route("/register")
+@cache_anonymous
 def register():
     return render_template('register.html')
 
@@ -56,15 +70,15 @@ def login_post():
         flash(f"Error : {user_type.capitalize()} not registered")
         return redirect(url_for('register'))
     
-    if not check_password_hash(user.passhash, password):
+    if not passwords.verify_and_upgrade(user, password):
         flash("Error: Incorrect password")
         return redirect(url_for('login'))
+    db.session.commit()
     
     session['user_type'] = user_type
     session['id'] = user.id
 
-    flag = Flag.query.filter_by(entity_type=session['user_type'], entity_id=session['id']).first()
-    if flag:
+    if flag_index.is_flagged(session['user_type'], session['id']):
         session['is_flagged'] = True
         flash("Error : Your account has been flagged. Please contact our support team at support@adconnect.in ")
         return redirect(url_for('login'))
@@ -73,84 +87,35 @@ def login_post():
     flash(f"{user_type.capitalize()} login successful")
     return redirect(url_for('index'))
 
-def is_valid_password(password):
-    if len(password) < 8:
-        return "Password must be at least 8 characters long"
-    if not re.search("[a-z]", password) or not re.search("[A-Z]", password):
-        return "Password must contain both uppercase and lowercase letters"
-    if not re.search("[0-9]", password):
-        return "Password must contain at least one number"
-    if not re.search("[@#$%^&+=]", password):
-        return "Password must contain at least one special character (@#$%^&+=)"
-    return None
-
 @app.route("/register", methods=["POST"])
 def register_post():
-    user_type = request.form.get("user_type")
-    username = request.form.get("username")
-    password = request.form.get("password")
-    confirm_password = request.form.get("confirm_password")
-    name = request.form.get("name")
-
-    if not user_type or not username or not password or not confirm_password or not name:
-        flash("Error : Please fill all required fields")
-        return redirect(url_for('register'))
-    
-    if len(username) < 3 or len(username) > 20:
-        flash("Error: Username must be between 3 and 20 characters")
-        return redirect(url_for('register'))
-    if not username.isalnum():
-        flash("Error: Username must contain only letters and numbers")
-        return redirect(url_for('register'))
-
-    if password != confirm_password:
-        flash("Error : Passwords do not match")
-        return redirect(url_for('register'))
-    password_error = is_valid_password(password)
-    if password_error:
-        flash(f"Error : {password_error}")
-        return redirect(url_for('register'))
-    if not name or not name.replace(" ", "").isalpha():
-        flash("Error : Name should contain only alphabetic characters")
-        return redirect(url_for('register'))
-    if user_type == "influencer":
-        additional_fields = {"category": request.form.get("category"), "niche": request.form.get("niche"), "reach" : request.form.get("reach")}
-        user_class = Influencer
-    elif user_type == "sponsor":
-        additional_fields = {"budget": request.form.get("budget"), "industry": request.form.get("industry")}
-        try:
-            budget = float(request.form.get("budget"))
-            if budget <= 0:
-                flash("Error: Budget must be a positive number")
-                return redirect(url_for('register'))
-        except ValueError:
-            flash("Error: Invalid budget amount")
-            return redirect(url_for('register'))
-        user_class = Sponsor
-    else:
-        flash("Error: Invalid user type")
+    user_class, attrs, error = check_registration(request.form)
+    if error:
+        flash(error)
         return redirect(url_for('register'))
 
-    if not all(additional_fields.values()):
-        flash("Error: Please fill all required fields")
-        return redirect(url_for('register'))
-    
-    if user_class.query.filter_by(username=username).first():
+    if user_class.query.filter_by(username=attrs['username']).first():
         flash("Error: Username already taken")
         return redirect(url_for('register'))
     
-    new_user = user_class(username=username, passhash=generate_password_hash(password), name=name, **additional_fields)
+    new_user = user_class(passhash=passwords.hash_password(request.form.get("password")), **attrs)
     db.session.add(new_user)
     db.session.commit()
 
-    flash(f"{user_type.capitalize()} successfully registered")
+    flash(f"{request.form.get('user_type').capitalize()} successfully registered")
     return redirect(url_for('login'))
 
+def account_flagged():
+    flagged = flag_index.is_flagged(session['user_type'], session['id'])
+    if session.get('is_flagged') != flagged:
+        session['is_flagged'] = flagged
+    return flagged
+
 def auth_required(inner_func):
     @wraps(inner_func)
     def decorated_func(*args, **kwargs):
         if session.get("id"):
-            if session['is_flagged'] == True:
+            if account_flagged():
                 flash("Error : Your account has been flagged. Please contact our support team at support@adconnect.in ")
                 return redirect(url_for('login'))
             else:
@@ -165,7 +130,7 @@ def sponsor_required(inner_func):
     def decorated_func(*args, **kwargs):
         if session.get("id"):
             if session.get("user_type") == "sponsor":
-                if session['is_flagged'] == True:
+                if account_flagged():
                     flash("Error : Your account has been flagged. Please contact our support team at support@adconnect.in ")
                     return redirect(url_for('login'))
                 else:
@@ -183,7 +148,7 @@ def influencer_required(inner_func):
     def decorated_func(*args, **kwargs):
         if session.get("id"):
             if session.get("user_type") == "influencer":
-                if session['is_flagged'] == True:
+                if account_flagged():
                     flash("Error : Your account has been flagged. Please contact our support team at support@adconnect.in ")
                     return redirect(url_for('login'))
                 else:
@@ -196,6 +161,11 @@ def influencer_required(inner_func):
             return redirect(url_for('login'))
     return decorated_func
 
+@app.route("/events")
+@auth_required
+def event_stream():
+    return events.stream((session['user_type'], session['id']), request.headers.get('Last-Event-ID', type=int))
+
 @app.route("/profile")
 @auth_required
 def profile():
@@ -234,7 +204,7 @@ def update_profile_sponsor():
 
     sponsor = Sponsor.query.filter_by(id = session['id']).first()
     if password:
-        if check_password_hash(sponsor.passhash , password):
+        if passwords.check_password(sponsor.passhash , password):
             if username and sponsor.username != username:
                 if Sponsor.query.filter_by(username = username).first():
                     flash("Error : Username already exists.")
@@ -256,7 +226,7 @@ def update_profile_sponsor():
                         flash(f"Error : {password_error}")
                         return redirect(url_for('profile'))
                     else:
-                        sponsor.passhash = generate_password_hash(new_password)
+                        sponsor.passhash = passwords.hash_password(new_password)
                         updated_fields.append("Password")
                 else:
                     flash("Error : New password must be different from the current password and confirm password should match")
@@ -315,63 +285,12 @@ def create_campaign(sponsor_id):
 @app.route("/sponsor/<int:sponsor_id>/create_campaign", methods=['POST'])
 @sponsor_required
 def create_campaign_post(sponsor_id):
-    name = request.form.get('campaign_name')
-    description = request.form.get("description")
-    start_date = request.form.get("start_date")
-    end_date = request.form.get("end_date")
-    budget = request.form.get("budget")
-    visibility = request.form.get("visibility")
-    goals = request.form.get("goals")
-    requirements = request.form.get('requirements')
-    payment = request.form.get('payment')
-    
-    if not all([name,description,start_date,end_date,budget,visibility,goals, requirements,payment]):
-        flash("Error : Please enter all required fields")
-        return redirect(url_for('create_campaign', sponsor_id=sponsor_id))
-    try:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-    except ValueError:
-        flash("Error: Invalid date format", "danger")
-        return redirect(url_for('create_campaign', sponsor_id=sponsor_id))
-    if start_date < datetime.now().date():
-        flash("Error : Start date cannot be before today")
-        return redirect(url_for('create_campaign', sponsor_id=sponsor_id))
-    if start_date > end_date:
-        flash("Error : Start date cannot be after end date")
-        return redirect(url_for('create_campaign', sponsor_id=sponsor_id))
-
-    try:
-        budget = float(budget)
-        if budget < 0:
-            raise ValueError
-    except ValueError:
-        flash("Error : Budget must be a positive number")
+    attrs, error = check_campaign(request.form)
+    if error:
+        flash(error)
         return redirect(url_for('create_campaign', sponsor_id=sponsor_id))
 
-    if not (visibility=="public" or visibility=="private"):
-        flash("Error : Visibility should be either public or private")
-        return redirect(url_for('create_campaign', sponsor_id=sponsor_id)) 
-
-    try:
-        payment = float(payment)
-        if payment < 0:
-            raise ValueError
-    except ValueError:
-        flash("Error : Payment amount must be a positive number")
-        return redirect(url_for('create_campaign', sponsor_id=sponsor_id))
-    
-
-    campaign = Campaign(name = name, 
-                        description = description, 
-                        start_date = start_date, 
-                        end_date=end_date,
-                        budget=budget, 
-                        visibility=visibility,
-                        goals = goals,
-                        requirements = requirements,
-                        payment_amount = payment,
-                        sponsor_id = sponsor_id)
+    campaign = Campaign(sponsor_id = sponsor_id, **attrs)
     
     db.session.add(campaign)
     db.session.commit()
@@ -380,19 +299,19 @@ def create_campaign_post(sponsor_id):
 
 @app.route("/sponsor/<int:sponsor_id>/show_campaigns")
 @sponsor_required
+@query_budget(3)
+@read_only
 def show_campaigns(sponsor_id):
-    campaigns = Campaign.query.filter_by(sponsor_id = sponsor_id).order_by(desc(Campaign.id)).all()
+    page = paginate(Campaign.query.filter_by(sponsor_id = sponsor_id), Campaign.id, descending=True)
     sponsor = Sponsor.query.filter_by(id=sponsor_id).first()
-    flagged_campaigns = Flag.query.filter_by(entity_type='campaign').all()
-    flagged_campaign_ids = {flag.entity_id for flag in flagged_campaigns}
+    flagged_campaign_ids = flag_index.flagged_ids('campaign')
 
-    return render_template("sponsor/show_campaigns.html", campaigns = campaigns,sponsor = sponsor,flagged_campaign_ids=flagged_campaign_ids)
+    return render_template("sponsor/show_campaigns.html", campaigns = page.items,page=page,sponsor = sponsor,flagged_campaign_ids=flagged_campaign_ids)
 
 @app.route("/campaign/<int:campaign_id>/update")
 @sponsor_required
 def update_campaign(campaign_id):
-    flagged = Flag.query.filter_by(entity_type='campaign',entity_id=campaign_id).first()
-    if flagged:
+    if flag_index.is_flagged('campaign', campaign_id):
         flash("Error : This campaign has been flagged. Please contact our support team at support@adconnect.in ")
         return redirect(url_for('show_campaigns',sponsor_id=session['id']))
     campaign = Campaign.query.filter_by(id=campaign_id).first()
@@ -401,8 +320,7 @@ def update_campaign(campaign_id):
 @app.route("/campaign/<int:campaign_id>/update" , methods=['POST'])
 @sponsor_required
 def update_campaign_post(campaign_id):
-    flagged = Flag.query.filter_by(entity_type='campaign',entity_id=campaign_id).first()
-    if flagged:
+    if flag_index.is_flagged('campaign', campaign_id):
         flash("Error : This campaign has been flagged. Please contact our support team at support@adconnect.in ")
         return redirect(url_for('show_campaigns',sponsor_id=session['id']))
     campaign = Campaign.query.get(campaign_id)
@@ -491,42 +409,82 @@ def delete_campaign_post(campaign_id):
     return redirect(url_for('sponsor_home'))
 
 @app.route("/campaign/<int:campaign_id>/track")
+@query_budget(1)
+@read_only
 def track_campaign(campaign_id):
-    campaign = Campaign.query.get(campaign_id)
-    ad_requests = AdRequest.query.filter_by(campaign_id = campaign_id).all()
-    spendings = sum(ad_request.payment_amount for ad_request in ad_requests if ad_request.payment_status == 1)
-    unique_platforms = set(ad_request.influencer.niche for ad_request in ad_requests if ad_request.influencer)
-    return render_template('/sponsor/track_campaigns.html',campaign=campaign,spendings=spendings,ad_requests=ad_requests,unique_platforms=unique_platforms)
+    campaign = Campaign.query.options(joinedload(Campaign.rollup)).filter_by(id=campaign_id).first()
+    if not campaign:
+        flash("Error : Campaign does not exist")
+        return redirect(url_for('index'))
+    rollup = rollups.for_campaign(campaign)
+    return render_template('/sponsor/track_campaigns.html',campaign=campaign,rollup=rollup)
 
 @app.route("/sponsor/search")
 @sponsor_required
+@read_only
 def search_influencer():
-    categories = set([influencer.category for influencer in Influencer.query.distinct(Influencer.category).all()])
-    niches = set([influencer.niche for influencer in Influencer.query.distinct(Influencer.niche).all()])
+    facet_counts = facets.load('category', 'niche')
+    categories, niches = facet_counts['category'], facet_counts['niche']
 
-    influencers = Influencer.query.all()
-    return render_template("/sponsor/search_influencers.html", influencers = influencers, categories=categories, niches=niches)
+    page = paginate(Influencer.query, Influencer.id)
+    campaigns = Campaign.query.filter_by(sponsor_id=session['id']).all()
+    return render_template("/sponsor/search_influencers.html", influencers = page.items, page=page, categories=categories, niches=niches, campaigns=campaigns)
 
 @app.route("/sponsor/search", methods=["POST"])
 @sponsor_required
+@read_only
 def search_influencer_post():
     category = request.form.get('category')
     niche = request.form.get('niche')
     reach = request.form.get("reach")
     
-    query = Influencer.query
-    if category:
-        query = query.filter(Influencer.category == category)
-    if niche:
-        query = query.filter(Influencer.niche == niche)
-    if reach:
-        query = query.filter(Influencer.reach >= int(reach))
+    query = Influencer.query.filter(*invitations.influencer_criteria(category, niche, reach))
 
-    influencers = query.all()
-    categories = set([influencer.category for influencer in Influencer.query.distinct(Influencer.category).all()])
-    niches = set([influencer.niche for influencer in Influencer.query.distinct(Influencer.niche).all()])
+    page = paginate(query, Influencer.id)
+    facet_counts = facets.load('category', 'niche')
+    categories, niches = facet_counts['category'], facet_counts['niche']
+    campaigns = Campaign.query.filter_by(sponsor_id=session['id']).all()
 
-    return render_template("/sponsor/search_influencers.html", influencers = influencers, categories=categories, niches=niches)
+    return render_template("/sponsor/search_influencers.html", influencers = page.items, page=page, categories=categories, niches=niches, campaigns=campaigns)
+
+@app.route("/sponsor/invite_influencers", methods=["POST"])
+@sponsor_required
+def invite_influencers():
+    campaign, attrs, error = invitations.check_invitation(session['id'], request.form)
+    if error:
+        flash(f"Error : {error}")
+        return redirect(url_for('search_influencer'))
+    criteria, error = invitations.selection(request.form.get('scope'), ids=request.form.getlist('influencer_ids'),
+                                            category=request.form.get('category'), niche=request.form.get('niche'),
+                                            reach=request.form.get('reach'))
+    if error:
+        flash(f"Error : {error}")
+        return redirect(url_for('search_influencer'))
+    try:
+        created, skipped, error = invitations.fan_out(campaign, criteria, attrs)
+    except IntegrityError:
+        created, skipped, error = 0, 0, invitations.CONFLICT
+    if error:
+        db.session.rollback()
+        flash(f"Error : {error}")
+        return redirect(url_for('search_influencer'))
+    db.session.commit()
+    flash(f"{created} ad request(s) sent, {skipped} skipped as already requested")
+    return redirect(url_for('show_ad_requests_sponsor', sponsor_id=session['id']))
+
+@app.route("/campaign/<int:campaign_id>/match_influencers")
+@sponsor_required
+@read_only
+def match_influencers(campaign_id):
+    campaign = Campaign.query.options(joinedload(Campaign.sponsor)).filter_by(id=campaign_id, sponsor_id=session['id']).first()
+    if not campaign:
+        flash("Error : Campaign does not exist")
+        return redirect(url_for('sponsor_home'))
+    import matching
+    matches = matching.top_matches(campaign, k=app.config['MATCHING_TOP_K'])
+    influencers = {influencer.id: influencer for influencer in Influencer.query.filter(Influencer.id.in_([match.influencer_id for match in matches]))}
+    matches = [(influencers[match.influencer_id], match) for match in matches if match.influencer_id in influencers]
+    return render_template('/sponsor/match_influencers.html', campaign=campaign, matches=matches)
 
 @app.route("/sponsor/search/<int:id>/view_influencer")
 @sponsor_required
@@ -559,11 +517,10 @@ def create_ad_request_post(influencer_id):
         return redirect(url_for('create_ad_request',influencer_id=influencer_id))
     
     campaign = Campaign.query.filter_by(id = campaign_id, sponsor_id=sponsor_id).first()
-    is_flagged = Flag.query.filter_by(entity_type='campaign', entity_id=campaign_id).first()
     if not campaign:
         flash("Error : Invalid campaign. Please select a valid campaign.")
         return redirect(url_for('create_ad_request', influencer_id=influencer_id))
-    if is_flagged:
+    if flag_index.is_flagged('campaign', campaign_id):
         flash("Error : This campaign has been flagged. You cannot create ad requests for this campaign. Kindly contact support at support@adconnect.in for more details.")
         return redirect(url_for('create_ad_request', influencer_id=influencer_id))
     influencer = Influencer.query.filter_by(id=inflcr_id).first()
@@ -584,22 +541,69 @@ def create_ad_request_post(influencer_id):
         campaign_id = campaign_id,
         influencer_id = inflcr_id,
         sponsor_id = sponsor_id,
-        messages = messages,
         requirements = requirements,
         payment_amount = payment_amount
     )
     db.session.add(ad_request)
-    db.session.commit()
+    if messages:
+        negotiation.post(ad_request, 'sponsor', sponsor_id, messages)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        flash("Error : This influencer already has an ad request for this campaign")
+        return redirect(url_for('create_ad_request', influencer_id=influencer_id))
     flash("Ad Request sent successfully")
     return redirect(url_for('sponsor_home'))
 
 @app.route('/sponsor/<int:sponsor_id>/show_ad_requests_sponsor')
 @sponsor_required
+@query_budget(3)
+@read_only
 def show_ad_requests_sponsor(sponsor_id):
     sponsor = Sponsor.query.filter_by(id = sponsor_id).first()
-    ad_requests = AdRequest.query.filter_by(sponsor_id = sponsor.id).order_by(desc(AdRequest.sponsor_accepted)).all()
+    ad_requests = AdRequest.query.filter_by(sponsor_id = sponsor.id).order_by(desc(AdRequest.sponsor_accepted)) \
+        .options(joinedload(AdRequest.campaign), joinedload(AdRequest.influencer), raiseload('*')).all()
     return render_template('/sponsor/show_ad_requests.html', sponsor=sponsor, ad_requests = ad_requests)
 
+# Single rows for pages that apply live updates. Not @read_only: the event
+# that triggers the fetch can arrive before a replica has the change.
+@app.route('/sponsor/<int:sponsor_id>/ad_requests/<int:ad_request_id>/row')
+@sponsor_required
+@query_budget(1)
+def sponsor_ad_request_row(sponsor_id, ad_request_id):
+    ad_request = AdRequest.query.filter_by(id=ad_request_id, sponsor_id=session['id']) \
+        .options(joinedload(AdRequest.campaign), joinedload(AdRequest.influencer), raiseload('*')).first()
+    if not ad_request or sponsor_id != session['id']:
+        return '', 404
+    return render_template('/sponsor/ad_request_row.html', ad_request=ad_request)
+
+def bulk_decision(party, owner_id, back):
+    if not (session['user_type'] == party and session['id'] == owner_id):
+        flash("Error : You are not authorized to access this page")
+        return redirect(url_for(f'{party}_home'))
+    decision = request.form.get('decision')
+    if decision not in transitions.DECISIONS:
+        flash("Error : Choose to accept or reject the ad requests")
+        return redirect(back)
+    criteria, error = transitions.selection(party, owner_id, request.form.get('scope'),
+                                            ids=request.form.getlist('ad_request_ids'),
+                                            campaign_id=request.form.get('campaign_id'),
+                                            status=request.form.get('status'),
+                                            awaiting=bool(request.form.get('awaiting')))
+    if error:
+        flash(f"Error : {error}")
+        return redirect(back)
+    updated = transitions.bulk_decide(party, decision, criteria)
+    db.session.commit()
+    flash(f"{updated} ad request(s) {decision}ed")
+    return redirect(back)
+
+@app.route('/sponsor/<int:sponsor_id>/bulk_decide_requests', methods=["POST"])
+@sponsor_required
+def sponsor_bulk_decide_requests(sponsor_id):
+    return bulk_decision('sponsor', sponsor_id, url_for('show_ad_requests_sponsor', sponsor_id=sponsor_id))
+
 @app.route('/sponsor/<int:sponsor_id>/sponsor_accept_request/<int:request_id>',methods=["POST"])
 @sponsor_required
 def sponsor_accept_request(sponsor_id,request_id):
@@ -629,11 +633,7 @@ def sponsor_accept_request(sponsor_id,request_id):
         flash("Error : Influencer does not exist")
         return redirect(url_for('sponsor_home'))
     
-    ad_request.sponsor_accepted = True
-    if ad_request.sponsor_accepted == True and ad_request.influencer_accepted == True:
-        ad_request.status = 'Accepted'
-    if ad_request.sponsor_accepted == False or ad_request.influencer_accepted == False:
-        ad_request.status = 'Rejected'
+    transitions.decide(ad_request, 'sponsor', 'accept')
 
     db.session.commit()
     flash("Ad Request accepted successfully")
@@ -667,12 +667,7 @@ def sponsor_reject_request(sponsor_id,request_id):
         flash("Error : Influencer does not exist")
         return redirect(url_for('sponsor_home'))
     
-    ad_request.sponsor_accepted = False
-
-    if ad_request.sponsor_accepted == True and ad_request.influencer_accepted == True:
-        ad_request.status = 'Accepted'
-    if ad_request.sponsor_accepted == False or ad_request.influencer_accepted == False:
-        ad_request.status = 'Rejected'
+    transitions.decide(ad_request, 'sponsor', 'reject')
 
     db.session.commit()
     flash("Ad Request rejected")
@@ -680,17 +675,18 @@ def sponsor_reject_request(sponsor_id,request_id):
 
 @app.route("/sponsor/<int:sponsor_id>/negotiate_ad_request_sponsor/<int:ad_request_id>")
 @sponsor_required
+@read_only
 def negotiate_ad_request_sponsor(sponsor_id,ad_request_id):
     sponsor = Sponsor.query.get(sponsor_id)
     if not sponsor:
         flash("Error : Sponsor does not exist")
         return redirect(url_for('sponsor_home'))
     ad_request = AdRequest.query.get(ad_request_id)
-    if not ad_request:
+    if not ad_request or ad_request.sponsor_id != sponsor_id:
         flash("Error : Ad Request does not exist")
         return redirect(url_for('sponsor_home'))
-    
-    return render_template("/sponsor/negotiate_ad_request.html", sponsor=sponsor,ad_request=ad_request)
+    page = negotiation.thread(ad_request.id)
+    return render_template("/sponsor/negotiate_ad_request.html", sponsor=sponsor,ad_request=ad_request, thread=page.items, page=page)
 
 @app.route("/sponsor/<int:sponsor_id>/negotiate_ad_request_sponsor/<int:ad_request_id>", methods=['POST'])
 @sponsor_required
@@ -700,7 +696,7 @@ def negotiate_ad_request_sponsor_post(sponsor_id,ad_request_id):
         flash("Error : Sponsor does not exist")
         return redirect(url_for('sponsor_home'))
     ad_request = AdRequest.query.get(ad_request_id)
-    if not ad_request:
+    if not ad_request or ad_request.sponsor_id != sponsor_id:
         flash("Error : Ad Request does not exist")
         return redirect(url_for('sponsor_home'))
     
@@ -713,16 +709,12 @@ def negotiate_ad_request_sponsor_post(sponsor_id,ad_request_id):
         flash("Error : Message cannot be empty")
         return redirect(url_for('sponsor_home'))
     
-    ad_request.messages = messages
-
-    if ad_request.sponsor_accepted == True and ad_request.influencer_accepted == True:
-        ad_request.status = 'Accepted'
-    if ad_request.sponsor_accepted == False or ad_request.influencer_accepted == False:
-        ad_request.status = 'Rejected'
+    negotiation.post(ad_request, 'sponsor', sponsor.id, messages)
+    transitions.refresh(ad_request)
 
     db.session.commit()
     flash("Message sent successfully")
-    return redirect(url_for('show_ad_requests_sponsor', sponsor_id = sponsor.id))
+    return redirect(url_for('negotiate_ad_request_sponsor', sponsor_id = sponsor.id, ad_request_id = ad_request.id))
 
 @app.route("/sponsor/<int:sponsor_id>/delete_ad_request/<int:ad_request_id>")
 @sponsor_required
@@ -786,6 +778,7 @@ def make_payment_post(ad_request_id):
 
     ad_request.payment_amount = payment_amount
     ad_request.payment_status = True
+    ad_request.paid_at = datetime.now()
     db.session.commit()
     flash("Payment successful")
     return redirect(url_for('make_payment',ad_request_id = ad_request.id))
@@ -793,88 +786,53 @@ def make_payment_post(ad_request_id):
 @app.route("/sponsor/ad_request/<int:ad_request_id>/download_invoice")
 @sponsor_required
 def download_invoice(ad_request_id):
-    ad_request = AdRequest.query.get(ad_request_id)
+    ad_request = AdRequest.query.options(joinedload(AdRequest.campaign), joinedload(AdRequest.sponsor), joinedload(AdRequest.influencer)).filter_by(id=ad_request_id).first()
     if not ad_request:
         flash("Error: Invalid Ad Request")
         return redirect(url_for('sponsor_home'))
 
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = styles['Title']
-    title_style.fontName = 'Times-Roman'
-    title_style.fontSize = 20
-    title_style.leading = 30
-    title_style.alignment = 1
-
-    subtitle_style = styles['Heading2']
-    subtitle_style.fontName = 'Times-Roman'
-    subtitle_style.fontSize = 14
-    subtitle_style.leading = 20
-    subtitle_style.alignment = 1
-
-    footer_style = styles['Normal']
-    footer_style.fontName = 'Times-Roman'
-    footer_style.fontSize = 12
-    footer_style.leading = 18
-    footer_style.alignment = 1
-
-    header_style = styles['Heading1']
-    header_style.fontName = 'Times-Roman'
-    header_style.fontSize = 14
-    header_style.leading = 18
-    header_style.alignment = 1
-
-    # Title and Subtitle
-    title = Paragraph("AdConnect", title_style)
-    subtitle = Paragraph(f"Invoice for Ad Request", subtitle_style)
-
-    elements.append(title)
-    elements.append(Spacer(1, 12))
-    elements.append(subtitle)
-    elements.append(Spacer(1, 24))
-
-    # Data for the table
-    data = [
-        ["Description", "Details"],
-        ["Campaign Name", ad_request.campaign.name],
-        ["Sponsor Name", ad_request.sponsor.username],
-        ["Influencer Name", ad_request.influencer.username],
-        ["Payment Amount", f"{ad_request.payment_amount:.2f}"],
-        ["Status", "Paid"]
-    ]
-
-    # Create the table
-    table = Table(data, colWidths=[2.5 * inch, 3.5 * inch])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.turquoise),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Times-Roman'),
-        ('FONTNAME', (0, 1), (-1, -1), 'Times-Roman'),
-        ('FONTSIZE', (0, 0), (-1, -1), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-    ]))
-
-    elements.append(table)
-    elements.append(Spacer(1, 24))  # Space between table and footer
-
-    # Footer
-    footer = Paragraph("Thank you for your payment!", footer_style)
-    elements.append(footer)
-
-    # Build the PDF
-    doc.build(elements)
-
-    buffer.seek(0)
-
-    return send_file(buffer, as_attachment=True, download_name=f"invoice_{ad_request.id}.pdf", mimetype='application/pdf')
+    import invoices
+    return send_file(invoices.open_invoice(ad_request), as_attachment=True, download_name=f"invoice_{ad_request.id}.pdf", mimetype='application/pdf')
+
 
+@app.route("/sponsor/<int:sponsor_id>/statement")
+@sponsor_required
+def statement(sponsor_id):
+    if session['id'] != sponsor_id:
+        flash("Error : You are not authorized to access this page")
+        return redirect(url_for('sponsor_home'))
+    sponsor = Sponsor.query.get(sponsor_id)
+    today = datetime.now().strftime('%Y-%m-%d')
+    return render_template('/sponsor/statement.html', sponsor=sponsor, today=today)
+
+@app.route("/sponsor/<int:sponsor_id>/statement/download")
+@sponsor_required
+def download_statement(sponsor_id):
+    if session['id'] != sponsor_id:
+        flash("Error : You are not authorized to access this page")
+        return redirect(url_for('sponsor_home'))
+    sponsor = Sponsor.query.get(sponsor_id)
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    file_format = request.args.get('format', 'pdf')
+    try:
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    except ValueError:
+        flash("Error : Invalid date format")
+        return redirect(url_for('statement', sponsor_id=sponsor_id))
+    if start_date and end_date and start_date > end_date:
+        flash("Error : Start date cannot be after end date")
+        return redirect(url_for('statement', sponsor_id=sponsor_id))
+    import statements
+    if file_format not in statements.FORMATS:
+        flash("Error : Statement format should be either pdf or zip")
+        return redirect(url_for('statement', sponsor_id=sponsor_id))
+
+    mimetype, chunks = statements.FORMATS[file_format]
+    filename = f"statement_{sponsor.username}_{start_date or 'start'}_{end_date or 'today'}.{file_format}"
+    return Response(stream_with_context(chunks(sponsor, start_date, end_date)), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 # #################################### influencer functions
 
@@ -897,7 +855,7 @@ def update_profile_influencer():
 
     influencer = Influencer.query.filter_by(id = session['id']).first()
     if password:
-        if check_password_hash(influencer.passhash , password):
+        if passwords.check_password(influencer.passhash , password):
             if username and influencer.username != username:
                 if Influencer.query.filter_by(username = username).first():
                     flash("Error : Username already exists.")
@@ -919,7 +877,7 @@ def update_profile_influencer():
                         flash(f"Error : {password_error}")
                         return redirect(url_for('profile'))
                     else:
-                        influencer.passhash = generate_password_hash(new_password)
+                        influencer.passhash = passwords.hash_password(new_password)
                         updated_fields.append("Password")
                 else:
                     flash("Error : New password must be different from the current password and confirm password should match")
@@ -978,55 +936,87 @@ def influencer_home():
 
 @app.route('/influencer/<int:influencer_id>/show_ad_requests')
 @influencer_required
+@query_budget(3)
+@read_only
 def show_ad_requests(influencer_id):
     influencer = Influencer.query.filter_by(id=influencer_id).first()
-    ad_requests = AdRequest.query.filter_by(influencer_id=influencer_id).order_by(desc(AdRequest.influencer_accepted)).all()
+    ad_requests = AdRequest.query.filter_by(influencer_id=influencer_id).order_by(desc(AdRequest.influencer_accepted)) \
+        .options(joinedload(AdRequest.campaign), joinedload(AdRequest.sponsor), raiseload('*')).all()
     return render_template("/influencer/show_ad_requests.html", influencer = influencer, ad_requests = ad_requests)
 
+@app.route('/influencer/<int:influencer_id>/ad_requests/<int:ad_request_id>/row')
+@influencer_required
+@query_budget(1)
+def influencer_ad_request_row(influencer_id, ad_request_id):
+    ad_request = AdRequest.query.filter_by(id=ad_request_id, influencer_id=session['id']) \
+        .options(joinedload(AdRequest.campaign), joinedload(AdRequest.sponsor), raiseload('*')).first()
+    if not ad_request or influencer_id != session['id']:
+        return '', 404
+    return render_template('/influencer/ad_request_row.html', ad_request=ad_request)
+
 @app.route('/influencer/<int:influencer_id>/search_campaigns')
 @influencer_required
+@query_budget(4)
+@read_only
 def search_campaigns(influencer_id):
     influencer = Influencer.query.filter_by(id=influencer_id).first()
-    industries = set([sponsor.industry for sponsor in Sponsor.query.distinct(Sponsor.industry).all()])
-    campaigns = Campaign.query.filter_by(visibility = "public" ).all()
-    return render_template("/influencer/search_campaigns.html", campaigns = campaigns, influencer = influencer, industries=industries)
+    industries = facets.counts('industry')
+    page = paginate(Campaign.query.filter_by(visibility = "public" ).options(joinedload(Campaign.sponsor), raiseload('*')), Campaign.id)
+    return render_template("/influencer/search_campaigns.html", campaigns = page.items, page=page, influencer = influencer, industries=industries)
 
 @app.route('/influencer/<int:influencer_id>/search_campaigns', methods=['POST'])
 @influencer_required
+@query_budget(4)
+@read_only
 def search_campaigns_post(influencer_id):
     industry = request.form.get('industry')
     budget = request.form.get('budget')
+    text = request.form.get('q')
     query=Campaign.query
     query = query.filter(Campaign.visibility=='public')
     if industry:
-        query=query.join(Campaign.sponsor).filter(Sponsor.industry == industry)
+        query=query.join(Campaign.sponsor).filter(Sponsor.industry == industry).options(contains_eager(Campaign.sponsor))
+    else:
+        query=query.options(joinedload(Campaign.sponsor))
     if budget:
         if float(budget) > 0:
             query = query.filter(Campaign.budget >= budget)
-    campaigns = query.all()
+    query = query.options(raiseload('*'))
+    if search.tokens(text):
+        page = None
+        campaigns = search.search(query, text).limit(app.config['SEARCH_RESULT_LIMIT']).all()
+    else:
+        page = paginate(query, Campaign.id)
+        campaigns = page.items
     influencer = Influencer.query.filter_by(id=influencer_id).first()
-    industries = set([sponsor.industry for sponsor in Sponsor.query.distinct(Sponsor.industry).all()])
-    return render_template("/influencer/search_campaigns.html", campaigns = campaigns, influencer = influencer, industries=industries)
+    industries = facets.counts('industry')
+    return render_template("/influencer/search_campaigns.html", campaigns = campaigns, page=page, influencer = influencer, industries=industries)
 
 @app.route('/influencer/<int:influencer_id>/<int:campaign_id>/<int:sponsor_id>/interested_campaign', methods=['POST'])
 @influencer_required
 def interested_campaign(campaign_id, sponsor_id,influencer_id):
-    existing_ad_request = AdRequest.query.filter_by(campaign_id=campaign_id,sponsor_id=sponsor_id,influencer_id=influencer_id).first()
-    if existing_ad_request:
-        flash("Ad request already initiated")
-        return redirect(url_for('influencer_home'))
     campaign=Campaign.query.get(campaign_id)
     adrequest = AdRequest(campaign_id = campaign_id, 
                           sponsor_id = sponsor_id, 
                           influencer_id = influencer_id, 
-                          messages="I am interested", 
                           requirements = campaign.requirements,
                           payment_amount = campaign.payment_amount)
     db.session.add(adrequest)
-    db.session.commit()
+    negotiation.post(adrequest, 'influencer', influencer_id, "I am interested")
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        flash("Ad request already initiated")
+        return redirect(url_for('influencer_home'))
     flash("Ad Request sent successfully")
     return redirect(url_for('influencer_home'))
 
+@app.route('/influencer/<int:influencer_id>/bulk_decide_requests', methods=["POST"])
+@influencer_required
+def influencer_bulk_decide_requests(influencer_id):
+    return bulk_decision('influencer', influencer_id, url_for('show_ad_requests', influencer_id=influencer_id))
+
 @app.route('/influencer/<int:influencer_id>/influencer_accept_request/<int:request_id>',methods=["POST"])
 @influencer_required
 def influencer_accept_request(influencer_id,request_id):
@@ -1055,12 +1045,7 @@ def influencer_accept_request(influencer_id,request_id):
     if not sponsor:
         flash("Error : Sponsor does not exist")
 
-    ad_request.influencer_accepted = True
-
-    if ad_request.sponsor_accepted == True and ad_request.influencer_accepted == True:
-        ad_request.status = 'Accepted'
-    if ad_request.sponsor_accepted == False or ad_request.influencer_accepted == False:
-        ad_request.status = 'Rejected'
+    transitions.decide(ad_request, 'influencer', 'accept')
 
     db.session.commit()
     flash("Ad Request accepted successfully")
@@ -1093,38 +1078,36 @@ def influencer_reject_request(influencer_id,request_id):
     if not sponsor:
         flash("Error : Sponsor does not exist")
         return redirect(url_for('influencer_home'))
-    ad_request.influencer_accepted = False
-
-    if ad_request.sponsor_accepted == True and ad_request.influencer_accepted == True:
-        ad_request.status = 'Accepted'
-    if ad_request.sponsor_accepted == False or ad_request.influencer_accepted == False:
-        ad_request.status = 'Rejected'
+    transitions.decide(ad_request, 'influencer', 'reject')
 
     db.session.commit()
     flash("Ad Request rejected")
     return redirect(url_for('influencer_home'))
 
 @app.route("/influencer/<int:influencer_id>/negotiate_ad_request_influencer/<int:ad_request_id>")
+@influencer_required
+@read_only
 def negotiate_ad_request_influencer(influencer_id,ad_request_id):
     influencer = Influencer.query.get(influencer_id)
     if not influencer:
         flash("Error : Influencer does not exist")
         return redirect(url_for('influencer_home'))
     ad_request = AdRequest.query.get(ad_request_id)
-    if not ad_request:
+    if not ad_request or ad_request.influencer_id != influencer_id:
         flash("Error : Ad Request does not exist")
         return redirect(url_for('influencer_home'))
-    
-    return render_template("/influencer/negotiate_ad_request.html", influencer=influencer,ad_request=ad_request)
+    page = negotiation.thread(ad_request.id)
+    return render_template("/influencer/negotiate_ad_request.html", influencer=influencer,ad_request=ad_request, thread=page.items, page=page)
 
 @app.route("/influencer/<int:influencer_id>/negotiate_ad_request_influencer/<int:ad_request_id>", methods=['POST'])
+@influencer_required
 def negotiate_ad_request_influencer_post(influencer_id,ad_request_id):
     influencer = Influencer.query.get(influencer_id)
     if not influencer:
         flash("Error : Influencer does not exist")
         return redirect(url_for('influencer_home'))
     ad_request = AdRequest.query.get(ad_request_id)
-    if not ad_request:
+    if not ad_request or ad_request.influencer_id != influencer_id:
         flash("Error : Ad Request does not exist")
         return redirect(url_for('influencer_home'))
     
@@ -1137,16 +1120,12 @@ def negotiate_ad_request_influencer_post(influencer_id,ad_request_id):
         flash("Error : Message cannot be empty")
         return redirect(url_for('influencer_home'))
     
-    ad_request.messages = messages
-
-    if ad_request.sponsor_accepted == True and ad_request.influencer_accepted == True:
-        ad_request.status = 'Accepted'
-    if ad_request.sponsor_accepted == False or ad_request.influencer_accepted == False:
-        ad_request.status = 'Rejected'
+    negotiation.post(ad_request, 'influencer', influencer.id, messages)
+    transitions.refresh(ad_request)
 
     db.session.commit()
     flash("Message sent successfully")
-    return redirect(url_for('show_ad_requests', influencer_id = influencer.id))
+    return redirect(url_for('negotiate_ad_request_influencer', influencer_id = influencer.id, ad_request_id = ad_request.id))
    
 
 ############################################################# 
@@ -1178,7 +1157,7 @@ def update_profile_admin():
 
     admin = Admin.query.filter_by(id = session['id']).first()
     if password:
-        if check_password_hash(admin.passhash , password):                    
+        if passwords.check_password(admin.passhash , password):                    
             if new_password or confirm_new_password: 
                 if password != new_password and new_password == confirm_new_password:
                     password_error = is_valid_password(new_password)
@@ -1186,7 +1165,7 @@ def update_profile_admin():
                         flash(f"Error : {password_error}")
                         return redirect(url_for('profile'))
                     else:
-                        admin.passhash = generate_password_hash(new_password)
+                        admin.passhash = passwords.hash_password(new_password)
                         flash("Password updated successfully")
                         return redirect(url_for('admin_home'))
                 else:
@@ -1204,45 +1183,28 @@ def update_profile_admin():
 
 @app.route('/admin/home')
 @admin_required
+@query_budget(3)
+@read_only
 def admin_home():
     admin = Admin.query.filter_by(id=session['id']).first()
-    influencers = Influencer.query.all()
-    sponsors =Sponsor.query.all()
-    private_campaigns = Campaign.query.filter_by(visibility ='private').all()
-    public_campaigns = Campaign.query.filter_by(visibility='public').all()
-    flagged_influencers = Flag.query.filter_by(entity_type='influencer').all()
-    flagged_sponsors = Flag.query.filter_by(entity_type='sponsor').all()
-    accepted_requests = AdRequest.query.filter_by(status="Accepted").all()
-    rejected_requests = AdRequest.query.filter_by(status="Rejected").all()
-    pending_requests = AdRequest.query.filter_by(status="Pending").all()
-
-    industry_distribution = db.session.query(
-        Sponsor.industry,
-        func.count(Sponsor.id).label('count')
-    ).group_by(Sponsor.industry).all()
-
-    niche_distribution = db.session.query(
-        Influencer.niche,
-        func.count(Influencer.id).label('count')
-    ).group_by(Influencer.niche).all()
-
-    niches = [item.niche for item in niche_distribution]
-    niche_counts = [item.count for item in niche_distribution]
-
-    # Process industry distribution into dictionaries
-    industries = [item.industry for item in industry_distribution]
-    counts = [item.count for item in industry_distribution]
+    counters = stats.dashboard_counters()
+
+    facet_counts = facets.load('industry', 'niche')
+    industries = [value for value, count in facet_counts['industry']]
+    counts = [count for value, count in facet_counts['industry']]
+    niches = [value for value, count in facet_counts['niche']]
+    niche_counts = [count for value, count in facet_counts['niche']]
     return render_template('/admin/admin_home.html',
                            admin = admin, 
-                           influencers=len(influencers), 
-                           sponsors=len(sponsors),
-                           private_campaigns=len(private_campaigns),
-                           public_campaigns=len(public_campaigns),
-                           flagged_influencers = len(flagged_influencers),
-                           flagged_sponsors = len(flagged_sponsors),
-                           no_of_acc_req = len(accepted_requests),
-                           no_of_rej_req = len(rejected_requests),
-                           no_of_pen_req = len(pending_requests),
+                           influencers=counters['influencers'], 
+                           sponsors=counters['sponsors'],
+                           private_campaigns=counters['campaigns_private'],
+                           public_campaigns=counters['campaigns_public'],
+                           flagged_influencers = counters['flagged_influencer'],
+                           flagged_sponsors = counters['flagged_sponsor'],
+                           no_of_acc_req = counters['ad_requests_Accepted'],
+                           no_of_rej_req = counters['ad_requests_Rejected'],
+                           no_of_pen_req = counters['ad_requests_Pending'],
                            industries=industries,
                            counts=counts,
                            niches=niches,
@@ -1251,36 +1213,68 @@ def admin_home():
 
 @app.route("/admin/manage_influencers")
 @admin_required
+@query_budget(3)
+@read_only
 def manage_influencers():
     admin=Admin.query.get(session['id'])
-    influencers = Influencer.query.all()
-    flagged_influencers = Flag.query.filter_by(entity_type='influencer').all()
-    flagged_influencer_ids = {flag.entity_id for flag in flagged_influencers}
+    page = paginate(Influencer.query, Influencer.id)
+    flagged_influencer_ids = flag_index.flagged_ids('influencer')
 
-    return render_template('/admin/manage_influencers.html', influencers = influencers, admin=admin,flagged_influencer_ids = flagged_influencer_ids)
+    return render_template('/admin/manage_influencers.html', influencers = page.items, page=page, admin=admin,flagged_influencer_ids = flagged_influencer_ids)
 
 @app.route("/admin/manage_sponsors")
 @admin_required
+@query_budget(3)
+@read_only
 def manage_sponsors():
     admin=Admin.query.get(session['id'])
-    sponsors = Sponsor.query.all()
-    flagged_sponsors = Flag.query.filter_by(entity_type='sponsor').all()
-    flagged_sponsor_ids = {flag.entity_id for flag in flagged_sponsors}
+    page = paginate(Sponsor.query, Sponsor.id)
+    flagged_sponsor_ids = flag_index.flagged_ids('sponsor')
 
-    return render_template('/admin/manage_sponsors.html', sponsors = sponsors, admin=admin, flagged_sponsor_ids=flagged_sponsor_ids)
+    return render_template('/admin/manage_sponsors.html', sponsors = page.items, page=page, admin=admin, flagged_sponsor_ids=flagged_sponsor_ids)
 
 
 @app.route("/admin/manage_campaigns")
 @admin_required
+@query_budget(3)
+@read_only
 def manage_campaigns():
     admin=Admin.query.get(session['id'])
-    campaigns = Campaign.query.all()
+    page = paginate(Campaign.query.options(joinedload(Campaign.sponsor), raiseload('*')), Campaign.id)
+
+    flagged_campaign_ids = flag_index.flagged_ids('campaign')
 
-    flagged_campaigns = Flag.query.filter_by(entity_type='campaign').all()
-    flagged_campaign_ids = {flag.entity_id for flag in flagged_campaigns}
+    return render_template('/admin/manage_campaigns.html', campaigns = page.items, page=page, admin=admin, flagged_campaign_ids=flagged_campaign_ids)
 
-    return render_template('/admin/manage_campaigns.html', campaigns = campaigns, admin=admin, flagged_campaign_ids=flagged_campaign_ids)
 
+@app.route("/admin/export/<entity>.<file_format>")
+@admin_required
+def export_entity(entity, file_format):
+    if entity not in exports.EXPORTS or file_format not in exports.FORMATS:
+        flash("Error : Unknown export")
+        return redirect(url_for('admin_home'))
+    mimetype, chunks = exports.FORMATS[file_format]
+    return Response(stream_with_context(chunks(exports.EXPORTS[entity])), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={entity}.{file_format}'})
+
+@app.route("/admin/import")
+@admin_required
+def import_data():
+    admin=Admin.query.get(session['id'])
+    return render_template('/admin/import.html', admin=admin, entities=list(bulk_import.ENTITIES), result=None)
+
+@app.route("/admin/import", methods=["POST"])
+@admin_required
+def import_data_post():
+    entity = request.form.get('entity')
+    upload = request.files.get('file')
+    if entity not in bulk_import.ENTITIES or not upload or not upload.filename:
+        flash("Error : Please choose what to import and a CSV or NDJSON file")
+        return redirect(url_for('import_data'))
+    result = bulk_import.import_file(entity, upload.stream, bulk_import.file_format(upload.filename))
+    flash(f"Imported {result.imported} {entity}, {len(result.errors)} rows rejected")
+    admin=Admin.query.get(session['id'])
+    return render_template('/admin/import.html', admin=admin, entities=list(bulk_import.ENTITIES), entity=entity, result=result)
 
 @app.route("/admin/<int:admin_id>/flag/<entity_type>/<int:entity_id>", methods=["POST"])
 @admin_required
@@ -1296,8 +1290,7 @@ def flag_entity(admin_id, entity_type, entity_id):
         return redirect(url_for('admin_home'))
     if entity_type == 'influencer':
         influencer = Influencer.query.get(entity_id)
-        flagged = Flag.query.filter_by(entity_id=entity_id, entity_type=entity_type).first()
-        if flagged:
+        if flag_index.is_flagged(entity_type, entity_id):
             flash(f"{entity_type.capitalize()} is already flagged")
             return redirect(url_for('admin_home'))
         if not influencer:
@@ -1305,8 +1298,7 @@ def flag_entity(admin_id, entity_type, entity_id):
             return redirect(url_for('admin_home'))
     if entity_type == 'sponsor':
         sponsor = Sponsor.query.get(entity_id)
-        flagged = Flag.query.filter_by(entity_id=entity_id, entity_type=entity_type).first()
-        if flagged:
+        if flag_index.is_flagged(entity_type, entity_id):
             flash(f"{entity_type.capitalize()} is already flagged")
             return redirect(url_for('admin_home'))
         if not sponsor:
@@ -1314,8 +1306,7 @@ def flag_entity(admin_id, entity_type, entity_id):
             return redirect(url_for('admin_home'))
     if entity_type == 'campaign':
         campaign = Campaign.query.get(entity_id)
-        flagged = Flag.query.filter_by(entity_id=entity_id, entity_type='entity_type').first()
-        if flagged:
+        if flag_index.is_flagged(entity_type, entity_id):
             flash(f"{entity_type.capitalize()} is already flagged")
             return redirect(url_for('admin_home'))
         if not campaign:
@@ -1342,8 +1333,7 @@ def unflag_entity(admin_id, entity_type, entity_id):
         return redirect(url_for('admin_home'))
     if entity_type == 'influencer':
         influencer = Influencer.query.get(entity_id)
-        flagged = Flag.query.filter_by(entity_id=entity_id, entity_type=entity_type).first()
-        if not flagged:
+        if not flag_index.is_flagged(entity_type, entity_id):
             flash(f"{entity_type.capitalize()} is not flagged")
             return redirect(url_for('admin_home'))
         if not influencer:
@@ -1351,8 +1341,7 @@ def unflag_entity(admin_id, entity_type, entity_id):
             return redirect(url_for('admin_home'))
     if entity_type == 'sponsor':
         sponsor = Sponsor.query.get(entity_id)
-        flagged = Flag.query.filter_by(entity_id=entity_id, entity_type=entity_type).first()
-        if not flagged:
+        if not flag_index.is_flagged(entity_type, entity_id):
             flash(f"{entity_type.capitalize()} is not flagged")
             return redirect(url_for('admin_home'))
         if not sponsor:
@@ -1360,8 +1349,7 @@ def unflag_entity(admin_id, entity_type, entity_id):
             return redirect(url_for('admin_home'))
     if entity_type == 'campaign':
         campaign = Campaign.query.get(entity_id)
-        flagged = Flag.query.filter_by(entity_id=entity_id, entity_type=entity_type).first()
-        if not flagged:
+        if not flag_index.is_flagged(entity_type, entity_id):
             flash(f"{entity_type.capitalize()} is not flagged")
             return redirect(url_for('admin_home'))
         if not campaign:
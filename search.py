@@ -0,0 +1,130 @@
+from app import app
+import re
+from sqlalchemy import event, text, or_, and_, case, table, column
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from models import db, Campaign
+
+# Full-text search over campaign name, description, goals and requirements.
+# On SQLite the text lives in an FTS5 table keyed by campaign id and ranked
+# with bm25; other databases fall back to LIKE matching. The backend is picked
+# by CAMPAIGN_SEARCH_BACKEND ("auto", "fts5" or "like").
+TEXT_COLUMNS = ['name', 'description', 'goals', 'requirements']
+
+def tokens(query_text):
+    return re.findall(r"\w+", query_text or "")
+
+class LikeSearch:
+    name = 'like'
+
+    def create(self, conn):
+        pass
+
+    def index(self, conn, campaigns):
+        pass
+
+    def remove(self, conn, campaign_ids):
+        pass
+
+    def rebuild(self, conn):
+        return 0
+
+    def apply(self, query, query_text):
+        terms = tokens(query_text)
+        for term in terms:
+            pattern = f"%{term}%"
+            query = query.filter(or_(*[getattr(Campaign, name).ilike(pattern) for name in TEXT_COLUMNS]))
+        if terms:
+            in_name = and_(*[Campaign.name.ilike(f"%{term}%") for term in terms])
+            query = query.order_by(case((in_name, 0), else_=1), Campaign.id)
+        return query
+
+class FTS5Search:
+    name = 'fts5'
+    table = table('campaign_search', column('rowid'))
+    # bm25 weights follow TEXT_COLUMNS: a hit in the name counts most.
+    rank = text("bm25(campaign_search, 10.0, 2.0, 4.0, 4.0)")
+
+    def create(self, conn):
+        conn.execute(text("CREATE VIRTUAL TABLE IF NOT EXISTS campaign_search USING fts5("
+                          "name, description, goals, requirements, tokenize='porter unicode61')"))
+
+    def index(self, conn, campaigns):
+        rows = [{'id': c.id, **{name: getattr(c, name) or '' for name in TEXT_COLUMNS}} for c in campaigns]
+        if not rows:
+            return
+        self.remove(conn, [row['id'] for row in rows])
+        conn.execute(text("INSERT INTO campaign_search (rowid, name, description, goals, requirements) "
+                          "VALUES (:id, :name, :description, :goals, :requirements)"), rows)
+
+    def remove(self, conn, campaign_ids):
+        if campaign_ids:
+            conn.execute(text("DELETE FROM campaign_search WHERE rowid = :id"), [{'id': i} for i in campaign_ids])
+
+    def rebuild(self, conn):
+        self.create(conn)
+        conn.execute(text("DELETE FROM campaign_search"))
+        result = conn.execute(text("INSERT INTO campaign_search (rowid, name, description, goals, requirements) "
+                                   "SELECT id, name, COALESCE(description, ''), COALESCE(goals, ''), requirements FROM campaigns"))
+        return result.rowcount
+
+    def match_expression(self, query_text):
+        terms = tokens(query_text)
+        if not terms:
+            return None
+        # Quote every term so user input can't use FTS5 query syntax; the
+        # last term is a prefix match to cover partially typed words.
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return " ".join(quoted)
+
+    def apply(self, query, query_text):
+        expression = self.match_expression(query_text)
+        if expression is None:
+            return query
+        return query.join(self.table, self.table.c.rowid == Campaign.id) \
+            .filter(text("campaign_search MATCH :match").bindparams(match=expression)) \
+            .order_by(self.rank, Campaign.id)
+
+BACKENDS = {'like': LikeSearch(), 'fts5': FTS5Search()}
+
+def fts5_available(bind):
+    if bind.dialect.name != 'sqlite':
+        return False
+    options = {row[0] for row in bind.execute(text("PRAGMA compile_options"))}
+    return 'ENABLE_FTS5' in options
+
+_resolved = {}
+
+def backend(bind=None):
+    choice = app.config.get('CAMPAIGN_SEARCH_BACKEND') or 'auto'
+    if choice != 'auto':
+        return BACKENDS[choice]
+    bind = bind or db.session.connection()
+    key = str(bind.engine.url)
+    if key not in _resolved:
+        _resolved[key] = BACKENDS['fts5' if fts5_available(bind) else 'like']
+    return _resolved[key]
+
+def search(query, query_text):
+    return backend().apply(query, query_text)
+
+@event.listens_for(Session, 'after_flush')
+def sync_search_index(session, flush_context):
+    changed = [obj for obj in session.new if isinstance(obj, Campaign)]
+    changed += [obj for obj in session.dirty if isinstance(obj, Campaign) and obj not in session.deleted
+                and any(get_history(obj, name).has_changes() for name in TEXT_COLUMNS)]
+    removed = [obj.id for obj in session.deleted if isinstance(obj, Campaign)]
+    if not changed and not removed:
+        return
+    conn = session.connection()
+    search_backend = backend(conn)
+    search_backend.remove(conn, removed)
+    search_backend.index(conn, changed)
+
+@app.cli.command("rebuild-search")
+def rebuild_search_command():
+    with db.engine.begin() as conn:
+        search_backend = backend(conn)
+        indexed = search_backend.rebuild(conn)
+    print(f"Rebuilt {search_backend.name} campaign search index ({indexed} campaigns)")
@@ -0,0 +1,113 @@
+from app import app
+import time
+from contextlib import contextmanager
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request SQL accounting. Every statement executed while a Flask request
+# is active is counted and timed; the totals go to the log and, when enabled,
+# to X-SQL-* response headers. Views can declare a budget with @query_budget.
+# Over-budget requests are logged; with SQL_QUERY_BUDGET_STRICT the statement
+# that would exceed the budget raises QueryBudgetExceeded instead of running,
+# so the view stops there and its open transaction is rolled back.
+# Statements run under unbudgeted() (shared caches reloading on whichever
+# request notices they are stale) are counted apart and never hit a budget.
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+class RequestSQLStats:
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.paused = 0
+        self.unbudgeted = 0
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+
+    def record(self, statement, elapsed):
+        if self.paused:
+            self.unbudgeted += 1
+        else:
+            self.count += 1
+        self.total += elapsed
+        if elapsed >= self.slowest:
+            self.slowest = elapsed
+            self.slowest_statement = statement
+
+def query_budget(max_queries):
+    def decorator(inner_func):
+        inner_func.query_budget = max_queries
+        return inner_func
+    return decorator
+
+@contextmanager
+def unbudgeted():
+    stats = current_stats()
+    if stats is None:
+        yield
+        return
+    stats.paused += 1
+    try:
+        yield
+    finally:
+        stats.paused -= 1
+
+def current_stats():
+    if not has_request_context():
+        return None
+    if 'sql_stats' not in g:
+        g.sql_stats = RequestSQLStats()
+    return g.sql_stats
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('sql_stats_start', []).append(time.perf_counter())
+    stats = current_stats()
+    if stats is not None and stats.budget is not None and not stats.paused and stats.count >= stats.budget \
+            and app.config.get('SQL_QUERY_BUDGET_STRICT'):
+        # Raised before the statement runs; handle_error drops the timer.
+        raise QueryBudgetExceeded(f"{request.endpoint} would issue more than {stats.budget} SQL statements: {statement}")
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def stop_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['sql_stats_start'].pop()
+    stats = current_stats()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+@event.listens_for(Engine, 'handle_error')
+def discard_timer(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('sql_stats_start'):
+        conn.info['sql_stats_start'].pop()
+
+@app.before_request
+def reset_sql_stats():
+    view = app.view_functions.get(request.endpoint)
+    g.sql_stats = RequestSQLStats(getattr(view, 'query_budget', None))
+
+@app.errorhandler(QueryBudgetExceeded)
+def query_budget_exceeded(error):
+    app.logger.error("%s", error)
+    return app.response_class(f"Query budget exceeded: {error}", status=500, mimetype='text/plain')
+
+@app.after_request
+def report_sql_stats(response):
+    stats = current_stats()
+    if stats is None:
+        return response
+    if app.config.get('SQL_STATS_HEADERS') or app.debug or app.testing:
+        response.headers['X-SQL-Count'] = str(stats.count)
+        response.headers['X-SQL-Unbudgeted-Count'] = str(stats.unbudgeted)
+        response.headers['X-SQL-Time-Ms'] = f"{stats.total * 1000:.2f}"
+        response.headers['X-SQL-Slowest-Ms'] = f"{stats.slowest * 1000:.2f}"
+    app.logger.debug("%s %s: %d statements (+%d unbudgeted) in %.2f ms, slowest %.2f ms: %s",
+                     request.method, request.path, stats.count, stats.unbudgeted, stats.total * 1000,
+                     stats.slowest * 1000, stats.slowest_statement)
+
+    if stats.budget is not None and stats.count > stats.budget:
+        app.logger.warning("%s issued %d SQL statements, budget is %d", request.endpoint, stats.count, stats.budget)
+    return response
@@ -0,0 +1,189 @@
+import io
+import zipfile
+import zlib
+from datetime import datetime, time, timedelta
+from sqlalchemy import select, true
+from models import db, Sponsor, Influencer, Campaign, AdRequest
+import invoices
+
+# Statements cover every paid ad request of a sponsor in a date range. Rows
+# come from a streamed query and the output is produced as a generator of
+# byte chunks: the ZIP format writes one cached per-request invoice at a time
+# straight to the response, and the PDF ledger is written by a small
+# streaming PDF writer that sends each page as soon as its rows are fetched.
+ROWS_PER_PAGE = 30
+
+def paid_requests(sponsor_id, start_date=None, end_date=None):
+    query = select(AdRequest.id, AdRequest.paid_at, Campaign.name, Sponsor.username, Influencer.username, AdRequest.payment_amount) \
+        .join(Campaign, Campaign.id == AdRequest.campaign_id) \
+        .join(Sponsor, Sponsor.id == AdRequest.sponsor_id) \
+        .join(Influencer, Influencer.id == AdRequest.influencer_id) \
+        .where(AdRequest.sponsor_id == sponsor_id, AdRequest.payment_status == true()) \
+        .order_by(AdRequest.id)
+    if start_date:
+        query = query.where(AdRequest.paid_at >= datetime.combine(start_date, time.min))
+    if end_date:
+        query = query.where(AdRequest.paid_at < datetime.combine(end_date + timedelta(days=1), time.min))
+    return db.session.execute(query.execution_options(yield_per=500))
+
+class ChunkWriter(io.RawIOBase):
+    # Unseekable sink for zipfile: whatever has been written since the last
+    # drain() is handed to the response and then dropped.
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def zip_chunks(sponsor, start_date=None, end_date=None):
+    sink = ChunkWriter()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for ad_request_id, paid_at, campaign, sponsor_username, influencer, amount in paid_requests(sponsor.id, start_date, end_date):
+            invoice = invoices.cached_invoice({
+                'id': ad_request_id,
+                'campaign': campaign,
+                'sponsor': sponsor_username,
+                'influencer': influencer,
+                'payment_amount': f"{amount:.2f}",
+                'status': "Paid",
+            })
+            with invoice:
+                archive.writestr(f"invoice_{ad_request_id}.pdf", invoice.read())
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+class PDFStream:
+    # Just enough of a PDF writer to send a document while it is produced:
+    # each page's content and page object go out as soon as the page is
+    # drawn, and only their byte offsets are kept for the cross-reference
+    # table written at the end. Objects 1-3 (catalog, page tree, font) are
+    # numbered up front so pages can point at them before they are written.
+    CATALOG, PAGES, FONT = 1, 2, 3
+
+    def __init__(self):
+        self.position = 0
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 4
+
+    def emit(self, data):
+        self.position += len(data)
+        return data
+
+    def object(self, number, body):
+        self.offsets[number] = self.position
+        return self.emit(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    def header(self):
+        return self.emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def page(self, content):
+        stream_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.page_ids.append(page_id)
+        data = zlib.compress(content)
+        return self.object(stream_id, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data) + data + b"\nendstream") + \
+            self.object(page_id, b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+                                 b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (self.PAGES, PAGE_WIDTH, PAGE_HEIGHT, stream_id, self.FONT))
+
+    def trailer(self):
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        data = self.object(self.FONT, b"<< /Type /Font /Subtype /Type1 /BaseFont /Times-Roman /Encoding /WinAnsiEncoding >>") + \
+            self.object(self.PAGES, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.page_ids))) + \
+            self.object(self.CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % self.PAGES)
+        xref_at = self.position
+        entries = [b"0000000000 65535 f \n"] + [b"%010d 00000 n \n" % self.offsets[number] for number in range(1, self.next_id)]
+        return data + self.emit(b"xref\n0 %d\n" % self.next_id + b"".join(entries) +
+                                b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (self.next_id, self.CATALOG, xref_at))
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+COLUMN_WIDTHS = [64.8, 79.2, 158.4, 115.2, 72.0]
+ROW_HEIGHT = 16
+HEADER_FILL = (0.25, 0.88, 0.82)
+
+def pdf_text(value):
+    encoded = value.encode('cp1252', 'replace')
+    return b"(" + encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+def text_width(value, size):
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    return stringWidth(value, 'Times-Roman', size)
+
+def fit(value, width, size):
+    while value and text_width(value, size) > width:
+        value = value[:-1]
+    return value
+
+def text_at(x, y, value, size):
+    return b"BT /F1 %d Tf %.2f %.2f Td %s Tj ET\n" % (size, x, y, pdf_text(value))
+
+def centred(y, value, size):
+    return text_at((PAGE_WIDTH - text_width(value, size)) / 2, y, value, size)
+
+def ledger_page(title, rows, number):
+    """The content stream of one ledger page: heading, a gridded table of
+    rows (the first is the column header) and the page number."""
+    out = [centred(PAGE_HEIGHT - 72, "AdConnect", 20), centred(PAGE_HEIGHT - 97.2, title, 12)]
+    left = (PAGE_WIDTH - sum(COLUMN_WIDTHS)) / 2
+    top = PAGE_HEIGHT - 122.4
+    bottom = top - ROW_HEIGHT * len(rows)
+    out.append(b"%.2f %.2f %.2f rg %.2f %.2f %.2f %d re f 0 g\n" % (*HEADER_FILL, left, top - ROW_HEIGHT, sum(COLUMN_WIDTHS), ROW_HEIGHT))
+    for index, row in enumerate(rows):
+        baseline = top - ROW_HEIGHT * (index + 1) + 5
+        x = left
+        for column, (value, width) in enumerate(zip(row, COLUMN_WIDTHS)):
+            value = fit(value, width - 6, 10)
+            if column == len(COLUMN_WIDTHS) - 1:
+                out.append(text_at(x + width - 3 - text_width(value, 10), baseline, value, 10))
+            else:
+                out.append(text_at(x + 3, baseline, value, 10))
+            x += width
+    out.append(b"0.5 w\n")
+    for index in range(len(rows) + 1):
+        y = top - ROW_HEIGHT * index
+        out.append(b"%.2f %.2f m %.2f %.2f l\n" % (left, y, left + sum(COLUMN_WIDTHS), y))
+    x = left
+    for width in [0] + COLUMN_WIDTHS:
+        x += width
+        out.append(b"%.2f %.2f m %.2f %.2f l\n" % (x, top, x, bottom))
+    out.append(b"S\n")
+    out.append(centred(36, f"Page {number}", 9))
+    return b"".join(out)
+
+def pdf_chunks(sponsor, start_date=None, end_date=None):
+    """The ledger PDF, one chunk per page of ROWS_PER_PAGE rows, sent as
+    each page fills from the streamed query. Only the running totals and
+    the page offsets are kept, so memory does not grow with the rows."""
+    period = f"{start_date or 'first payment'} to {end_date or datetime.now().date()}"
+    title = f"Statement for {sponsor.name or sponsor.username} ({period})"
+    header = ["Ad Request", "Paid On", "Campaign", "Influencer", "Amount"]
+    pdf = PDFStream()
+    yield pdf.header()
+
+    total, count, rows = 0.0, 0, []
+    for ad_request_id, paid_at, campaign, sponsor_username, influencer, amount in paid_requests(sponsor.id, start_date, end_date):
+        rows.append([str(ad_request_id), paid_at.strftime('%Y-%m-%d') if paid_at else "", campaign, influencer, f"{amount:.2f}"])
+        total += float(amount or 0)
+        count += 1
+        if len(rows) == ROWS_PER_PAGE:
+            yield pdf.page(ledger_page(title, [header] + rows, len(pdf.page_ids) + 1))
+            rows = []
+    rows.append(["", "", "", f"Total ({count} requests)", f"{total:.2f}"])
+    yield pdf.page(ledger_page(title, [header] + rows, len(pdf.page_ids) + 1))
+    yield pdf.trailer()
+
+FORMATS = {
+    'pdf': ('application/pdf', pdf_chunks),
+    'zip': ('application/zip', zip_chunks),
+}
@@ -0,0 +1,112 @@
+from app import app
+from collections import Counter
+from sqlalchemy import event, select, update, insert, delete, func, literal
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from models import db, Influencer, Sponsor, Campaign, AdRequest, Flag, StatCounter
+
+# Dashboard counters live in stat_counters and are adjusted in the same
+# transaction as the rows they count, so admin_home reads one small table
+# instead of counting influencers, sponsors, campaigns, flags and requests.
+COUNTERS = [
+    'influencers',
+    'sponsors',
+    'campaigns_public',
+    'campaigns_private',
+    'flagged_influencer',
+    'flagged_sponsor',
+    'flagged_campaign',
+    'ad_requests_Pending',
+    'ad_requests_Accepted',
+    'ad_requests_Rejected',
+]
+
+TOTALS = {Influencer: 'influencers', Sponsor: 'sponsors'}
+GROUPED = {
+    Campaign: ('visibility', 'campaigns_'),
+    Flag: ('entity_type', 'flagged_'),
+    AdRequest: ('status', 'ad_requests_'),
+}
+DEFAULTS = {AdRequest: {'status': 'Pending'}}
+
+def counter_query():
+    return select(literal('influencers'), func.count(Influencer.id)).union_all(
+        select(literal('sponsors'), func.count(Sponsor.id)),
+        select(literal('campaigns_') + Campaign.visibility, func.count(Campaign.id)).where(Campaign.visibility.isnot(None)).group_by(Campaign.visibility),
+        select(literal('flagged_') + Flag.entity_type, func.count(Flag.id)).group_by(Flag.entity_type),
+        select(literal('ad_requests_') + AdRequest.status, func.count(AdRequest.id)).group_by(AdRequest.status),
+    )
+
+def rebuild(conn):
+    counts = dict.fromkeys(COUNTERS, 0)
+    counts.update({name: value for name, value in conn.execute(counter_query())})
+    conn.execute(delete(StatCounter))
+    conn.execute(insert(StatCounter), [{'name': name, 'value': value} for name, value in counts.items()])
+    return counts
+
+def adjust(conn, deltas):
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        result = conn.execute(update(StatCounter).where(StatCounter.name == name).values(value=StatCounter.value + delta))
+        if result.rowcount == 0:
+            conn.execute(insert(StatCounter).values(name=name, value=delta))
+
+def dashboard_counters():
+    counts = dict.fromkeys(COUNTERS, 0)
+    counts.update(db.session.query(StatCounter.name, StatCounter.value).all())
+    return counts
+
+def counter_name(obj, value):
+    attr, prefix = GROUPED[type(obj)]
+    if value is None:
+        value = DEFAULTS.get(type(obj), {}).get(attr)
+    return f"{prefix}{value}" if value is not None else None
+
+def current_value(obj):
+    attr = GROUPED[type(obj)][0]
+    return getattr(obj, attr)
+
+def committed_value(obj):
+    history = get_history(obj, GROUPED[type(obj)][0])
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return current_value(obj)
+
+@event.listens_for(Session, 'before_flush')
+def track_counters(session, flush_context, instances):
+    deltas = Counter()
+    for obj in session.new:
+        if type(obj) in TOTALS:
+            deltas[TOTALS[type(obj)]] += 1
+        elif type(obj) in GROUPED:
+            deltas[counter_name(obj, current_value(obj))] += 1
+    for obj in session.deleted:
+        if type(obj) in TOTALS:
+            deltas[TOTALS[type(obj)]] -= 1
+        elif type(obj) in GROUPED:
+            deltas[counter_name(obj, committed_value(obj))] -= 1
+    for obj in session.dirty:
+        if type(obj) not in GROUPED or obj in session.deleted:
+            continue
+        history = get_history(obj, GROUPED[type(obj)][0])
+        if history.added and history.deleted and history.added[0] != history.deleted[0]:
+            deltas[counter_name(obj, history.deleted[0])] -= 1
+            deltas[counter_name(obj, history.added[0])] += 1
+    deltas.pop(None, None)
+    if any(deltas.values()):
+        adjust(session.connection(), deltas)
+
+# Load the previous value when these attributes are assigned, so the flush
+# hook above sees the old bucket even if the row was expired by a commit.
+for model, (attr, prefix) in GROUPED.items():
+    event.listen(getattr(model, attr), 'set', lambda target, value, oldvalue, initiator: value, active_history=True, retval=True)
+
+@app.cli.command("rebuild-stats")
+def rebuild_stats_command():
+    with db.engine.begin() as conn:
+        counts = rebuild(conn)
+    for name, value in counts.items():
+        print(f"{name}: {value}")
@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+# The app is configured from the environment when config.py is imported, so
+# the database, caches, flag index version file and strict budgets are set before anything imports it.
+TMP = tempfile.mkdtemp(prefix='adconnect-tests-')
+os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(TMP, 'test.sqlite3')
+os.environ['INVOICE_CACHE_DIR'] = os.path.join(TMP, 'invoices')
+os.environ['TEMPLATE_CACHE_DIR'] = os.path.join(TMP, 'jinja_cache')
+os.environ['FLAG_INDEX_VERSION_FILE'] = os.path.join(TMP, 'flag_index.version')
+os.environ['SQL_QUERY_BUDGET_STRICT'] = 'True'
+os.environ['EVENT_BUS'] = 'local'
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+
+import dataset
+
+@pytest.fixture(scope='session')
+def app():
+    from app import init_app
+    app = init_app()
+    app.config['TESTING'] = True
+    dataset.seed(app, 0.001)
+    return app
+
+@pytest.fixture
+def login(app):
+    def login(user_type, username, password=dataset.PASSWORD):
+        client = app.test_client()
+        response = client.post('/login', data={'user_type': user_type, 'username': username, 'password': password})
+        assert response.status_code == 302 and 'login' not in response.headers['Location']
+        return client
+    return login
+
+@pytest.fixture
+def consistent(app):
+    """Asserts that the stat counters, campaign rollups and facet counts
+    maintained incrementally match a rebuild from the base tables."""
+    from sqlalchemy import select
+    from models import db, StatCounter, CampaignRollup, CampaignNiche, FacetCount
+    import stats
+    import rollups
+    import facets
+
+    def snapshot(conn):
+        return (sorted(conn.execute(select(StatCounter.name, StatCounter.value)).all()),
+                sorted(conn.execute(select(CampaignRollup.campaign_id, CampaignRollup.total_requests, CampaignRollup.accepted_requests,
+                                           CampaignRollup.rejected_requests, CampaignRollup.pending_requests, CampaignRollup.spend,
+                                           CampaignRollup.niches)).all()),
+                sorted(conn.execute(select(CampaignNiche.campaign_id, CampaignNiche.niche, CampaignNiche.requests)).all()),
+                sorted(conn.execute(select(FacetCount.facet, FacetCount.value, FacetCount.count)).all()))
+
+    def check():
+        with app.app_context():
+            with db.engine.begin() as conn:
+                before = snapshot(conn)
+                stats.rebuild(conn)
+                rollups.rebuild(conn)
+                facets.rebuild(conn)
+                assert snapshot(conn) == before
+    return check
@@ -0,0 +1,65 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, update
+from models import db, Campaign
+
+SPONSOR_ID = 2
+
+def form(name):
+    today = date.today()
+    return {'campaign_name': name, 'description': 'Conditional requests', 'start_date': today.isoformat(),
+            'end_date': (today + timedelta(days=30)).isoformat(), 'budget': '500', 'visibility': 'public',
+            'goals': 'reach', 'requirements': 'post', 'payment': '50'}
+
+def create_campaign(app, sponsor, name):
+    sponsor.post(f'/sponsor/{SPONSOR_ID}/create_campaign', data=form(name))
+    with app.app_context():
+        campaign_id = db.session.scalar(select(Campaign.id).where(Campaign.name == name))
+        # Move the row version an hour back so a change within the same
+        # second still moves Last-Modified, which only has whole seconds.
+        db.session.execute(update(Campaign).where(Campaign.id == campaign_id)
+                           .values(updated_at=datetime.now() - timedelta(hours=1)))
+        db.session.commit()
+    return campaign_id
+
+def test_unchanged_campaign_is_not_modified(app, login):
+    sponsor = login('sponsor', f'spon{SPONSOR_ID - 1}')
+    campaign_id = create_campaign(app, sponsor, 'Validator unchanged')
+    url = f'/api/v1/campaigns/{campaign_id}'
+    first = sponsor.get(url)
+    assert first.status_code == 200 and first.json['name'] == 'Validator unchanged'
+    etag, last_modified = first.headers['ETag'], first.headers['Last-Modified']
+
+    by_etag = sponsor.get(url, headers={'If-None-Match': etag})
+    assert by_etag.status_code == 304 and by_etag.data == b''
+    assert by_etag.headers['ETag'] == etag
+    by_date = sponsor.get(url, headers={'If-Modified-Since': last_modified})
+    assert by_date.status_code == 304 and by_date.data == b''
+    earlier = (first.last_modified - timedelta(minutes=1)).strftime('%a, %d %b %Y %H:%M:%S GMT')
+    assert sponsor.get(url, headers={'If-Modified-Since': earlier}).status_code == 200
+    assert sponsor.get(url, headers={'If-None-Match': '"stale"'}).status_code == 200
+
+def test_update_changes_the_validators(app, login):
+    sponsor = login('sponsor', f'spon{SPONSOR_ID - 1}')
+    campaign_id = create_campaign(app, sponsor, 'Validator before')
+    url = f'/api/v1/campaigns/{campaign_id}'
+    first = sponsor.get(url)
+    listing = sponsor.get('/api/v1/campaigns')
+
+    sponsor.post(f'/campaign/{campaign_id}/update', data=form('Validator after'))
+    by_etag = sponsor.get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert by_etag.status_code == 200 and by_etag.json['name'] == 'Validator after'
+    assert by_etag.headers['ETag'] != first.headers['ETag']
+    assert by_etag.last_modified > first.last_modified
+    by_date = sponsor.get(url, headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert by_date.status_code == 200
+    assert sponsor.get(url, headers={'If-None-Match': by_etag.headers['ETag']}).status_code == 304
+
+    assert sponsor.get('/api/v1/campaigns', headers={'If-None-Match': listing.headers['ETag']}).status_code == 200
+
+def test_collection_is_not_modified(login):
+    client = login('influencer', 'inf0')
+    first = client.get('/api/v1/campaigns?per_page=5')
+    assert first.status_code == 200 and len(first.json['items']) == 5
+    assert client.get('/api/v1/campaigns?per_page=5', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    # The cursor is part of the validator.
+    assert client.get('/api/v1/campaigns?per_page=6', headers={'If-None-Match': first.headers['ETag']}).status_code == 200
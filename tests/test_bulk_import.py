@@ -0,0 +1,40 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models import db, Influencer
+import bulk_import
+
+@pytest.fixture
+def importer(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'IMPORT_WORKERS', 1)
+    monkeypatch.setitem(app.config, 'IMPORT_BATCH_SIZE', 8)
+    with app.app_context():
+        yield
+
+def rows(prefix, count):
+    return [(line_number, {'username': f'{prefix}{line_number}', 'password': 'Passw0rd@', 'name': 'Imported',
+                           'category': 'Tech', 'niche': 'Youtube', 'reach': '10'})
+            for line_number in range(2, count + 2)]
+
+def test_rows_are_imported_in_batches(importer, consistent):
+    result = bulk_import.import_rows('influencers', rows('batch', 20))
+    assert result == bulk_import.ImportResult(20, [])
+    assert db.session.scalar(select(db.func.count()).where(Influencer.username.like('batch%'))) == 20
+    consistent()
+
+def test_commit_conflict_only_rejects_the_offending_row(importer, monkeypatch, consistent):
+    # Another writer takes a username between the batch lookup and the commit.
+    prepare_users = bulk_import.prepare_users
+    def racing(entity, batch, errors):
+        prepared = prepare_users(entity, batch, errors)
+        with Session(db.engine) as other:
+            other.add(Influencer(username='race5', passhash='x', category='Tech', niche='Youtube'))
+            other.commit()
+        return prepared
+    monkeypatch.setattr(bulk_import, 'prepare_users', racing)
+    result = bulk_import.import_rows('influencers', rows('race', 6))
+    assert result.imported == 5
+    assert result.errors == [(5, "Error: Username already taken")]
+    imported = set(db.session.scalars(select(Influencer.username).where(Influencer.username.like('race%'))))
+    assert imported == {f'race{line_number}' for line_number in range(2, 8)}
+    consistent()
@@ -0,0 +1,54 @@
+import json
+import threading
+import time
+import pytest
+from sqlalchemy import select
+from models import db, AdRequest
+
+SPONSOR_ID = 7
+
+@pytest.fixture
+def pending(app):
+    with app.app_context():
+        row = db.session.execute(select(AdRequest.id, AdRequest.influencer_id)
+                                 .where(AdRequest.sponsor_id == SPONSOR_ID, AdRequest.status == 'Pending',
+                                        AdRequest.sponsor_accepted.is_(None))).first()
+    return row.id, row.influencer_id
+
+@pytest.fixture
+def short_streams(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVENTS_STREAM_SECONDS', 1.0)
+    monkeypatch.setitem(app.config, 'EVENTS_HEARTBEAT_SECONDS', 0.2)
+
+def test_stream_refused_on_a_single_threaded_server(login):
+    # The test client reports wsgi.multithread = False, like a sync worker.
+    response = login('sponsor', f'spon{SPONSOR_ID - 1}').get('/events')
+    assert response.status_code == 204
+
+def test_stream_can_be_disabled(app, login, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVENTS_STREAMS', 'off')
+    response = login('sponsor', f'spon{SPONSOR_ID - 1}').get('/events', environ_overrides={'wsgi.multithread': True})
+    assert response.status_code == 204
+
+def test_committed_change_reaches_the_other_party(login, pending, short_streams):
+    ad_request_id, influencer_id = pending
+    sponsor = login('sponsor', f'spon{SPONSOR_ID - 1}')
+    influencer = login('influencer', f'inf{influencer_id - 1}')
+    received = []
+
+    def listen():
+        response = influencer.get('/events', buffered=False, environ_overrides={'wsgi.multithread': True})
+        assert response.mimetype == 'text/event-stream'
+        received.extend(chunk.decode() for chunk in response.response)
+        response.close()
+
+    listener = threading.Thread(target=listen)
+    listener.start()
+    time.sleep(0.3)
+    sponsor.post(f'/sponsor/{SPONSOR_ID}/sponsor_accept_request/{ad_request_id}')
+    listener.join(timeout=5)
+    assert not listener.is_alive(), "stream did not end after EVENTS_STREAM_SECONDS"
+    stream = ''.join(received)
+    assert stream.startswith('retry: ')
+    payloads = [json.loads(line[len('data: '):]) for line in stream.splitlines() if line.startswith('data: ')]
+    assert {'id': ad_request_id, 'sponsor_accepted': True}.items() <= payloads[-1].items()
@@ -0,0 +1,31 @@
+from sqlalchemy import select
+from models import db, Influencer
+import facets
+
+PASSWORD = 'Facet@123'
+
+def facet(app, name):
+    with app.app_context():
+        return dict(facets.counts(name))
+
+def test_facets_follow_influencer_lifecycle(app, login, consistent):
+    before = facet(app, 'category')
+    app.test_client().post('/register', data={'user_type': 'influencer', 'username': 'facetuser', 'password': PASSWORD,
+                                              'confirm_password': PASSWORD, 'name': 'Facet User', 'category': 'Ceramics',
+                                              'niche': 'Instagram', 'reach': '100'})
+    assert facet(app, 'category')['Ceramics'] == 1
+    consistent()
+
+    client = login('influencer', 'facetuser', PASSWORD)
+    client.post('/profile/influencer/update', data={'current_password': PASSWORD, 'category': 'Pottery', 'niche': 'Vlog'})
+    categories = facet(app, 'category')
+    assert 'Ceramics' not in categories and categories['Pottery'] == 1
+    assert facet(app, 'niche')['Vlog'] == 1
+    consistent()
+
+    with app.app_context():
+        db.session.delete(db.session.scalar(select(Influencer).where(Influencer.username == 'facetuser')))
+        db.session.commit()
+    assert facet(app, 'category') == before
+    assert 'Vlog' not in facet(app, 'niche')
+    consistent()
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import insert, delete
+from models import db, Flag
+import flag_index
+
+INFLUENCER_ID = 9
+ADMIN_ID = 1
+
+@pytest.fixture
+def no_max_age(app, monkeypatch):
+    # Only the version file may trigger reloads in these tests.
+    monkeypatch.setitem(app.config, 'FLAG_INDEX_MAX_AGE', 3600)
+
+def home(client):
+    return client.get(f'/influencer/{INFLUENCER_ID}/show_ad_requests')
+
+def test_flag_blocks_at_once_and_unflag_restores(login, no_max_age, consistent):
+    influencer = login('influencer', f'inf{INFLUENCER_ID - 1}')
+    admin = login('admin', 'admin', 'admin')
+    assert home(influencer).status_code == 200
+
+    admin.post(f'/admin/{ADMIN_ID}/flag/influencer/{INFLUENCER_ID}')
+    response = home(influencer)
+    assert response.status_code == 302 and response.headers['Location'].endswith('/login')
+    assert b"Your account has been flagged" in influencer.get('/login').data
+    consistent()
+
+    admin.post(f'/admin/{ADMIN_ID}/unflag/influencer/{INFLUENCER_ID}')
+    assert home(influencer).status_code == 200
+    consistent()
+
+def test_version_file_invalidates_another_process(app, no_max_age):
+    # A second FlagIndex stands in for another worker's copy.
+    other = flag_index.FlagIndex()
+    with app.app_context():
+        assert not other.is_flagged('sponsor', 4)
+        # Written without the ORM, so no commit hook bumps the version.
+        with db.engine.begin() as conn:
+            conn.execute(insert(Flag).values(reason='test', entity_type='sponsor', entity_id=4, admin_id=ADMIN_ID))
+        try:
+            assert not other.is_flagged('sponsor', 4)
+            flag_index.flag_index.invalidate()
+            assert other.is_flagged('sponsor', 4)
+        finally:
+            with db.engine.begin() as conn:
+                conn.execute(delete(Flag).where(Flag.entity_type == 'sponsor', Flag.entity_id == 4))
+            flag_index.flag_index.invalidate()
+        assert not other.is_flagged('sponsor', 4)
+
+def test_max_age_reloads_without_a_version_change(app, monkeypatch):
+    other = flag_index.FlagIndex()
+    with app.app_context():
+        other.load()
+        monkeypatch.setitem(app.config, 'FLAG_INDEX_MAX_AGE', 0)
+        with db.engine.begin() as conn:
+            conn.execute(insert(Flag).values(reason='test', entity_type='campaign', entity_id=3, admin_id=ADMIN_ID))
+        try:
+            assert other.is_flagged('campaign', 3)
+        finally:
+            with db.engine.begin() as conn:
+                conn.execute(delete(Flag).where(Flag.entity_type == 'campaign', Flag.entity_id == 3))
+            flag_index.flag_index.invalidate()
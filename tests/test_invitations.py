@@ -0,0 +1,121 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import select, insert, update, func
+from sqlalchemy.orm import Session
+from models import db, Campaign, AdRequest, NegotiationMessage
+import invitations
+
+SPONSOR_ID = 5
+FORM = {'requirements': 'One post', 'payment_amount': '250', 'messages': 'Join our launch'}
+
+@pytest.fixture
+def campaign_id(app):
+    with app.app_context():
+        return db.session.scalar(select(Campaign.id).where(Campaign.sponsor_id == SPONSOR_ID).order_by(Campaign.id.desc()))
+
+@pytest.fixture
+def sponsor(login):
+    return login('sponsor', f'spon{SPONSOR_ID - 1}')
+
+def requests_for(app, campaign_id):
+    with app.app_context():
+        return dict(db.session.execute(select(AdRequest.influencer_id, AdRequest.id).where(AdRequest.campaign_id == campaign_id)).all())
+
+def thread_lengths(app, ad_request_ids):
+    with app.app_context():
+        return dict(db.session.execute(select(NegotiationMessage.ad_request_id, func.count())
+                                       .where(NegotiationMessage.ad_request_id.in_(ad_request_ids))
+                                       .group_by(NegotiationMessage.ad_request_id)).all())
+
+def test_selected_fan_out_skips_existing_requests(app, sponsor, campaign_id, consistent):
+    before = requests_for(app, campaign_id)
+    existing = sorted(before)[:1]
+    new = [influencer_id for influencer_id in range(1, 30) if influencer_id not in before][:5]
+    response = sponsor.post('/sponsor/invite_influencers', follow_redirects=True,
+                            data={**FORM, 'campaign_id': campaign_id, 'scope': 'selected', 'influencer_ids': existing + new})
+    assert b"5 ad request(s) sent, 1 skipped as already requested" in response.data
+    after = requests_for(app, campaign_id)
+    assert set(after) - set(before) == set(new)
+    assert thread_lengths(app, [after[influencer_id] for influencer_id in new]) == {after[influencer_id]: 1 for influencer_id in new}
+    consistent()
+
+@pytest.mark.parametrize('returning', [True, False])
+def test_messages_only_go_to_the_new_requests(app, campaign_id, monkeypatch, returning, consistent):
+    # Another request of the campaign was updated in the same instant as
+    # the fan-out; it must not pick up the sponsor's message.
+    instant = datetime(2030, 1, 1, 12, 0, 0)
+    monkeypatch.setattr(invitations, 'datetime', type('frozen', (), {'now': staticmethod(lambda: instant)}))
+    with app.app_context():
+        monkeypatch.setattr(db.engine.dialect, 'insert_returning', returning)
+        bystander = db.session.scalar(select(AdRequest.id).where(AdRequest.campaign_id == campaign_id))
+        db.session.execute(update(AdRequest).where(AdRequest.id == bystander).values(updated_at=instant))
+        db.session.commit()
+        threads_before = thread_lengths(app, [bystander])
+        taken = set(requests_for(app, campaign_id))
+        ids = [influencer_id for influencer_id in range(30, 80) if influencer_id not in taken][:3]
+        campaign, attrs, error = invitations.check_invitation(SPONSOR_ID, {**FORM, 'campaign_id': campaign_id})
+        criteria, error = invitations.selection('selected', ids=ids)
+        assert invitations.fan_out(campaign, criteria, attrs) == (3, 0, None)
+        db.session.commit()
+    assert thread_lengths(app, [bystander]) == threads_before
+    after = requests_for(app, campaign_id)
+    assert set(thread_lengths(app, [after[influencer_id] for influencer_id in ids]).values()) == {1}
+    consistent()
+
+def test_fan_out_over_the_limit_writes_nothing(app, sponsor, campaign_id, monkeypatch, consistent):
+    monkeypatch.setitem(app.config, 'FANOUT_LIMIT', 2)
+    before = requests_for(app, campaign_id)
+    response = sponsor.post('/sponsor/invite_influencers', follow_redirects=True,
+                            data={**FORM, 'campaign_id': campaign_id, 'scope': 'filtered'})
+    assert b"narrow the selection to at most 2" in response.data
+    assert requests_for(app, campaign_id) == before
+    consistent()
+
+def test_fan_out_rejects_another_sponsors_campaign(app, sponsor):
+    with app.app_context():
+        other = db.session.scalar(select(Campaign.id).where(Campaign.sponsor_id != SPONSOR_ID))
+    response = sponsor.post('/sponsor/invite_influencers', follow_redirects=True,
+                            data={**FORM, 'campaign_id': other, 'scope': 'selected', 'influencer_ids': [1]})
+    assert b"Invalid campaign" in response.data
+
+@pytest.mark.parametrize('returning', [True, False])
+def test_request_created_during_fan_out_is_rolled_back(app, sponsor, campaign_id, monkeypatch, returning, consistent):
+    with app.app_context():
+        monkeypatch.setattr(db.engine.dialect, 'insert_returning', returning)
+    before = requests_for(app, campaign_id)
+    new = [influencer_id for influencer_id in range(1, 40) if influencer_id not in before][:3]
+
+    def race():
+        # Another session creates one of the requests after the NOT EXISTS
+        # check, just before the fan-out's insert.
+        with Session(db.engine) as other:
+            other.add(AdRequest(campaign_id=campaign_id, sponsor_id=SPONSOR_ID, influencer_id=new[1],
+                                status='Pending', requirements='Raced', payment_amount=100))
+            other.commit()
+        return datetime.now()
+    monkeypatch.setattr(invitations, 'datetime', type('racing', (), {'now': staticmethod(race)}))
+    response = sponsor.post('/sponsor/invite_influencers', follow_redirects=True,
+                            data={**FORM, 'campaign_id': campaign_id, 'scope': 'selected', 'influencer_ids': new})
+    assert response.status_code == 200
+    assert b"sent an ad request for this campaign at the same time" in response.data
+    assert set(requests_for(app, campaign_id)) - set(before) == {new[1]}
+    consistent()
+
+def test_unique_violation_during_fan_out_is_rolled_back(app, sponsor, campaign_id, monkeypatch, consistent):
+    before = requests_for(app, campaign_id)
+    new = [influencer_id for influencer_id in range(40, 80) if influencer_id not in before][:3]
+    fan_out = invitations.fan_out
+
+    def conflicting(campaign, criteria, attrs):
+        # Stands in for a concurrent insert the unique index catches after
+        # the fan-out has written its rows.
+        result = fan_out(campaign, criteria, attrs)
+        db.session.connection().execute(insert(AdRequest).values(campaign_id=campaign.id, influencer_id=new[0]))
+        return result
+    monkeypatch.setattr(invitations, 'fan_out', conflicting)
+    response = sponsor.post('/sponsor/invite_influencers', follow_redirects=True,
+                            data={**FORM, 'campaign_id': campaign_id, 'scope': 'selected', 'influencer_ids': new})
+    assert response.status_code == 200
+    assert b"sent an ad request for this campaign at the same time" in response.data
+    assert requests_for(app, campaign_id) == before
+    consistent()
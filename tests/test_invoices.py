@@ -0,0 +1,56 @@
+import os
+import pytest
+import invoices
+
+def fields(number):
+    return {'id': number, 'campaign': 'Launch', 'sponsor': 'spon0', 'influencer': 'inf0', 'payment_amount': '100.00', 'status': "Paid"}
+
+def cache_path(number):
+    key = invoices.invoice_key(fields(number))
+    return os.path.join(invoices.cache_dir(), key[:2], f"{key}.pdf")
+
+@pytest.fixture
+def cache(app, monkeypatch, tmp_path):
+    monkeypatch.setitem(app.config, 'INVOICE_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(invoices, '_cache_bytes', None)
+    scans = []
+    evict = invoices.evict
+    monkeypatch.setattr(invoices, 'evict', lambda keep=None: (scans.append(keep), evict(keep)))
+    with app.app_context():
+        yield scans
+
+def test_repeat_reads_come_from_disk(cache, monkeypatch):
+    with invoices.cached_invoice(fields(1)) as first:
+        data = first.read()
+    assert data.startswith(b'%PDF')
+    monkeypatch.setattr(invoices, 'render_invoice', lambda fields: pytest.fail("rendered twice"))
+    with invoices.cached_invoice(fields(1)) as second:
+        assert second.read() == data
+
+def test_eviction_scans_only_past_the_limit(app, cache, monkeypatch):
+    with invoices.cached_invoice(fields(0)) as first:
+        size = len(first.read())
+    assert len(cache) == 1  # the initial scan seeds the running total
+    monkeypatch.setitem(app.config, 'INVOICE_CACHE_MAX_BYTES', size * 10)
+    for number in range(1, 10):
+        invoices.cached_invoice(fields(number)).close()
+    assert len(cache) == 1
+    invoices.cached_invoice(fields(10)).close()
+    assert len(cache) == 2
+    remaining = [path for number in range(11) if os.path.exists(path := cache_path(number))]
+    assert sum(os.path.getsize(path) for path in remaining) <= size * 10 * invoices.EVICT_TO
+    assert os.path.exists(cache_path(10))
+
+def test_file_evicted_while_open_still_reads(cache, monkeypatch):
+    invoices.cached_invoice(fields(1)).close()
+    utime = os.utime
+    def evicted_meanwhile(path, *args, **kwargs):
+        os.unlink(path)
+        return utime(path, *args, **kwargs)
+    monkeypatch.setattr(os, 'utime', evicted_meanwhile)
+    with invoices.cached_invoice(fields(1)) as invoice:
+        assert invoice.read().startswith(b'%PDF')
+    monkeypatch.setattr(os, 'utime', utime)
+    with invoices.cached_invoice(fields(1)) as invoice:
+        assert invoice.read().startswith(b'%PDF')
+    assert os.path.exists(cache_path(1))
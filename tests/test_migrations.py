@@ -0,0 +1,83 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, text, inspect
+from sqlalchemy.exc import IntegrityError
+from models import db
+import migrations
+import stats
+import rollups
+
+# Each test builds a database as it looked before a migration (the current
+# schema minus what the migration adds, with versions up to the previous one
+# recorded) and runs the real upgrade path over it.
+
+@pytest.fixture
+def legacy(app, tmp_path):
+    engines = []
+
+    def build(version, *statements):
+        engine = create_engine(f"sqlite:///{tmp_path / f'legacy{version}.sqlite3'}")
+        engines.append(engine)
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            migrations.current_version(conn)
+            for number in range(1, version + 1):
+                conn.execute(text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:version, '', :now)"),
+                             {"version": number, "now": datetime.now()})
+            for statement in statements:
+                conn.execute(text(statement))
+        return engine
+
+    with app.app_context():
+        yield build
+    for engine in engines:
+        engine.dispose()
+
+def ad_request(conn, **values):
+    row = {'campaign_id': 1, 'influencer_id': 1, 'sponsor_id': 1, 'status': 'Pending', 'payment_status': False,
+           'requirements': 'post', 'payment_amount': 100, **values}
+    return conn.execute(text(f"INSERT INTO ad_requests ({', '.join(row)}) VALUES ({', '.join(':' + name for name in row)}) RETURNING id"),
+                        row).scalar()
+
+def test_migration_9_keeps_one_request_per_pair(legacy):
+    engine = legacy(8, "DROP INDEX ix_ad_requests_campaign_id_influencer_id",
+                    "CREATE INDEX ix_ad_requests_campaign_id_influencer_id ON ad_requests (campaign_id, influencer_id)")
+    with engine.begin() as conn:
+        oldest = ad_request(conn, campaign_id=1, influencer_id=1)
+        ad_request(conn, campaign_id=1, influencer_id=1)
+        ad_request(conn, campaign_id=2, influencer_id=1, status='Rejected')
+        accepted = ad_request(conn, campaign_id=2, influencer_id=1, status='Accepted')
+        ad_request(conn, campaign_id=3, influencer_id=2, status='Accepted')
+        paid = ad_request(conn, campaign_id=3, influencer_id=2, status='Accepted', payment_status=True)
+        single = ad_request(conn, campaign_id=3, influencer_id=3)
+        stats.rebuild(conn)
+        rollups.rebuild(conn)
+
+    assert [number for number, _ in migrations.upgrade(engine)][0] == 9
+    with engine.begin() as conn:
+        assert sorted(conn.execute(text("SELECT id FROM ad_requests")).scalars()) == sorted([oldest, accepted, paid, single])
+        counters = dict(conn.execute(text("SELECT name, value FROM stat_counters")).all())
+        assert (counters['ad_requests_Pending'], counters['ad_requests_Accepted'], counters.get('ad_requests_Rejected', 0)) == (2, 2, 0)
+        assert conn.execute(text("SELECT total_requests FROM campaign_rollups WHERE campaign_id = 3")).scalar() == 2
+    with pytest.raises(IntegrityError), engine.begin() as conn:
+        ad_request(conn, campaign_id=3, influencer_id=3)
+    unique = {index['name']: index['unique'] for index in inspect(engine).get_indexes('ad_requests')}
+    assert unique['ix_ad_requests_campaign_id_influencer_id']
+
+def test_migration_10_moves_messages_to_the_log(legacy):
+    engine = legacy(9, "DROP TABLE negotiation_messages")
+    with engine.begin() as conn:
+        negotiated = ad_request(conn, influencer_id=1, messages='Can you do 150?')
+        ad_request(conn, influencer_id=2, messages='')
+        ad_request(conn, influencer_id=3)
+
+    assert [number for number, _ in migrations.upgrade(engine)][0] == 10
+    with engine.begin() as conn:
+        rows = conn.execute(text("SELECT ad_request_id, author_type, body FROM negotiation_messages")).all()
+    assert [tuple(row) for row in rows] == [(negotiated, None, 'Can you do 150?')]
+
+def test_migration_11_adds_the_event_outbox(legacy):
+    engine = legacy(10, "DROP TABLE event_outbox")
+    assert migrations.upgrade(engine) == [(11, "Add the event outbox for live updates")]
+    assert 'event_outbox' in inspect(engine).get_table_names()
+    assert migrations.upgrade(engine) == []
@@ -0,0 +1,56 @@
+import pytest
+from werkzeug.security import generate_password_hash
+from models import db, Influencer
+import passwords
+
+PASSWORD = 'Legacy@123'
+
+@pytest.fixture
+def legacy_user(app):
+    with app.app_context():
+        user = Influencer(username='legacyhash', name='Legacy', category='Tech', niche='Blog', reach=10,
+                          passhash=generate_password_hash(PASSWORD, method='pbkdf2:sha1:600', salt_length=8))
+        db.session.add(user)
+        db.session.commit()
+        user_id, passhash = user.id, user.passhash
+    yield user_id, passhash
+    with app.app_context():
+        db.session.delete(db.session.get(Influencer, user_id))
+        db.session.commit()
+
+def stored_hash(app, user_id):
+    with app.app_context():
+        return db.session.get(Influencer, user_id).passhash
+
+def log_in(app, password):
+    return app.test_client().post('/login', data={'user_type': 'influencer', 'username': 'legacyhash', 'password': password})
+
+def test_login_upgrades_a_legacy_hash(app, legacy_user):
+    user_id, legacy = legacy_user
+    with app.app_context():
+        assert passwords.needs_rehash(legacy)
+    response = log_in(app, PASSWORD)
+    assert response.status_code == 302 and not response.headers['Location'].endswith('/login')
+    upgraded = stored_hash(app, user_id)
+    method, salt_length = passwords.policy()
+    with app.app_context():
+        assert upgraded.split('$')[0] == passwords.canonical_method(method, salt_length)
+        assert not passwords.needs_rehash(upgraded)
+    assert passwords.check_password(upgraded, PASSWORD)
+    # Logging in again with the current policy leaves the hash alone.
+    log_in(app, PASSWORD)
+    assert stored_hash(app, user_id) == upgraded
+
+def test_wrong_password_leaves_the_hash(app, legacy_user):
+    user_id, legacy = legacy_user
+    response = log_in(app, 'Wrong@123')
+    assert response.headers['Location'].endswith('/login')
+    assert stored_hash(app, user_id) == legacy
+
+def test_needs_rehash_on_salt_length(app, monkeypatch):
+    with app.app_context():
+        current = passwords.hash_password(PASSWORD)
+        assert not passwords.needs_rehash(current)
+        monkeypatch.setitem(app.config, 'PASSWORD_SALT_LENGTH', 24)
+        assert passwords.needs_rehash(current)
+        assert passwords.needs_rehash('not-a-werkzeug-hash')
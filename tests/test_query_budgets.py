@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import select
+from models import db, Campaign, AdRequest
+import flag_index
+
+# Hot routes carry @query_budget. The suite runs with SQL_QUERY_BUDGET_STRICT,
+# so a view that goes over its budget fails here instead of only logging.
+SPONSOR_ID = 1
+INFLUENCER_ID = 1
+
+@pytest.fixture
+def ids(app):
+    with app.app_context():
+        return {
+            'campaign': db.session.scalar(select(Campaign.id).where(Campaign.sponsor_id == SPONSOR_ID).order_by(Campaign.id)),
+            'sponsor_request': db.session.scalar(select(AdRequest.id).where(AdRequest.sponsor_id == SPONSOR_ID).order_by(AdRequest.id)),
+            'influencer_request': db.session.scalar(select(AdRequest.id).where(AdRequest.influencer_id == INFLUENCER_ID).order_by(AdRequest.id)),
+        }
+
+ROUTES = [
+    ('sponsor', 'show_campaigns', lambda ids: f'/sponsor/{SPONSOR_ID}/show_campaigns'),
+    ('sponsor', 'track_campaign', lambda ids: f"/campaign/{ids['campaign']}/track"),
+    ('sponsor', 'show_ad_requests_sponsor', lambda ids: f'/sponsor/{SPONSOR_ID}/show_ad_requests_sponsor'),
+    ('sponsor', 'sponsor_ad_request_row', lambda ids: f"/sponsor/{SPONSOR_ID}/ad_requests/{ids['sponsor_request']}/row"),
+    ('influencer', 'show_ad_requests', lambda ids: f'/influencer/{INFLUENCER_ID}/show_ad_requests'),
+    ('influencer', 'influencer_ad_request_row', lambda ids: f"/influencer/{INFLUENCER_ID}/ad_requests/{ids['influencer_request']}/row"),
+    ('influencer', 'search_campaigns', lambda ids: f'/influencer/{INFLUENCER_ID}/search_campaigns'),
+    ('admin', 'admin_home', lambda ids: '/admin/home'),
+    ('admin', 'manage_influencers', lambda ids: '/admin/manage_influencers'),
+    ('admin', 'manage_sponsors', lambda ids: '/admin/manage_sponsors'),
+    ('admin', 'manage_campaigns', lambda ids: '/admin/manage_campaigns'),
+    ('influencer', 'api_public_campaigns', lambda ids: '/api/v1/campaigns'),
+    ('influencer', 'api_campaign', lambda ids: f"/api/v1/campaigns/{ids['campaign']}"),
+    ('sponsor', 'api_sponsor_campaigns', lambda ids: f'/api/v1/sponsors/{SPONSOR_ID}/campaigns'),
+    ('sponsor', 'api_campaign_tracking', lambda ids: f"/api/v1/campaigns/{ids['campaign']}/tracking"),
+    ('sponsor', 'api_influencers', lambda ids: '/api/v1/influencers'),
+    ('sponsor', 'api_sponsor_ad_requests', lambda ids: f'/api/v1/sponsors/{SPONSOR_ID}/ad_requests'),
+    ('influencer', 'api_influencer_ad_requests', lambda ids: f'/api/v1/influencers/{INFLUENCER_ID}/ad_requests'),
+    ('sponsor', 'api_ad_request_messages', lambda ids: f"/api/v1/ad_requests/{ids['sponsor_request']}/messages"),
+]
+USERS = {'sponsor': f'spon{SPONSOR_ID - 1}', 'influencer': f'inf{INFLUENCER_ID - 1}', 'admin': 'admin'}
+
+@pytest.fixture
+def clients(login):
+    return {role: login(role, username, *(['admin'] if role == 'admin' else [])) for role, username in USERS.items()}
+
+@pytest.mark.parametrize('cold', [False, True], ids=['warm', 'cold'])
+@pytest.mark.parametrize('role, endpoint, url', ROUTES, ids=[endpoint for _, endpoint, _ in ROUTES])
+def test_route_within_budget(app, clients, ids, role, endpoint, url, cold):
+    if cold:
+        # A flag change or FLAG_INDEX_MAX_AGE makes the next request reload
+        # the flag index inside the auth decorators.
+        flag_index.flag_index.loaded = False
+    response = clients[role].get(url(ids))
+    assert response.status_code == 200, response.get_data(as_text=True)[:500]
+    budget = app.view_functions[endpoint].query_budget
+    assert int(response.headers['X-SQL-Count']) <= budget
+    assert int(response.headers['X-SQL-Unbudgeted-Count']) <= (1 if cold else 0)
+
+def test_over_budget_stops_before_the_statement(app, clients, ids, monkeypatch):
+    monkeypatch.setattr(app.view_functions['track_campaign'], 'query_budget', 0)
+    response = clients['sponsor'].get(f"/campaign/{ids['campaign']}/track")
+    assert response.status_code == 500
+    assert b'Query budget exceeded' in response.data
+    assert response.headers['X-SQL-Count'] == '0'
+
+def test_over_budget_only_logs_when_not_strict(app, clients, ids, monkeypatch):
+    monkeypatch.setitem(app.config, 'SQL_QUERY_BUDGET_STRICT', False)
+    monkeypatch.setattr(app.view_functions['track_campaign'], 'query_budget', 0)
+    response = clients['sponsor'].get(f"/campaign/{ids['campaign']}/track")
+    assert response.status_code == 200
+    assert int(response.headers['X-SQL-Count']) > 0
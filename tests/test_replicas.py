@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import create_engine, select
+from models import db, Campaign
+
+SPONSOR_ID = 3
+
+@pytest.fixture
+def replica(app, monkeypatch, tmp_path):
+    # A SQLite copy of the primary registered as the replica0 bind. It is
+    # only refreshed by `flask sync-replicas`, so writes to the primary are
+    # missing from it until then.
+    uri = f"sqlite:///{tmp_path / 'replica0.sqlite3'}"
+    monkeypatch.setitem(app.config, 'DATABASE_REPLICA_URIS', uri)
+    with app.app_context():
+        db.engines['replica0'] = create_engine(uri)
+    sync = lambda: app.test_cli_runner().invoke(args=['sync-replicas']).output
+    assert 'replica0: copied' in sync()
+    yield sync
+    with app.app_context():
+        db.engines.pop('replica0').dispose()
+
+def create_campaign(app, client, name):
+    today = date.today()
+    client.post(f'/sponsor/{SPONSOR_ID}/create_campaign', data={
+        'campaign_name': name, 'description': 'Replica lag', 'start_date': today.isoformat(),
+        'end_date': (today + timedelta(days=30)).isoformat(),
+        'budget': '500', 'visibility': 'public', 'goals': 'reach', 'requirements': 'post', 'payment': '50'})
+    with app.app_context():
+        campaign_id = db.session.scalar(select(Campaign.id).where(Campaign.name == name))
+    assert campaign_id is not None
+    return campaign_id
+
+def test_read_only_views_use_the_replica(app, login, replica):
+    writer = login('sponsor', f'spon{SPONSOR_ID - 1}')
+    campaign_id = create_campaign(app, writer, 'Replicated later')
+    reader = login('sponsor', f'spon{SPONSOR_ID - 1}')
+    assert reader.get(f'/api/v1/campaigns/{campaign_id}').status_code == 404
+    assert b'Replicated later' not in reader.get(f'/sponsor/{SPONSOR_ID}/show_campaigns').data
+
+    replica()
+    assert reader.get(f'/api/v1/campaigns/{campaign_id}').status_code == 200
+    assert b'Replicated later' in reader.get(f'/sponsor/{SPONSOR_ID}/show_campaigns').data
+
+def test_writer_reads_its_writes_from_the_primary(app, login, replica, monkeypatch):
+    writer = login('sponsor', f'spon{SPONSOR_ID - 1}')
+    campaign_id = create_campaign(app, writer, 'Read your writes')
+    assert writer.get(f'/api/v1/campaigns/{campaign_id}').status_code == 200
+    assert b'Read your writes' in writer.get(f'/sponsor/{SPONSOR_ID}/show_campaigns').data
+
+    monkeypatch.setitem(app.config, 'REPLICA_READ_YOUR_WRITES_SECONDS', 0)
+    assert writer.get(f'/api/v1/campaigns/{campaign_id}').status_code == 404
+
+def test_other_views_use_the_primary(app, login, replica):
+    writer = login('sponsor', f'spon{SPONSOR_ID - 1}')
+    campaign_id = create_campaign(app, writer, 'Primary only')
+    reader = login('sponsor', f'spon{SPONSOR_ID - 1}')
+    assert b'Primary only' in reader.get(f'/campaign/{campaign_id}/update').data
@@ -0,0 +1,58 @@
+import pytest
+from datetime import date, timedelta
+from sqlalchemy import select
+from models import db, Campaign
+import search
+
+SPONSOR_ID = 2
+
+def form(name, description):
+    today = date.today()
+    return {'campaign_name': name, 'description': description, 'start_date': today.isoformat(),
+            'end_date': (today + timedelta(days=30)).isoformat(), 'budget': '500', 'visibility': 'public',
+            'goals': 'reach', 'requirements': 'post', 'payment': '50'}
+
+def matches(app, query_text):
+    with app.app_context():
+        return [campaign.id for campaign in search.search(Campaign.query, query_text).all()]
+
+@pytest.fixture(params=['fts5', 'like'])
+def backend(request, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'CAMPAIGN_SEARCH_BACKEND', request.param)
+    yield request.param
+    if request.param == 'like':
+        # Writes made under the LIKE backend skip the FTS table.
+        with app.app_context(), db.engine.begin() as conn:
+            search.BACKENDS['fts5'].rebuild(conn)
+
+def test_auto_picks_fts5_on_sqlite(app):
+    with app.app_context():
+        assert search.backend().name == 'fts5'
+
+def test_index_follows_create_rename_delete(app, login, backend):
+    sponsor = login('sponsor', f'spon{SPONSOR_ID - 1}')
+    sponsor.post(f'/sponsor/{SPONSOR_ID}/create_campaign', data=form(f'Zephyrine {backend} launch', 'Kayaking gear for spring'))
+    with app.app_context():
+        campaign_id = db.session.scalar(select(Campaign.id).where(Campaign.name == f'Zephyrine {backend} launch'))
+    assert matches(app, 'zephyrine') == [campaign_id]
+    assert matches(app, 'kayak') == [campaign_id]
+
+    sponsor.post(f'/campaign/{campaign_id}/update', data=form(f'Quillwort {backend} drive', 'Kayaking gear for spring'))
+    assert matches(app, 'quillwort') == [campaign_id]
+    assert matches(app, 'zephyrine') == []
+
+    sponsor.post(f'/campaign/{campaign_id}/delete')
+    assert matches(app, 'quillwort') == []
+    assert matches(app, 'kayak') == []
+
+def test_name_hits_rank_first(app, login, backend):
+    sponsor = login('sponsor', f'spon{SPONSOR_ID - 1}')
+    sponsor.post(f'/sponsor/{SPONSOR_ID}/create_campaign', data=form('Plain offer', f'Marigoldia {backend} in the description'))
+    sponsor.post(f'/sponsor/{SPONSOR_ID}/create_campaign', data=form(f'Marigoldia {backend}', 'Something else'))
+    with app.app_context():
+        ids = dict(db.session.execute(select(Campaign.name, Campaign.id).where(Campaign.sponsor_id == SPONSOR_ID)).all())
+    assert matches(app, f'marigoldia {backend}') == [ids[f'Marigoldia {backend}'], ids['Plain offer']]
+
+def test_query_syntax_is_not_interpreted(app, backend):
+    assert matches(app, 'zzqx" OR * NEAR(') == []
+    assert matches(app, '') == matches(app, '  ')
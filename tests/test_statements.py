@@ -0,0 +1,75 @@
+import re
+import tracemalloc
+import zlib
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+import statements
+
+SPONSOR = SimpleNamespace(id=1, name='Bench Sponsor', username='spon0')
+
+@pytest.fixture
+def synthetic_rows(monkeypatch):
+    consumed = [0]
+
+    def install(count):
+        def paid_requests(sponsor_id, start_date=None, end_date=None):
+            for number in range(1, count + 1):
+                consumed[0] = number
+                yield number, datetime(2026, 1, 1), f"Campaign {number} (summer)", 'spon0', f"inf{number}", 100.0
+        monkeypatch.setattr(statements, 'paid_requests', paid_requests)
+        return consumed
+    return install
+
+def check_structure(document):
+    assert document.startswith(b"%PDF-1.4") and document.endswith(b"%%EOF\n")
+    xref_at = int(re.search(rb"startxref\n(\d+)", document).group(1))
+    assert document[xref_at:].startswith(b"xref")
+    for number, offset in enumerate(re.findall(rb"(\d{10}) 00000 n ", document), start=1):
+        assert document[int(offset):].startswith(b"%d 0 obj" % number)
+    return int(re.search(rb"/Type /Pages /Kids \[[^\]]*\] /Count (\d+)", document).group(1))
+
+def page_text(document):
+    return [zlib.decompress(stream) for stream in re.findall(rb"stream\n(.*?)\nendstream", document, re.S)]
+
+def test_pages_are_sent_as_rows_arrive(synthetic_rows):
+    consumed = synthetic_rows(95)
+    chunks = statements.pdf_chunks(SPONSOR)
+    assert next(chunks).startswith(b"%PDF")
+    next(chunks)
+    assert consumed[0] == statements.ROWS_PER_PAGE
+    rest = list(chunks)
+    assert consumed[0] == 95
+    assert len(rest) == 3 + 1  # pages 2-4 and the trailer
+
+def test_document_is_well_formed(synthetic_rows):
+    synthetic_rows(95)
+    document = b"".join(statements.pdf_chunks(SPONSOR))
+    assert check_structure(document) == 4
+    pages = page_text(document)
+    assert b"(Campaign 1 \\(summer\\))" in pages[0]
+    assert b"(Total \\(95 requests\\))" in pages[-1] and b"(9500.00)" in pages[-1]
+    assert b"(Page 4)" in pages[-1]
+
+def peak_memory():
+    tracemalloc.start()
+    try:
+        for _ in statements.pdf_chunks(SPONSOR):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def test_memory_does_not_grow_with_rows(synthetic_rows):
+    synthetic_rows(300)
+    small = peak_memory()
+    synthetic_rows(30000)
+    large = peak_memory()
+    # Only page offsets accumulate: a few bytes per page of 30 rows.
+    assert large < small + 256 * 1024
+
+def test_download_is_streamed(login):
+    response = login('sponsor', 'spon0').get('/sponsor/1/statement/download?format=pdf', buffered=False)
+    assert response.status_code == 200 and response.is_streamed
+    assert check_structure(b"".join(response.response)) >= 1
+    response.close()
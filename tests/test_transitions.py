@@ -0,0 +1,95 @@
+import json
+import queue
+import pytest
+from sqlalchemy import select
+from models import db, AdRequest
+import events
+import transitions
+from transitions import PENDING, ACCEPTED, REJECTED
+
+SPONSOR_ID = 3
+INFLUENCER_ID = 4
+
+@pytest.mark.parametrize('sponsor_accepted, influencer_accepted, status, expected', [
+    (None, None, PENDING, PENDING),
+    (True, None, PENDING, PENDING),
+    (None, True, PENDING, PENDING),
+    (True, True, PENDING, ACCEPTED),
+    (False, True, PENDING, REJECTED),
+    (True, False, ACCEPTED, REJECTED),
+    (None, False, PENDING, REJECTED),
+])
+def test_derive_status(sponsor_accepted, influencer_accepted, status, expected):
+    assert transitions.derive_status(sponsor_accepted, influencer_accepted, status) == expected
+
+@pytest.mark.parametrize('arguments, error', [
+    (dict(scope='selected', ids=['x']), "Invalid ad request selection"),
+    (dict(scope='selected', ids=[]), "Select at least one ad request"),
+    (dict(scope='filtered', status='Paid'), "Invalid status"),
+    (dict(scope='filtered', campaign_id='x'), "Invalid campaign"),
+    (dict(scope='everything'), "Invalid selection"),
+])
+def test_selection_errors(arguments, error):
+    assert transitions.selection('sponsor', SPONSOR_ID, **arguments) == (None, error)
+
+def requests_of(app, *criteria):
+    with app.app_context():
+        return db.session.execute(select(AdRequest.id, AdRequest.status, AdRequest.sponsor_accepted, AdRequest.influencer_accepted)
+                                  .where(*criteria).order_by(AdRequest.id)).all()
+
+def assert_derived(rows):
+    for row in rows:
+        assert row.status == transitions.derive_status(row.sponsor_accepted, row.influencer_accepted, row.status)
+
+def test_single_accept_completes_the_pair(app, login, consistent):
+    ad_request_id = requests_of(app, AdRequest.sponsor_id == SPONSOR_ID, AdRequest.status == PENDING,
+                                AdRequest.sponsor_accepted.is_(None), AdRequest.influencer_accepted.is_(True))[0].id
+    login('sponsor', f'spon{SPONSOR_ID - 1}').post(f'/sponsor/{SPONSOR_ID}/sponsor_accept_request/{ad_request_id}')
+    assert requests_of(app, AdRequest.id == ad_request_id)[0].status == ACCEPTED
+    consistent()
+
+def test_bulk_accept_selected(app, login, consistent):
+    targets = requests_of(app, AdRequest.sponsor_id == SPONSOR_ID, AdRequest.sponsor_accepted.is_(None))
+    ids = [row.id for row in targets]
+    response = login('sponsor', f'spon{SPONSOR_ID - 1}').post(f'/sponsor/{SPONSOR_ID}/bulk_decide_requests', follow_redirects=True,
+                                                              data={'scope': 'selected', 'decision': 'accept', 'ad_request_ids': ids})
+    assert f"{len(ids)} ad request(s) accepted".encode() in response.data
+    rows = requests_of(app, AdRequest.id.in_(ids))
+    assert all(row.sponsor_accepted is True for row in rows)
+    assert_derived(rows)
+    assert {row.id for row in rows if row.status == ACCEPTED} == {row.id for row in targets if row.influencer_accepted is True}
+    consistent()
+
+def test_bulk_reject_awaiting_and_repeat_is_a_no_op(app, login, consistent):
+    client = login('influencer', f'inf{INFLUENCER_ID - 1}')
+    form = {'scope': 'filtered', 'decision': 'reject', 'awaiting': '1'}
+    awaiting = requests_of(app, AdRequest.influencer_id == INFLUENCER_ID, AdRequest.influencer_accepted.is_(None))
+    response = client.post(f'/influencer/{INFLUENCER_ID}/bulk_decide_requests', data=form, follow_redirects=True)
+    assert f"{len(awaiting)} ad request(s) rejected".encode() in response.data
+    rows = requests_of(app, AdRequest.id.in_([row.id for row in awaiting]))
+    assert all(row.status == REJECTED and row.influencer_accepted is False for row in rows)
+    response = client.post(f'/influencer/{INFLUENCER_ID}/bulk_decide_requests', data=form, follow_redirects=True)
+    assert b"0 ad request(s) rejected" in response.data
+    consistent()
+
+def test_bulk_decide_only_touches_own_requests(app):
+    with app.app_context():
+        others = requests_of(app, AdRequest.sponsor_id != SPONSOR_ID)
+        criteria, _ = transitions.selection('sponsor', SPONSOR_ID, 'selected', ids=[row.id for row in others[:20]])
+        assert transitions.bulk_decide('sponsor', 'reject', criteria) == 0
+        db.session.rollback()
+
+def test_bulk_decide_publishes_events_after_commit(app):
+    with app.app_context():
+        criteria, _ = transitions.selection('sponsor', SPONSOR_ID, 'filtered', status=PENDING)
+        subscription = events.bus.subscribe(('sponsor', SPONSOR_ID))
+        try:
+            updated = transitions.bulk_decide('sponsor', 'reject', criteria)
+            assert updated and subscription.empty()
+            db.session.commit()
+            messages = [subscription.get_nowait() for _ in range(updated)]
+        finally:
+            events.bus.unsubscribe(('sponsor', SPONSOR_ID), subscription)
+    assert all(json.loads(payload)['status'] == REJECTED for _, kind, payload in messages)
+    with pytest.raises(queue.Empty):
+        subscription.get_nowait()
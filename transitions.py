@@ -0,0 +1,126 @@
+from collections import Counter, defaultdict
+from sqlalchemy import select, update, func, case, literal, true, false, or_
+from models import db, AdRequest
+import stats
+import rollups
+import events
+
+# The ad request state machine. Each party records its own decision in
+# sponsor_accepted / influencer_accepted and the status follows from the
+# pair: accepted once both have accepted, rejected as soon as either has
+# rejected, otherwise unchanged. Single requests go through decide() on the
+# ORM object; bulk_decide() applies the same rules to a whole selection with
+# one UPDATE and adjusts the stat counters, campaign rollups and live-update
+# events itself, since Core statements bypass the flush hooks that normally
+# maintain them.
+PENDING = 'Pending'
+ACCEPTED = 'Accepted'
+REJECTED = 'Rejected'
+STATUSES = [PENDING, ACCEPTED, REJECTED]
+
+PARTIES = {'sponsor': 'sponsor_accepted', 'influencer': 'influencer_accepted'}
+OWNERS = {'sponsor': 'sponsor_id', 'influencer': 'influencer_id'}
+DECISIONS = {'accept': True, 'reject': False}
+SCOPES = ['selected', 'filtered']
+
+def counterpart(party):
+    return 'influencer' if party == 'sponsor' else 'sponsor'
+
+def derive_status(sponsor_accepted, influencer_accepted, status):
+    if sponsor_accepted is True and influencer_accepted is True:
+        return ACCEPTED
+    if sponsor_accepted is False or influencer_accepted is False:
+        return REJECTED
+    return status
+
+def refresh(ad_request):
+    status = derive_status(ad_request.sponsor_accepted, ad_request.influencer_accepted, ad_request.status)
+    if status != ad_request.status:
+        ad_request.status = status
+
+def decide(ad_request, party, decision):
+    setattr(ad_request, PARTIES[party], DECISIONS[decision])
+    refresh(ad_request)
+
+def status_expression(party, decision):
+    # derive_status() with this party's flag fixed, as SQL over the other flag.
+    if not DECISIONS[decision]:
+        return literal(REJECTED)
+    other_flag = getattr(AdRequest, PARTIES[counterpart(party)])
+    return case((other_flag == true(), ACCEPTED), (other_flag == false(), REJECTED), else_=AdRequest.status)
+
+def selection(party, owner_id, scope, ids=(), campaign_id=None, status=None, awaiting=False):
+    """Criteria for the party's own ad requests in a bulk decision, as
+    (criteria, error). 'selected' takes explicit ids; 'filtered' narrows by
+    campaign, status and whether the party has yet to decide."""
+    criteria = [getattr(AdRequest, OWNERS[party]) == owner_id]
+    if scope == 'selected':
+        try:
+            ids = sorted({int(ad_request_id) for ad_request_id in ids})
+        except (TypeError, ValueError):
+            return None, "Invalid ad request selection"
+        if not ids:
+            return None, "Select at least one ad request"
+        criteria.append(AdRequest.id.in_(ids))
+    elif scope == 'filtered':
+        if campaign_id:
+            try:
+                criteria.append(AdRequest.campaign_id == int(campaign_id))
+            except (TypeError, ValueError):
+                return None, "Invalid campaign"
+        if status:
+            if status not in STATUSES:
+                return None, "Invalid status"
+            criteria.append(AdRequest.status == status)
+        if awaiting:
+            criteria.append(getattr(AdRequest, PARTIES[party]).is_(None))
+    else:
+        return None, "Invalid selection"
+    return criteria, None
+
+def bulk_decide(party, decision, criteria):
+    """Records the party's decision on every ad request matching criteria in
+    the session's transaction and returns how many requests changed. The
+    caller commits."""
+    flag = getattr(AdRequest, PARTIES[party])
+    other_flag = getattr(AdRequest, PARTIES[counterpart(party)])
+    value = DECISIONS[decision]
+    criteria = [*criteria, or_(flag.is_(None), flag != value)]
+    conn = db.session.connection()
+
+    # Grouping by everything the new status depends on gives exact counter
+    # deltas without reading the rows themselves.
+    groups = conn.execute(
+        select(AdRequest.campaign_id, AdRequest.status, other_flag, func.count())
+        .where(*criteria)
+        .group_by(AdRequest.campaign_id, AdRequest.status, other_flag)
+    ).all()
+    if not groups:
+        return 0
+    statement = update(AdRequest).where(*criteria).values(**{PARTIES[party]: value, 'status': status_expression(party, decision)})
+    if conn.dialect.update_returning:
+        changed = conn.execute(statement.returning(*events.columns())).all()
+        events.record(db.session, 'ad_request', changed)
+        updated = len(changed)
+    else:
+        # Without RETURNING the parties get no live update; their pages
+        # show the change on the next load.
+        updated = conn.execute(statement).rowcount
+
+    counter_deltas = Counter()
+    rollup_deltas = defaultdict(Counter)
+    for campaign_id, status, other_value, count in groups:
+        flags = {party: value, counterpart(party): other_value}
+        new_status = derive_status(flags['sponsor'], flags['influencer'], status)
+        if new_status == status:
+            continue
+        counter_deltas[f"ad_requests_{status}"] -= count
+        counter_deltas[f"ad_requests_{new_status}"] += count
+        if campaign_id is None:
+            continue
+        for column, sign in ((rollups.STATUS_COLUMNS.get(status), -1), (rollups.STATUS_COLUMNS.get(new_status), 1)):
+            if column:
+                rollup_deltas[campaign_id][column] += sign * count
+    stats.adjust(conn, counter_deltas)
+    rollups.apply(conn, rollup_deltas, {})
+    return updated
@@ -0,0 +1,95 @@
+import re
+from datetime import datetime
+from models import Influencer, Sponsor
+
+# Field rules shared by the sign-up / campaign forms and the bulk importer.
+# Each check takes a mapping of form field names and returns the attributes
+# for the new row together with the error message to show, if any.
+
+def is_valid_password(password):
+    if len(password) < 8:
+        return "Password must be at least 8 characters long"
+    if not re.search("[a-z]", password) or not re.search("[A-Z]", password):
+        return "Password must contain both uppercase and lowercase letters"
+    if not re.search("[0-9]", password):
+        return "Password must contain at least one number"
+    if not re.search("[@#$%^&+=]", password):
+        return "Password must contain at least one special character (@#$%^&+=)"
+    return None
+
+def check_registration(fields):
+    user_type = fields.get("user_type")
+    username = fields.get("username")
+    password = fields.get("password")
+    confirm_password = fields.get("confirm_password")
+    name = fields.get("name")
+
+    if not user_type or not username or not password or not confirm_password or not name:
+        return None, None, "Error : Please fill all required fields"
+    if len(username) < 3 or len(username) > 20:
+        return None, None, "Error: Username must be between 3 and 20 characters"
+    if not username.isalnum():
+        return None, None, "Error: Username must contain only letters and numbers"
+    if password != confirm_password:
+        return None, None, "Error : Passwords do not match"
+    password_error = is_valid_password(password)
+    if password_error:
+        return None, None, f"Error : {password_error}"
+    if not name or not name.replace(" ", "").isalpha():
+        return None, None, "Error : Name should contain only alphabetic characters"
+    if user_type == "influencer":
+        additional_fields = {"category": fields.get("category"), "niche": fields.get("niche"), "reach": fields.get("reach")}
+        user_class = Influencer
+    elif user_type == "sponsor":
+        additional_fields = {"budget": fields.get("budget"), "industry": fields.get("industry")}
+        try:
+            budget = float(fields.get("budget"))
+            if budget <= 0:
+                return None, None, "Error: Budget must be a positive number"
+        except (TypeError, ValueError):
+            return None, None, "Error: Invalid budget amount"
+        user_class = Sponsor
+    else:
+        return None, None, "Error: Invalid user type"
+    if not all(additional_fields.values()):
+        return None, None, "Error: Please fill all required fields"
+    return user_class, dict(username=username, name=name, **additional_fields), None
+
+def check_campaign(fields):
+    name = fields.get('campaign_name')
+    description = fields.get("description")
+    start_date = fields.get("start_date")
+    end_date = fields.get("end_date")
+    budget = fields.get("budget")
+    visibility = fields.get("visibility")
+    goals = fields.get("goals")
+    requirements = fields.get('requirements')
+    payment = fields.get('payment')
+
+    if not all([name, description, start_date, end_date, budget, visibility, goals, requirements, payment]):
+        return None, "Error : Please enter all required fields"
+    try:
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+    except ValueError:
+        return None, "Error: Invalid date format"
+    if start_date < datetime.now().date():
+        return None, "Error : Start date cannot be before today"
+    if start_date > end_date:
+        return None, "Error : Start date cannot be after end date"
+    try:
+        budget = float(budget)
+        if budget < 0:
+            raise ValueError
+    except ValueError:
+        return None, "Error : Budget must be a positive number"
+    if not (visibility == "public" or visibility == "private"):
+        return None, "Error : Visibility should be either public or private"
+    try:
+        payment = float(payment)
+        if payment < 0:
+            raise ValueError
+    except ValueError:
+        return None, "Error : Payment amount must be a positive number"
+    return dict(name=name, description=description, start_date=start_date, end_date=end_date, budget=budget,
+                visibility=visibility, goals=goals, requirements=requirements, payment_amount=payment), None
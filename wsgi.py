@@ -0,0 +1,4 @@
+from app import init_app
+
+# Entry point for the flask CLI and WSGI servers (e.g. gunicorn wsgi:app).
+app = init_app()